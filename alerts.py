@@ -0,0 +1,134 @@
+# alerts.py
+"""
+Alertas de precio (/alerta): los umbrales de todos los chats viven en una
+lista ordenada, así que con cada precio nuevo solo se buscan (bisect) las
+alertas cruzadas entre el precio anterior y el actual: O(log n + k) por
+actualización en vez de recorrer todas. Cada alerta salta una sola vez.
+"""
+
+import bisect
+import math
+from dataclasses import dataclass
+
+import store
+
+
+@dataclass
+class Alert:
+    id: int
+    chat_id: int
+    price: float
+    label: str = ""  # "+5%" si se pidió en porcentaje
+
+
+def parse_alert(arg: str, buy_price: float) -> tuple[float, str]:
+    """
+    "100000" → alerta a ese precio; "+5%" / "-3%" → relativa al precio de
+    compra registrado. Devuelve (precio, etiqueta) o lanza ValueError.
+    """
+    arg = arg.strip().replace("$", "").replace(",", "")
+    label = ""
+    if arg.endswith("%"):
+        pct = float(arg[:-1])
+        if pct == 0:
+            raise ValueError("porcentaje nulo")
+        price, label = buy_price * (1 + pct / 100), f"{pct:+g}%"
+    else:
+        price = float(arg)
+    # Ni "-100%" ni "nan"/"inf": una alerta así no saltaría nunca
+    if not (math.isfinite(price) and price > 0):
+        raise ValueError("precio no positivo")
+    return price, label
+
+
+class AlertBook:
+    """
+    Umbrales ordenados (`_prices`) con el id de su alerta en la misma
+    posición (`_ids`). `cross(precio)` devuelve y retira las alertas en el
+    tramo (anterior, actual], en la dirección en que se movió el precio.
+    """
+
+    def __init__(self, alerts=()):
+        self._prices: list[float] = []
+        self._ids: list[int] = []
+        self._alerts: dict[int, Alert] = {}
+        self._by_chat: dict[int, set[int]] = {}
+        self.last_price: float | None = None
+        for a in sorted(alerts, key=lambda a: a.price):
+            self._prices.append(a.price)
+            self._ids.append(a.id)
+            self._index(a)
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def _index(self, alert: Alert):
+        self._alerts[alert.id] = alert
+        self._by_chat.setdefault(alert.chat_id, set()).add(alert.id)
+
+    def _unindex(self, alert_id: int) -> Alert:
+        alert = self._alerts.pop(alert_id)
+        ids = self._by_chat[alert.chat_id]
+        ids.discard(alert_id)
+        if not ids:
+            del self._by_chat[alert.chat_id]
+        return alert
+
+    def add(self, alert: Alert):
+        i = bisect.bisect_right(self._prices, alert.price)
+        self._prices.insert(i, alert.price)
+        self._ids.insert(i, alert.id)
+        self._index(alert)
+
+    def _pop(self, i: int) -> Alert:
+        del self._prices[i]
+        return self._unindex(self._ids.pop(i))
+
+    def remove(self, alert_id: int) -> Alert | None:
+        alert = self._alerts.get(alert_id)
+        if alert is None:
+            return None
+        i = bisect.bisect_left(self._prices, alert.price)
+        while self._ids[i] != alert_id:
+            i += 1
+        return self._pop(i)
+
+    def for_chat(self, chat_id: int) -> list[Alert]:
+        ids = self._by_chat.get(chat_id, ())
+        return sorted((self._alerts[i] for i in ids), key=lambda a: a.price)
+
+    def remove_chat(self, chat_id: int) -> list[int]:
+        """Retira todas las alertas del chat y devuelve sus ids."""
+        ids = list(self._by_chat.get(chat_id, ()))
+        for i in ids:
+            self.remove(i)
+        return ids
+
+    def cross(self, price: float) -> list[Alert]:
+        """Alertas cruzadas desde el último precio visto (la primera vez, ninguna)."""
+        prev, self.last_price = self.last_price, price
+        if prev is None or price == prev:
+            return []
+        if price > prev:
+            i = bisect.bisect_right(self._prices, prev)
+            j = bisect.bisect_right(self._prices, price)
+        else:
+            i = bisect.bisect_left(self._prices, price)
+            j = bisect.bisect_left(self._prices, prev)
+        if i >= j:
+            return []
+        hits = [self._unindex(aid) for aid in self._ids[i:j]]
+        del self._prices[i:j]
+        del self._ids[i:j]
+        return hits
+
+
+_book: AlertBook | None = None
+
+
+def get_book() -> AlertBook:
+    """Libro compartido, cargado del store la primera vez."""
+    global _book
+    if _book is None:
+        _book = AlertBook(Alert(*row) for row in store.get_store().alerts())
+    return _book
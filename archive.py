@@ -0,0 +1,207 @@
+# archive.py
+"""
+Archivo local de velas cerradas en formato NumPy (.npy), una partición
+por símbolo, intervalo y día (UTC):
+
+    <ARCHIVE_DIR>/<SYMBOL>/<interval>/<YYYY-MM-DD>.npy
+
+Cada fichero es un array (n, 7) float64 con las columnas de
+`market_data.FIELDS`, ordenado por open_time. Las lecturas usan mmap:
+`views` devuelve vistas sin copia de cada día y `read` las concatena.
+
+Uso:
+    python archive.py sync [--days 30] [--symbol BTCUSDT] [--interval 5m]
+    python archive.py gaps [--days 30] [--symbol BTCUSDT] [--interval 5m]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import config
+import data_cache
+import market_data
+
+DAY_MS = 86_400_000
+NCOLS = len(market_data.FIELDS)
+_EMPTY = np.empty((0, NCOLS))
+
+
+def interval_ms(interval: str) -> int:
+    return data_cache.interval_seconds(interval) * 1000
+
+
+def _day_name(day: int) -> str:
+    return datetime.fromtimestamp(day * 86400, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _day_number(name: str) -> int:
+    d = datetime.strptime(name, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(d.timestamp()) // 86400
+
+
+class KlineArchive:
+    def __init__(self, root: str = None):
+        self.root = root or config.ARCHIVE_DIR
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol, interval)
+
+    def _path(self, symbol: str, interval: str, day: int) -> str:
+        return os.path.join(self._dir(symbol, interval), f"{_day_name(day)}.npy")
+
+    def days(self, symbol: str, interval: str) -> list[int]:
+        """Días archivados (número de día UTC), en orden."""
+        d = self._dir(symbol, interval)
+        if not os.path.isdir(d):
+            return []
+        return sorted(_day_number(f[:-4]) for f in os.listdir(d) if f.endswith(".npy"))
+
+    # — Escritura —
+    def write(self, symbol: str, interval: str, rows) -> int:
+        """
+        Añade filas (velas cerradas) fusionándolas con lo ya archivado:
+        una misma open_time se sobrescribe. Cada día se reescribe de forma
+        atómica. Devuelve cuántas filas se han recibido.
+        """
+        rows = np.asarray(rows, dtype=float).reshape(-1, NCOLS)
+        if not len(rows):
+            return 0
+        os.makedirs(self._dir(symbol, interval), exist_ok=True)
+        days = (rows[:, 0] // DAY_MS).astype(np.int64)
+        for day in np.unique(days):
+            part = rows[days == day]
+            path = self._path(symbol, interval, int(day))
+            if os.path.exists(path):
+                part = np.concatenate([np.load(path), part])
+            # Orden estable: ante open_time repetida se queda la más nueva
+            part = part[np.argsort(part[:, 0], kind="stable")]
+            keep = np.append(part[1:, 0] != part[:-1, 0], True)
+            tmp = f"{path}.tmp.npy"
+            np.save(tmp, part[keep])
+            os.replace(tmp, path)
+        return len(rows)
+
+    # — Lectura —
+    def views(self, symbol: str, interval: str, start_ms=None, end_ms=None):
+        """
+        Vistas mmap (sin copia) de cada día con open_time en
+        [start_ms, end_ms), en orden.
+        """
+        first = None if start_ms is None else int(start_ms // DAY_MS)
+        last = None if end_ms is None else int((end_ms - 1) // DAY_MS)
+        for day in self.days(symbol, interval):
+            if (first is not None and day < first) or (last is not None and day > last):
+                continue
+            arr = np.load(self._path(symbol, interval, day), mmap_mode="r")
+            lo = 0 if start_ms is None else np.searchsorted(arr[:, 0], start_ms)
+            hi = len(arr) if end_ms is None else np.searchsorted(arr[:, 0], end_ms)
+            if hi > lo:
+                yield arr[lo:hi]
+
+    def read(self, symbol: str, interval: str, start_ms=None, end_ms=None):
+        """Velas en [start_ms, end_ms); sin copia si caen en un solo día."""
+        parts = list(self.views(symbol, interval, start_ms, end_ms))
+        if not parts:
+            return _EMPTY
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def tail(self, symbol: str, interval: str, n: int) -> np.ndarray:
+        """Las últimas `n` velas archivadas."""
+        parts, total = [], 0
+        for day in reversed(self.days(symbol, interval)):
+            arr = np.load(self._path(symbol, interval, day), mmap_mode="r")
+            parts.append(arr)
+            total += len(arr)
+            if total >= n:
+                break
+        if not parts:
+            return _EMPTY
+        return np.concatenate(parts[::-1])[-n:]
+
+    def frame(self, symbol: str, interval: str, start_ms=None, end_ms=None):
+        """Como `read`, en el formato DataFrame de `strategy.get_data`."""
+        return market_data.rows_to_frame(self.read(symbol, interval, start_ms, end_ms))
+
+    # — Huecos y sincronización —
+    def gaps(self, symbol: str, interval: str, start_ms: int, end_ms: int):
+        """
+        Rangos [desde, hasta) de open_time que faltan entre start_ms y
+        end_ms, alineados a la rejilla del intervalo.
+        """
+        step = interval_ms(interval)
+        start_ms = -(-int(start_ms) // step) * step
+        times = self.read(symbol, interval, start_ms, end_ms)[:, 0]
+        # Bordes: justo antes del inicio y justo en el final
+        edges = np.concatenate([[start_ms - step], times, [end_ms]])
+        diffs = np.diff(edges)
+        idx = np.flatnonzero(diffs > step)
+        return [(int(edges[i] + step), int(edges[i + 1])) for i in idx]
+
+    async def sync(
+        self,
+        symbol: str,
+        interval: str,
+        start_ms: int,
+        end_ms: int = None,
+        fetch=None,
+        page: int = 1000,
+    ) -> int:
+        """
+        Descarga solo los huecos del rango y los archiva. `fetch` es
+        `market_client.AsyncMarketClient.get_klines` (o un equivalente).
+        Las velas aún abiertas no se guardan. Devuelve las filas añadidas.
+        """
+        if fetch is None:
+            import market_client
+
+            fetch = market_client.get_client().get_klines
+        now_ms = int(time.time() * 1000)
+        step = interval_ms(interval)
+        # El final por defecto es la última vela cerrada
+        end_ms = min(end_ms or now_ms, now_ms // step * step)
+        added = 0
+        for lo, hi in self.gaps(symbol, interval, start_ms, end_ms):
+            while lo < hi:
+                klines = await fetch(symbol, interval, page, start_ms=lo, end_ms=hi - 1)
+                rows = [market_data.rest_row(k) for k in klines]
+                rows = [r for r in rows if r[1] < now_ms]
+                if not rows:
+                    break
+                added += self.write(symbol, interval, rows)
+                lo = int(rows[-1][0]) + step
+        return added
+
+
+def main():
+    p = argparse.ArgumentParser(description="Archivo local de klines")
+    p.add_argument("command", choices=["sync", "gaps"])
+    p.add_argument("--days", type=int, default=30)
+    p.add_argument("--symbol", default=config.SYMBOL)
+    p.add_argument("--interval", default=config.INTERVAL)
+    args = p.parse_args()
+
+    arch = KlineArchive()
+    end = int(time.time() * 1000)
+    start = end - args.days * DAY_MS
+    if args.command == "sync":
+
+        async def run():
+            import market_client
+
+            try:
+                return await arch.sync(args.symbol, args.interval, start, end)
+            finally:
+                await market_client.close_client()
+
+        print(f"{asyncio.run(run())} velas añadidas")
+    for lo, hi in arch.gaps(args.symbol, args.interval, start, end):
+        print(f"hueco: {lo} → {hi} ({(hi - lo) // interval_ms(args.interval)} velas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# backtest.py
+"""
+Backtest de las reglas de `strategy.analyze` sobre histórico local.
+
+Las reglas (COMPRA, VENTA y RECOMPRA, y la variante estricta con
+Bandas de Bollinger de `btc_bot.analyze`) se evalúan como arrays
+booleanos sobre columnas completas. La simulación solo recorre las velas
+donde alguna regla se cumple, así que un año de velas de 5m tarda
+milisegundos.
+
+Uso:
+    python backtest.py klines.csv [--strict] [--fee binance|paymonade|0.002]
+    python backtest.py --archive [--days 365] [--strict]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+import strategy
+
+# Comisiones por operación usadas en /compra y /venta
+FEES = {"binance": 0.001, "paymonade": 0.01}
+
+
+def load_klines(path: str) -> pd.DataFrame:
+    """
+    Lee un CSV de klines: con cabecera (open, high, low, close, volume...)
+    o sin ella, con las 12 columnas de Binance (p. ej. data.binance.vision).
+    """
+    df = pd.read_csv(path)
+    if "close" not in df.columns:
+        df = pd.read_csv(path, header=None, names=strategy.KLINE_COLUMNS)
+    if "close_time" in df.columns:
+        df.index = pd.to_datetime(df["close_time"], unit="ms")
+    elif "timestamp" in df.columns:
+        df.index = pd.to_datetime(df["timestamp"])
+    cols = ["open", "high", "low", "close", "volume"]
+    return df[[c for c in cols if c in df.columns]].astype(float)
+
+
+def rule_masks(
+    df,
+    strict: bool = False,
+    overbought: float = None,
+    oversold: float = None,
+    recompra: float = None,
+) -> dict:
+    """
+    Las reglas de `strategy` sobre todas las velas a la vez. `df` debe
+    traer las columnas de `strategy.add_indicators` (vale un dict de
+    arrays). Con `strict`, COMPRA exige cierre bajo la banda superior y
+    VENTA sobre la inferior. Los umbrales de RSI son los de `strategy`
+    salvo que se indiquen.
+    """
+    overbought = overbought or strategy.RSI_OVERBOUGHT
+    oversold = oversold or strategy.RSI_OVERSOLD
+    recompra = recompra or strategy.RSI_RECOMPRA
+    close = np.asarray(df["close"])
+    fast, slow = np.asarray(df["sma_fast"]), np.asarray(df["sma_slow"])
+    macd, sig = np.asarray(df["macd"]), np.asarray(df["macd_sig"])
+    rsi = np.asarray(df["rsi"])
+
+    compra = (fast > slow) & (macd > sig) & (rsi < overbought)
+    venta = (fast < slow) & (macd < sig) & (rsi > oversold)
+    if strict:
+        compra &= close < np.asarray(df["bb_hi"])
+        venta &= close > np.asarray(df["bb_lo"])
+    # RECOMPRA depende del último precio de compra: aquí solo su parte fija
+    recompra_rsi = rsi < recompra
+    return {"compra": compra, "venta": venta, "recompra_rsi": recompra_rsi}
+
+
+def simulate(
+    close: np.ndarray,
+    masks: dict,
+    fee: float = FEES["binance"],
+    buy_threshold: float = None,
+    capital: float = 1000.0,
+) -> dict:
+    """
+    Simula entradas/salidas a precio de cierre: estando fuera se entra
+    en COMPRA o RECOMPRA (cierre < última compra * umbral y RSI bajo);
+    dentro se sale en VENTA. Aplica `fee` en cada lado.
+    """
+    buy_threshold = buy_threshold or config.BUY_THRESHOLD
+    compra, venta, recompra_rsi = masks["compra"], masks["venta"], masks["recompra_rsi"]
+    n = len(close)
+
+    # Solo las velas donde puede pasar algo
+    events = np.flatnonzero(compra | venta | recompra_rsi)
+    entries, exits = [], []
+    long, last_buy = False, None
+    for i in events:
+        # Misma prioridad que strategy: RECOMPRA > COMPRA > VENTA
+        recompra = (
+            last_buy is not None
+            and recompra_rsi[i]
+            and close[i] < last_buy * buy_threshold
+        )
+        if not long and (recompra or compra[i]):
+            entries.append(i)
+            long, last_buy = True, close[i]
+        elif long and venta[i] and not recompra:
+            exits.append(i)
+            long = False
+    entries = np.array(entries, dtype=int)
+    exits = np.array(exits, dtype=int)
+
+    # Curva de capital a precio de cierre (vectorizada)
+    flags = np.zeros(n)
+    flags[entries] += 1
+    flags[exits] -= 1
+    in_pos = np.cumsum(flags) > 0  # dentro al cierre de la vela i
+    rets = np.zeros(n)
+    rets[1:] = close[1:] / close[:-1] - 1
+    growth = 1 + rets * np.concatenate([[False], in_pos[:-1]])
+    growth[entries] *= 1 - fee
+    growth[exits] *= 1 - fee
+    equity = capital * np.cumprod(growth)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    # Resultado por operación (la última puede seguir abierta)
+    closed = len(exits)
+    trade_ret = close[exits] / close[entries[:closed]] * (1 - fee) ** 2 - 1
+
+    return {
+        "candles": n,
+        "trades": int(closed),
+        "open_position": bool(len(entries) > closed),
+        "final_equity": float(equity[-1]) if n else capital,
+        "pnl": float(equity[-1] - capital) if n else 0.0,
+        "return_pct": float((equity[-1] / capital - 1) * 100) if n else 0.0,
+        "max_drawdown_pct": float(drawdown.min() * 100) if n else 0.0,
+        "win_rate_pct": float((trade_ret > 0).mean() * 100) if closed else 0.0,
+        "buy_hold_pct": float((close[-1] / close[0] - 1) * 100) if n else 0.0,
+    }
+
+
+def run(
+    df: pd.DataFrame,
+    strict: bool = False,
+    fee: float = FEES["binance"],
+    capital: float = 1000.0,
+) -> dict:
+    df = strategy.add_indicators(df.copy())
+    masks = rule_masks(df, strict=strict)
+    return simulate(df["close"].to_numpy(), masks, fee=fee, capital=capital)
+
+
+def _fee(value: str) -> float:
+    return FEES[value] if value in FEES else float(value)
+
+
+def add_data_args(p: argparse.ArgumentParser):
+    """Argumentos de origen de datos comunes (CSV o archivo local)."""
+    p.add_argument("data", nargs="?", help="CSV de klines local")
+    p.add_argument(
+        "--archive", action="store_true", help="leer del archivo local (archive.py)"
+    )
+    p.add_argument("--days", type=int, help="con --archive: últimos N días")
+    p.add_argument("--symbol", default=config.SYMBOL)
+    p.add_argument("--interval", default=config.INTERVAL)
+
+
+def load_data(p: argparse.ArgumentParser, args) -> pd.DataFrame:
+    if not args.archive and not args.data:
+        p.error("indica un CSV o --archive")
+    if not args.archive:
+        return load_klines(args.data)
+    import archive
+
+    start = None
+    if args.days:
+        start = (time.time() - args.days * 86400) * 1000
+    return archive.KlineArchive().frame(args.symbol, args.interval, start)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Backtest de las reglas de strategy.py")
+    add_data_args(p)
+    p.add_argument("--strict", action="store_true", help="reglas de btc_bot.py")
+    p.add_argument("--fee", type=_fee, default=FEES["binance"])
+    p.add_argument("--capital", type=float, default=1000.0)
+    args = p.parse_args()
+
+    df = load_data(p, args)
+    t = time.perf_counter()
+    res = run(df, strict=args.strict, fee=args.fee, capital=args.capital)
+    elapsed = time.perf_counter() - t
+    for k, v in res.items():
+        print(f"{k:>18}: {v:.2f}" if isinstance(v, float) else f"{k:>18}: {v}")
+    print(f"{'tiempo':>18}: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+# bench.py
+"""
+Benchmarks reproducibles de los caminos calientes del bot, sin red:
+
+- analyze: `strategy.analyze` sobre klines sintéticas.
+- plot_signal: `plotter.plot_signal` (un PNG).
+- sentiment_single / sentiment_batch: `sentiment.get_sentiment(s)` sin
+  caché (se omiten si transformers no está instalado).
+- news_parse: parseo de `news_scraper` sobre el HTML de bench_fixtures/.
+- monitor_tick: un tick completo de `bot.monitor_job` con N suscriptores,
+  contra un exchange falso en proceso (httpx.MockTransport) y un Bot
+  falso con latencia fija.
+
+Los resultados se guardan en JSON para comparar entre commits:
+
+    python bench.py --out antes.json
+    python bench.py --out despues.json --compare antes.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+
+# bot.py exige un token al importarse; el Bot falso no lo usa
+os.environ.setdefault("TELEGRAM_TOKEN", "123:bench")
+
+import config  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures")
+STEP_MS = 300_000  # velas de 5m
+
+
+def synthetic_klines(n: int, end_ms: int = None, seed: int = 0) -> list:
+    """`n` klines en formato REST de Binance, con paseo aleatorio en torno a 96k."""
+    rng = np.random.default_rng(seed)
+    end_ms = end_ms or int(time.time() * 1000) // STEP_MS * STEP_MS
+    closes = 96000 + np.cumsum(rng.normal(0, 60, n))
+    out = []
+    for i, c in enumerate(closes):
+        t = end_ms - (n - 1 - i) * STEP_MS
+        o = closes[i - 1] if i else c
+        out.append(
+            [
+                t,
+                f"{o:.2f}",
+                f"{max(o, c) + 10:.2f}",
+                f"{min(o, c) - 10:.2f}",
+                f"{c:.2f}",
+                "12.5",
+                t + STEP_MS - 1,
+                "0",
+                100,
+                "0",
+                "0",
+                "0",
+            ]
+        )
+    return out
+
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    """Ejecuta `fn` `warmup` + `repeat` veces y resume los tiempos (ms)."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return summarize(times)
+
+
+def summarize(times: list[float]) -> dict:
+    return {
+        "runs": len(times),
+        "min_ms": min(times),
+        "median_ms": statistics.median(times),
+        "mean_ms": statistics.fmean(times),
+        "max_ms": max(times),
+    }
+
+
+# — Benchmarks unitarios —
+def bench_analyze(repeat: int) -> dict:
+    import strategy
+
+    df = strategy.klines_to_frame(synthetic_klines(config.LIMIT))
+    return measure(lambda: strategy.analyze(df.copy(), 96000.0), repeat)
+
+
+def bench_plot(repeat: int) -> dict:
+    import plotter
+    import strategy
+
+    df = strategy.add_indicators(
+        strategy.klines_to_frame(synthetic_klines(config.LIMIT))
+    )
+    purchase = df.index[40]
+    return measure(
+        lambda: plotter.plot_signal(df, len(df) - 1, "COMPRA", 96000.0, purchase),
+        repeat,
+    )
+
+
+def _sentiment_available() -> bool:
+    try:
+        import transformers  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def bench_sentiment(repeat: int) -> dict:
+    import sentiment
+
+    texts = [
+        f"Bitcoin price update {i}: BTC trades near {96000 + i}" for i in range(16)
+    ]
+
+    def single():
+        sentiment._cache.clear()
+        for t in texts:
+            sentiment.get_sentiment(t)
+
+    def batch():
+        sentiment._cache.clear()
+        sentiment.get_sentiments(texts)
+
+    sentiment.get_analyzer()  # la carga del modelo no entra en la medida
+    return {
+        "sentiment_single": measure(single, repeat),
+        "sentiment_batch": measure(batch, repeat),
+    }
+
+
+def bench_news_parse(repeat: int) -> dict:
+    import news_scraper
+
+    with open(os.path.join(FIXTURES, "cointelegraph_bitcoin.html")) as f:
+        ct = f.read()
+    with open(os.path.join(FIXTURES, "cryptonews_bitcoin.html")) as f:
+        cn = f.read()
+
+    def parse():
+        news_scraper.parse_cointelegraph(ct, 5)
+        news_scraper.parse_cryptonews(cn, 5)
+
+    return measure(parse, repeat)
+
+
+# — Tick completo con exchange y Bot falsos —
+class FakeExchange:
+    """Sirve /api/v3/klines; cada petición avanza una vela."""
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self.requests = 0
+        self._end = int(time.time() * 1000) // STEP_MS * STEP_MS
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if request.url.path != "/api/v3/klines":
+            return httpx.Response(404)
+        limit = int(request.url.params.get("limit", 500))
+        end = self._end + self.requests * STEP_MS
+        return httpx.Response(200, json=synthetic_klines(limit, end, self.seed))
+
+
+class FakeBot:
+    """Bot de Telegram falso: cada llamada tarda `latency` segundos."""
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.calls = {"send_photo": 0, "send_message": 0}
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        self.calls["send_photo"] += 1
+        await asyncio.sleep(self.latency)
+        file_id = photo if isinstance(photo, str) else f"file-{hash(photo)}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=file_id)])
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls["send_message"] += 1
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text=text)
+
+
+async def _run_ticks(args) -> dict:
+    import bot
+    import market_client
+    import plotter
+    import store
+    import strategy
+    from broadcast import Broadcaster
+
+    exchange = FakeExchange()
+    market_client._client = market_client.AsyncMarketClient(
+        transport=httpx.MockTransport(exchange.handler)
+    )
+
+    tmp = tempfile.mkdtemp(prefix="btc_bench_")
+    state = store._store = store.StateStore(os.path.join(tmp, "bench.db"))
+    store._history = store.HistoryBuffer(state)
+    levels = np.linspace(90000, 100000, args.levels)
+    for i in range(args.subs):
+        state.add_subscriber(1000 + i)
+        state.set_buy_price(1000 + i, float(levels[i % args.levels]))
+
+    fake = FakeBot(args.latency)
+    context = SimpleNamespace(bot=fake, bot_data={})
+    config.MONITOR_INTERVAL = 0
+    config.EDGE_TRIGGERED = args.edge
+    plotter.warm_up()
+
+    times, stats = [], []
+    try:
+        for i in range(args.ticks + 1):
+            strategy._cache.clear()  # cada tick descarga, como en producción
+            context.bot_data["broadcaster"] = Broadcaster(
+                fake, global_rate=args.rate, per_chat_rate=args.rate
+            )
+            t = time.perf_counter()
+            await bot.monitor_job(context)
+            if i:  # el primero es de calentamiento
+                times.append((time.perf_counter() - t) * 1000)
+                stats.append(context.bot_data["broadcaster"].last_stats)
+    finally:
+        await market_client.close_client()
+        plotter.shutdown_render_pool()
+        store._history.flush()
+        state.close()
+        store._store = store._history = None
+
+    return {
+        **summarize(times),
+        "subscribers": args.subs,
+        "price_levels": args.levels,
+        "bot_latency_ms": args.latency * 1000,
+        "rate": args.rate,
+        "edge_triggered": args.edge,
+        "exchange_requests": exchange.requests,
+        "bot_calls": fake.calls,
+        "broadcast_p95_ms": statistics.median(s["p95"] for s in stats) * 1000,
+        "photo_uploads": stats[-1]["photo_uploads"],
+        "photo_reused": stats[-1]["photo_reused"],
+    }
+
+
+def bench_tick(args) -> dict:
+    return asyncio.run(_run_ticks(args))
+
+
+# — Resultados —
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.10) -> list[str]:
+    """
+    Compara la mediana de cada benchmark con la de `baseline`. Imprime la
+    tabla y devuelve los nombres que empeoran más de `tolerance`.
+    """
+    worse = []
+    print(f"\n{'benchmark':<18}{'antes':>12}{'ahora':>12}{'ratio':>8}")
+    for name, res in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "median_ms" not in base or "median_ms" not in res:
+            continue
+        ratio = res["median_ms"] / base["median_ms"]
+        flag = " ← REGRESIÓN" if ratio > 1 + tolerance else ""
+        print(
+            f"{name:<18}{base['median_ms']:>10.2f}ms{res['median_ms']:>10.2f}ms"
+            f"{ratio:>8.2f}{flag}"
+        )
+        if flag:
+            worse.append(name)
+    return worse
+
+
+BENCHES = ["analyze", "plot_signal", "sentiment", "news_parse", "monitor_tick"]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmarks de btc_bot")
+    p.add_argument("--only", action="append", choices=BENCHES)
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--subs", type=int, default=50, help="suscriptores del tick")
+    p.add_argument("--levels", type=int, default=10, help="precios de compra distintos")
+    p.add_argument("--ticks", type=int, default=3)
+    p.add_argument("--latency", type=float, default=0.02, help="latencia del Bot (s)")
+    p.add_argument(
+        "--rate",
+        type=float,
+        default=1000.0,
+        help="mensajes/s global y por chat (30 y 1 = límites de Telegram)",
+    )
+    p.add_argument(
+        "--edge",
+        action="store_true",
+        help="envío por flancos (por defecto todos reciben cada tick)",
+    )
+    p.add_argument("--out", default="bench_results.json")
+    p.add_argument("--compare", help="JSON de una ejecución anterior")
+    p.add_argument("--tolerance", type=float, default=0.10)
+    args = p.parse_args()
+
+    results = {}
+    for name in args.only or BENCHES:
+        t = time.perf_counter()
+        if name == "analyze":
+            results["analyze"] = bench_analyze(args.repeat)
+        elif name == "plot_signal":
+            results["plot_signal"] = bench_plot(max(1, args.repeat // 4))
+        elif name == "sentiment":
+            if not _sentiment_available():
+                print("sentiment: omitido (transformers no instalado)")
+                continue
+            results.update(bench_sentiment(max(1, args.repeat // 4)))
+        elif name == "news_parse":
+            results["news_parse"] = bench_news_parse(args.repeat)
+        else:
+            results["monitor_tick"] = bench_tick(args)
+        print(f"{name}: {time.perf_counter() - t:.1f}s")
+
+    out = {"meta": metadata(), "results": results}
+    with open(args.out, "w") as f:
+        json.dump(out, f, indent=2)
+    for name, res in results.items():
+        print(f"{name:<18}{res['median_ms']:>10.2f}ms (mediana de {res['runs']})")
+    print(f"→ {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            worse = compare(out, json.load(f), args.tolerance)
+        if worse:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,31 @@
 # === Archivo: bot.py ===
-import os
-import csv
+import tempfile
 import logging
 import asyncio
+import math
+import re
+import time
 from datetime import datetime
+import numpy as np
 from telegram import InputFile
 from telegram.ext import CommandHandler, ContextTypes, ApplicationBuilder
 
+import alerts
+import archive
 import config
+import delivery
+import market_client
+import market_data
+import metrics
+import news_feed
+import news_scraper
+import notify
 import strategy
-from plotter import plot_signal
-from sentiment import get_sentiment
+import plotter
+import sentiment
+import shard
+import store
+from broadcast import Broadcaster
 
 # Logging
 logging.basicConfig(
@@ -20,64 +35,33 @@ logging.basicConfig(
 )
 
 
-# — Suscripción y persistencia —
+# — Suscripción y persistencia (SQLite, ver store.py) —
 def load_subscribers() -> set[int]:
-    if not os.path.exists(config.SUBSCRIBERS_FILE):
-        return set()
-    with open(config.SUBSCRIBERS_FILE) as f:
-        return {int(line.strip()) for line in f if line.strip().isdigit()}
-
-
-def save_subscribers(subs: set[int]):
-    with open(config.SUBSCRIBERS_FILE, "w") as f:
-        for cid in sorted(subs):
-            f.write(f"{cid}\n")
+    return store.get_store().subscribers()
 
 
 def add_subscriber(chat_id: int):
-    subs = load_subscribers()
-    if chat_id not in subs:
-        subs.add(chat_id)
-        save_subscribers(subs)
+    if store.get_store().add_subscriber(chat_id):
         logging.info(f"Subscribed chat {chat_id}")
 
 
-def get_last_buy_file(chat_id: int) -> str:
-    return f"last_buy_price_{chat_id}.txt"
-
-
 def load_last_buy_price(chat_id: int) -> float:
-    try:
-        with open(get_last_buy_file(chat_id)) as f:
-            return float(f.read().strip())
-    except:
-        return 96000.0
+    return store.get_store().buy_price(chat_id)
 
 
 def save_last_buy_price(chat_id: int, price: float):
-    with open(get_last_buy_file(chat_id), "w") as f:
-        f.write(str(price))
-
-
-def get_history_file(chat_id: int) -> str:
-    return f"btc_trades_history_{chat_id}.csv"
+    store.get_store().set_buy_price(chat_id, price)
 
 
 def append_to_history(
     chat_id: int, ts: str, sig: str, price: float, rsi: float, usd: float, pct: float
 ):
-    path = get_history_file(chat_id)
-    exists = os.path.exists(path)
-    try:
-        with open(path, "a", newline="") as f:
-            w = csv.writer(f)
-            if not exists:
-                w.writerow(
-                    ["timestamp", "signal", "price", "RSI", "USD_change", "%_change"]
-                )
-            w.writerow([ts, sig, price, rsi, usd, pct])
-    except Exception as e:
-        logging.error(f"Error writing history for {chat_id}: {e}")
+    # Se escribe por lotes (ver store.HistoryBuffer)
+    store.get_history_buffer().add(chat_id, ts, sig, price, rsi, usd, pct)
+
+
+async def flush_history_job(context: ContextTypes.DEFAULT_TYPE):
+    store.get_history_buffer().flush()
 
 
 # — Comandos —
@@ -107,40 +91,225 @@ async def estado_command(
 ):
     cid = update.effective_chat.id
     last = load_last_buy_price(cid)
-    df = strategy.get_data()
+    df = await strategy.get_data_async()
     price = float(df.iloc[-1]["close"])
     du, dp = price - last, (price - last) / last * 100
-    await update.message.reply_text(
+    text = (
         f"📊 Precio BTC: ${price:.2f}\n"
         f"📌 Tu compra: ${last:.2f}\n"
         f"📈 Cambio: {du:+.2f} USD ({dp:+.2f}%)"
     )
+    # Con el stream activo, el RSI ya está calculado vela a vela
+    service = market_data.get_service()
+    values = service.indicators() if service is not None else None
+    if values is not None and not np.isnan(values["rsi"]):
+        text += f"\n📉 RSI (última vela cerrada): {values['rsi']:.1f}"
+    await update.message.reply_text(text)
+
+
+def parse_historial_args(args: list[str]):
+    """
+    /historial [desde] [hasta] [señal]: fechas YYYY-MM-DD y señal
+    COMPRA/VENTA/RECOMPRA, en cualquier orden. Devuelve (desde, hasta, señal).
+    """
+    dates, signal = [], None
+    for a in args:
+        if a.upper() in ("COMPRA", "VENTA", "RECOMPRA"):
+            signal = a.upper()
+        else:
+            dates.append(datetime.strptime(a, "%Y-%m-%d").strftime("%Y-%m-%d"))
+    if len(dates) > 2:
+        raise ValueError("demasiadas fechas")
+    start = dates[0] if dates else None
+    end = dates[1] if len(dates) > 1 else None
+    return start, end, signal
 
 
 async def historial_command(
     update: ContextTypes.DEFAULT_TYPE, context: ContextTypes.DEFAULT_TYPE
 ):
     cid = update.effective_chat.id
-    path = get_history_file(cid)
-    if os.path.exists(path):
-        await context.bot.send_document(chat_id=cid, document=InputFile(path))
+    try:
+        start, end, signal = parse_historial_args(context.args or [])
+    except ValueError:
+        await update.message.reply_text(
+            "❌ Uso: /historial [desde AAAA-MM-DD] [hasta AAAA-MM-DD] [COMPRA|VENTA|RECOMPRA]"
+        )
+        return
+
+    # Lo pendiente del buffer también cuenta; la exportación (gzip por
+    # bloques) va en un hilo aparte con su propia conexión
+    store.get_history_buffer().flush()
+    out = tempfile.SpooledTemporaryFile(max_size=config.EXPORT_SPOOL_BYTES)
+    loop = asyncio.get_running_loop()
+    n = await loop.run_in_executor(
+        None, store.get_store().export_trades_gz, cid, out, start, end, signal
+    )
+    if n:
+        # InputFile necesita bytes o un fichero con nombre; el spool en
+        # memoria no lo tiene
+        out.seek(0)
+        await context.bot.send_document(
+            chat_id=cid,
+            document=InputFile(out.read(), filename=f"btc_trades_history_{cid}.csv.gz"),
+        )
     else:
         await update.message.reply_text("❌ No hay historial.")
+    out.close()
 
 
 async def reset_command(
     update: ContextTypes.DEFAULT_TYPE, context: ContextTypes.DEFAULT_TYPE
 ):
     cid = update.effective_chat.id
-    for fn in (get_last_buy_file(cid), get_history_file(cid)):
-        if os.path.exists(fn):
-            os.remove(fn)
-    subs = load_subscribers()
-    subs.discard(cid)
-    save_subscribers(subs)
+    alerts.get_book().remove_chat(cid)
+    # Lo pendiente en el buffer no debe reaparecer tras el reset
+    store.get_history_buffer().discard(cid)
+    store.get_store().reset(cid)
     await update.message.reply_text("🔄 Reiniciado y desuscrito.")
 
 
+def parse_pair_args(args: list[str]):
+    """
+    /seguir y /dejar: SÍMBOLO [intervalo] (intervalo por defecto el de
+    config). Devuelve (símbolo, intervalo) o lanza ValueError.
+    """
+    if not args or len(args) > 2:
+        raise ValueError("argumentos")
+    symbol = args[0].upper()
+    interval = args[1] if len(args) > 1 else config.INTERVAL
+    if not re.fullmatch(r"[A-Z0-9]{2,20}", symbol):
+        raise ValueError(f"símbolo {symbol}")
+    if interval not in config.WATCH_INTERVALS:
+        raise ValueError(f"intervalo {interval}")
+    return symbol, interval
+
+
+async def seguir_command(
+    update: ContextTypes.DEFAULT_TYPE, context: ContextTypes.DEFAULT_TYPE
+):
+    cid = update.effective_chat.id
+    try:
+        symbol, interval = parse_pair_args(context.args or [])
+    except ValueError:
+        await update.message.reply_text(
+            "❌ Uso: /seguir <SÍMBOLO> [intervalo]\n"
+            f"Intervalos: {', '.join(config.WATCH_INTERVALS)}"
+        )
+        return
+    st = store.get_store()
+    if len(st.watchlist(cid)) >= config.MAX_WATCHLIST:
+        await update.message.reply_text(
+            f"❌ Máximo {config.MAX_WATCHLIST} pares. Usa /dejar para quitar uno."
+        )
+        return
+    # Se comprueba que Binance conoce el par antes de guardarlo
+    try:
+        await strategy.fetch_binance_klines_async(1, symbol, interval)
+    except Exception:
+        await update.message.reply_text(f"❌ Binance no reconoce {symbol}.")
+        return
+    if st.add_watch(cid, symbol, interval):
+        add_subscriber(cid)
+        await update.message.reply_text(f"👀 Siguiendo {symbol} {interval}.")
+    else:
+        await update.message.reply_text(f"Ya sigues {symbol} {interval}.")
+
+
+async def dejar_command(
+    update: ContextTypes.DEFAULT_TYPE, context: ContextTypes.DEFAULT_TYPE
+):
+    cid = update.effective_chat.id
+    try:
+        symbol, interval = parse_pair_args(context.args or [])
+    except ValueError:
+        await update.message.reply_text("❌ Uso: /dejar <SÍMBOLO> [intervalo]")
+        return
+    if store.get_store().remove_watch(cid, symbol, interval):
+        await update.message.reply_text(f"🗑 Ya no sigues {symbol} {interval}.")
+    else:
+        await update.message.reply_text(
+            f"❌ No sigues {symbol} {interval} o es tu único par (usa /reset)."
+        )
+
+
+async def lista_command(
+    update: ContextTypes.DEFAULT_TYPE, context: ContextTypes.DEFAULT_TYPE
+):
+    pairs = store.get_store().watchlist(update.effective_chat.id)
+    lines = "\n".join(f"- {sym} {iv}" for sym, iv in pairs)
+    await update.message.reply_text(f"👀 Pares que sigues:\n{lines}")
+
+
+async def alerta_command(
+    update: ContextTypes.DEFAULT_TYPE, context: ContextTypes.DEFAULT_TYPE
+):
+    """
+    /alerta <precio | ±N%> crea una alerta (el porcentaje es sobre el
+    precio de compra registrado), /alerta la lista y /alerta borrar las quita.
+    """
+    cid = update.effective_chat.id
+    book = alerts.get_book()
+    args = context.args or []
+    if not args:
+        pending = book.for_chat(cid)
+        if not pending:
+            await update.message.reply_text(
+                "🔕 No tienes alertas. Uso: /alerta <precio | +N% | -N%>"
+            )
+            return
+        lines = "\n".join(
+            f"- ${a.price:.2f}" + (f" ({a.label})" if a.label else "") for a in pending
+        )
+        await update.message.reply_text(f"🔔 Tus alertas:\n{lines}")
+        return
+
+    if args[0].lower() == "borrar":
+        store.get_store().delete_alerts(book.remove_chat(cid))
+        await update.message.reply_text("🗑 Alertas borradas.")
+        return
+
+    try:
+        price, label = alerts.parse_alert(args[0], load_last_buy_price(cid))
+    except ValueError:
+        await update.message.reply_text(
+            "❌ Uso: /alerta <precio | +N% | -N%> (o /alerta borrar)"
+        )
+        return
+    if len(book.for_chat(cid)) >= config.MAX_ALERTS:
+        await update.message.reply_text(
+            f"❌ Máximo {config.MAX_ALERTS} alertas. Usa /alerta borrar."
+        )
+        return
+    aid = store.get_store().add_alert(cid, price, label)
+    book.add(alerts.Alert(aid, cid, price, label))
+    extra = f" ({label} sobre tu compra)" if label else ""
+    await update.message.reply_text(
+        f"🔔 Te aviso cuando BTC cruce ${price:.2f}{extra}."
+    )
+
+
+async def resumen_command(
+    update: ContextTypes.DEFAULT_TYPE, context: ContextTypes.DEFAULT_TYPE
+):
+    """/resumen <horas> manda el estado cada N horas aunque no haya señal."""
+    cid = update.effective_chat.id
+    try:
+        arg = context.args[0].lower()
+        hours = 0.0 if arg == "off" else float(arg)
+        # float() acepta "nan" e "inf"
+        if arg != "off" and not (math.isfinite(hours) and hours > 0):
+            raise ValueError(arg)
+    except (IndexError, ValueError):
+        await update.message.reply_text("❌ Uso: /resumen <horas> (o /resumen off)")
+        return
+    store.get_store().set_digest(cid, hours * 3600 or None)
+    if hours:
+        await update.message.reply_text(f"🗓 Resumen cada {hours:g} h.")
+    else:
+        await update.message.reply_text("🗓 Resumen desactivado: solo cambios.")
+
+
 async def help_command(
     update: ContextTypes.DEFAULT_TYPE, context: ContextTypes.DEFAULT_TYPE
 ):
@@ -149,8 +318,13 @@ async def help_command(
         "/start ⇒ Suscribirse\n"
         "/registrar <precio> ⇒ Definir precio compra\n"
         "/estado ⇒ Ver precio y cambio\n"
-        "/historial ⇒ Descargar historial\n"
+        "/historial [desde] [hasta] [señal] ⇒ Descargar historial\n"
         "/reset ⇒ Reset y desuscribir\n"
+        "/seguir <SÍMBOLO> [intervalo] ⇒ Vigilar otro par\n"
+        "/dejar <SÍMBOLO> [intervalo] ⇒ Dejar de vigilarlo\n"
+        "/lista ⇒ Pares vigilados\n"
+        "/alerta <precio|±N%> ⇒ Aviso al cruzar un precio\n"
+        "/resumen <horas|off> ⇒ Estado periódico aunque no haya cambios\n"
         "/compra <USD> ⇒ Estimación BTC\n"
         "/venta <BTC> ⇒ Estimación USD\n"
         "/ney ⇒ ¡Hola zorrito!\n"
@@ -163,7 +337,7 @@ async def compra_command(
 ):
     try:
         amt = float(context.args[0])
-        df = strategy.get_data()
+        df = await strategy.get_data_async()
         price = float(df.iloc[-1]["close"])
         f_bin, f_pay = 0.001, 0.01
         net_bin = amt * (1 - f_bin)
@@ -185,7 +359,7 @@ async def venta_command(
 ):
     try:
         btc_amt = float(context.args[0])
-        df = strategy.get_data()
+        df = await strategy.get_data_async()
         price = float(df.iloc[-1]["close"])
         gross = btc_amt * price
         f_bin, f_pay = 0.001, 0.01
@@ -208,75 +382,257 @@ async def ney_command(
 
 
 # — Monitor / Señales con IA —
+def get_broadcaster(context: ContextTypes.DEFAULT_TYPE) -> Broadcaster:
+    """
+    Un Broadcaster por app, para que los límites por chat persistan. Con
+    shards, el coordinador solo usa su parte del límite global.
+    """
+    b = context.bot_data.get("broadcaster")
+    if b is None:
+        rate = shard.rate_share(config.SHARD_WORKERS) if config.SHARD_WORKERS else None
+        b = context.bot_data["broadcaster"] = Broadcaster(context.bot, global_rate=rate)
+    return b
+
+
+# Tareas de envío de alertas en curso (referencias para que no se recolecten)
+_alert_tasks: set = set()
+
+
+def check_alerts(context, price: float):
+    """
+    Listener de precio (stream de market_data y cada tick): busca las
+    alertas cruzadas y las entrega al momento, sin esperar al tick.
+    `context` es la Application o el contexto del job (bot + bot_data).
+    """
+    hits = alerts.get_book().cross(price)
+    if not hits:
+        return
+    store.get_store().delete_alerts([a.id for a in hits])
+    task = asyncio.get_running_loop().create_task(deliver_alerts(context, hits, price))
+    _alert_tasks.add(task)
+    task.add_done_callback(_alert_tasks.discard)
+
+
+async def deliver_alerts(context, hits: list, price: float):
+    broadcaster = get_broadcaster(context)
+    deliveries = []
+    for a in hits:
+        extra = f" ({a.label})" if a.label else ""
+        text = f"🔔 BTC cruzó ${a.price:.2f}{extra}\n💲 Precio: ${price:.2f}"
+        deliveries.append(
+            broadcaster.delivery(a.chat_id, [("send_message", {"text": text})])
+        )
+    stats = await broadcaster.broadcast(deliveries)
+    metrics.ALERTS.inc(len(hits))
+    logging.info(f"Alertas: {len(hits)} → {stats}")
+
+
 async def monitor_job(context: ContextTypes.DEFAULT_TYPE):
     subs = load_subscribers()
+    metrics.SUBSCRIBERS.set(len(subs))
     if not subs:
         return
 
-    df = strategy.get_data()
-    idx = len(df) - 1
-    for cid in subs:
-        last = load_last_buy_price(cid)
-        sig, reason, price, rsi, sf, sl, macd = strategy.analyze(df, last)
-        du, dp = price - last, (price - last) / last * 100
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        purchase_idx = (df["close"] - last).abs().idxmin()
-
-        # 1️⃣ Gráfico
-        buf = plot_signal(
-            df, idx, sig or "NO_SIGNAL", buy_price=last, purchase_idx=purchase_idx
-        )
-        await context.bot.send_photo(chat_id=cid, photo=buf)
-
-        # 2️⃣ Análisis técnico
-        target = last * 1.02
-        stop = last * 0.98
-        potential = (target - price) / price * 100
-        tech_map = {
-            "COMPRA": "- SMA9↑ sobre SMA21\n- MACD > señal\n- RSI < 70",
-            "VENTA": "- SMA9↓ bajo SMA21\n- MACD < señal\n- RSI > 30",
-            "RECOMPRA": "- Precio cayó >3%\n- RSI < 35 (sobreventa)",
-        }
-        tech_exp = tech_map.get(sig, "")
-
-        # 3️⃣ IA refuerza señal
-        ia_text = f"Precio {price:.2f}, SMA9 {sf:.2f}, SMA21 {sl:.2f}, MACD {macd:.2f}"
-        ia_sent = get_sentiment(ia_text)
-
-        # 4️⃣ Construir mensaje
-        msg = (
-            f"🚨 *Señal BTC: {sig or 'Monitoreo'}* ({ts})\n\n"
-            f"💲 Precio: ${price:.2f}\n"
-            f"📌 Compra: ${last:.2f}\n"
-            f"📈 Cambio: {du:+.2f} USD ({dp:+.2f}%)\n\n"
-            f"🔼 Máx recom. venta: ${target:.2f}\n"
-            f"🔽 Mín recom. compra: ${stop:.2f}\n"
-            f"💡 Potencial: {potential:.2f}%\n\n"
-            f"📝 Explicación técnica:\n{tech_exp}\n\n"
-            f"🤖 IA dice: {ia_sent}"
-        )
+    with metrics.TICK_SECONDS.time():
+        await monitor_tick(context, subs)
+
+    await asyncio.sleep(config.MONITOR_INTERVAL)
 
-        await context.bot.send_message(chat_id=cid, text=msg, parse_mode="Markdown")
 
-    await asyncio.sleep(300)
+def _edge_filter(pair, cids: list[int], signals, price: float) -> np.ndarray:
+    """Máscara de chats con algo nuevo que enviar; guarda su nuevo estado."""
+    if not config.EDGE_TRIGGERED:
+        return np.ones(len(cids), dtype=bool)
+    st = store.get_store()
+    states = st.notify_states(cids, *pair)
+    now = time.time()
+    mask = notify.due(states, signals, price, now, st.digests(cids))
+    st.save_notify_states(
+        cids, *pair, notify.new_states(states, signals, price, now, mask)
+    )
+    return mask
+
+
+def plan_default(snap, cids: list[int], ts: str) -> delivery.PairWork:
+    """
+    Par principal: señal de cada suscriptor (vectorizada sobre el array de
+    precios de compra), historial y filtro de flancos.
+    """
+    df, price = snap.df, snap.close
+    with metrics.stage("evaluate"):
+        lasts = np.array(store.get_store().buy_prices(cids))
+        signals, _ = strategy.evaluate(snap, lasts)
+
+    for cid, last, sig in zip(cids, lasts, signals):
+        if sig:
+            du, dp = price - last, (price - last) / last * 100
+            append_to_history(cid, ts, sig, price, snap.rsi, du, dp)
+
+    # Solo se dibuja y envía a quien tenga algo nuevo (ver notify.py)
+    mask = _edge_filter((config.SYMBOL, config.INTERVAL), cids, signals, price)
+    cids = [cid for cid, send in zip(cids, mask) if send]
+    lasts, signals = lasts[mask], signals[mask]
+    closes = df["close"].to_numpy()
+    purchase_pos = np.abs(closes[None, :] - lasts[:, None]).argmin(axis=1)
+    pair = (config.SYMBOL, config.INTERVAL)
+    return delivery.PairWork(pair, snap, cids, lasts, signals, purchase_pos)
+
+
+def plan_pair(pair, snap, cids: list[int]) -> delivery.PairWork:
+    mask = _edge_filter(pair, cids, [snap.signal] * len(cids), snap.close)
+    return delivery.PairWork(pair, snap, [c for c, send in zip(cids, mask) if send])
+
+
+async def fetch_pairs(pairs: list[tuple[str, str]]) -> dict:
+    """Descarga cada par una sola vez y en paralelo; los que fallan se omiten."""
+    results = await asyncio.gather(
+        *(strategy.get_data_async(symbol=sym, interval=iv) for sym, iv in pairs),
+        return_exceptions=True,
+    )
+    frames = {}
+    for (sym, iv), res in zip(pairs, results):
+        if isinstance(res, Exception):
+            logging.error(f"Sin datos de {sym} {iv}: {res}")
+        else:
+            frames[(sym, iv)] = res
+    return frames
+
+
+async def monitor_tick(context: ContextTypes.DEFAULT_TYPE, subs: set[int]):
+    """Un tick de señales: datos, indicadores, gráficos, IA y envío."""
+    # Cada par vigilado se descarga una vez aunque lo sigan muchos chats,
+    # y los indicadores de todos los pares se calculan en bloque
+    groups = store.get_store().watchers(sorted(subs))
+    frames = await fetch_pairs(list(groups))
+    pairs = list(frames)
+    with metrics.stage("indicators"):
+        snaps = strategy.take_snapshots([frames[p] for p in pairs])
+    default = (config.SYMBOL, config.INTERVAL)
+    if default in frames:
+        # Sin stream, las alertas se comprueban al menos una vez por tick
+        check_alerts(context, snaps[pairs.index(default)].close)
+
+    # 3️⃣ IA: sentimiento agregado de las noticias, calculado en segundo
+    # plano por news_feed; aquí solo se lee de memoria
+    ia_sent = news_feed.get_feed().summary()
+
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    works = [
+        (
+            plan_default(snap, groups[pair], ts)
+            if pair == default
+            else plan_pair(pair, snap, groups[pair])
+        )
+        for pair, snap in zip(pairs, snaps)
+    ]
+
+    # Con shards, los workers dibujan y envían; si no, aquí mismo
+    shards = context.bot_data.get("shards")
+    if shards is not None:
+        with metrics.stage("send"):
+            stats = await shards.dispatch(works, ts, ia_sent)
+    else:
+        broadcaster = get_broadcaster(context)
+        deliveries = []
+        for work in works:
+            deliveries += await delivery.build(broadcaster, work, ts, ia_sent)
+        with metrics.stage("send"):
+            stats = await broadcaster.broadcast(deliveries)
+    logging.info(f"Broadcast: {stats}")
+    for result in ("sent", "failed", "retries"):
+        metrics.MESSAGES.inc(stats[result], result=result)
+    metrics.PHOTOS.inc(stats["photo_uploads"], kind="upload")
+    metrics.PHOTOS.inc(stats["photo_reused"], kind="reused")
 
 
 # — Arranque de la app —
-app = ApplicationBuilder().token(config.TELEGRAM_TOKEN).build()
+# Estado de arranque que expone el servidor web (main.py)
+_status = {"ready": False, "models": False}
+
+
+def health() -> tuple[str, int]:
+    """Texto y código HTTP de la ruta de salud (main.py y webserver.py)."""
+    if not _status["ready"]:
+        return "Bot de BTC iniciando ⏳", 503
+    if not _status["models"]:
+        return "Bot de BTC activo ✅ (cargando modelos)", 200
+    return "Bot de BTC activo ✅", 200
+
+
+async def warm_up():
+    """Precarga matplotlib, el pool de render y el modelo de sentimiento."""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, plotter.warm_up)
+        await asyncio.wrap_future(sentiment.warm_up())
+        _status["models"] = True
+        logging.info("Warm-up completado")
+    except Exception as e:
+        logging.error(f"Warm-up falló: {e}")
+
+
+async def on_startup(application):
+    # Importa una sola vez los ficheros de estado antiguos a SQLite
+    store.get_store().migrate_files()
+    if config.STREAM_ENABLED:
+        arch = archive.KlineArchive() if config.ARCHIVE_ENABLED else None
+        service = market_data.start_service(
+            strategy.fetch_binance_klines_async, archive=arch
+        )
+        service.listeners.append(lambda price: check_alerts(application, price))
+    if config.SHARD_WORKERS > 0:
+        # Dibujan los workers: el coordinador no necesita pool de render
+        config.RENDER_WORKERS = 0
+        application.bot_data["shards"] = shard.ShardPool().start()
+    if config.WARMUP_ENABLED:
+        # Referencia guardada para que el task no se recolecte
+        application.bot_data["warmup"] = asyncio.create_task(warm_up())
+    _status["ready"] = True
+
+
+async def on_shutdown(application):
+    _status["ready"] = False
+    store.get_history_buffer().flush()
+    await market_data.stop_service()
+    await market_client.close_client()
+    await news_scraper.close_fetcher()
+    plotter.shutdown_render_pool()
+    if "shards" in application.bot_data:
+        application.bot_data.pop("shards").stop()
+
+
+app = (
+    ApplicationBuilder()
+    .token(config.TELEGRAM_TOKEN)
+    .post_init(on_startup)
+    .post_shutdown(on_shutdown)
+    .build()
+)
 for name, handler in [
     ("start", start_command),
     ("registrar", registrar_command),
     ("estado", estado_command),
     ("historial", historial_command),
     ("reset", reset_command),
+    ("seguir", seguir_command),
+    ("dejar", dejar_command),
+    ("lista", lista_command),
+    ("alerta", alerta_command),
+    ("resumen", resumen_command),
     ("help", help_command),
     ("compra", compra_command),
     ("venta", venta_command),
     ("ney", ney_command),
 ]:
-    app.add_handler(CommandHandler(name, handler))
+    app.add_handler(CommandHandler(name, metrics.track_command(name, handler)))
 
-app.job_queue.run_repeating(monitor_job, interval=300, first=0)
+app.job_queue.run_repeating(monitor_job, interval=config.MONITOR_INTERVAL, first=0)
+app.job_queue.run_repeating(
+    news_feed.refresh_job, interval=config.NEWS_FEED_INTERVAL, first=5
+)
+app.job_queue.run_repeating(
+    flush_history_job, interval=config.HISTORY_FLUSH_INTERVAL, first=0
+)
 
 if __name__ == "__main__":
     app.run_polling()
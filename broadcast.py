@@ -0,0 +1,242 @@
+# broadcast.py
+"""
+Envío concurrente de señales a muchos suscriptores respetando los
+límites de Telegram (global y por chat), con reintentos en RetryAfter,
+prioridad por suscriptor y estadísticas de latencia.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import statistics
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+import config
+
+
+class TokenBucket:
+    """
+    Token bucket por reserva: cada `reserve()` consume un token (aunque
+    quede en negativo) y devuelve cuánto hay que esperar. Así varias
+    corrutinas se reparten el ritmo sin necesidad de locks.
+    """
+
+    def __init__(self, rate: float, burst: float = 1, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._clock = clock
+        self._updated = clock()
+
+    def reserve(self) -> float:
+        now = self._clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def full(self) -> bool:
+        """Sin deuda pendiente: equivale a un bucket recién creado."""
+        refill = self.tokens + (self._clock() - self._updated) * self.rate
+        return refill >= self.burst
+
+    def pause(self, seconds: float):
+        """Bloquea el bucket `seconds` segundos (p. ej. tras un RetryAfter)."""
+        self.reserve()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+@dataclass(order=True)
+class Delivery:
+    """
+    Mensajes para un chat, en orden. Cada mensaje es (método del Bot,
+    kwargs), p. ej. ("send_photo", {"photo": png}). Menor `priority`
+    sale antes.
+    """
+
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    messages: list = field(compare=False)
+
+
+class FileIdCache:
+    """
+    Caché por contenido de las fotos ya subidas: sha256 del PNG → file_id
+    de Telegram. La primera subida de una imagen manda los bytes; las
+    demás (aunque vayan en paralelo) esperan a esa y envían el file_id.
+    """
+
+    def __init__(self, maxsize: int = None):
+        self.maxsize = maxsize or config.CHART_CACHE_SIZE
+        self._ids: OrderedDict[str, str] = OrderedDict()
+        self._pending: dict[str, asyncio.Future] = {}
+        self.uploads = 0
+        self.reused = 0
+
+    async def send_photo(self, send, photo: bytes, **kwargs):
+        """`send(photo=...)` es la llamada al Bot (ya con chat_id y límites)."""
+        digest = hashlib.sha256(photo).hexdigest()
+        file_id = self._ids.get(digest)
+        while file_id is None and digest in self._pending:
+            file_id = await asyncio.shield(self._pending[digest])
+        if file_id is not None:
+            self._ids.move_to_end(digest)
+            self.reused += 1
+            return await send(photo=file_id, **kwargs)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[digest] = fut
+        try:
+            msg = await send(photo=photo, **kwargs)
+        except BaseException:
+            fut.set_result(None)  # los que esperaban suben los bytes ellos mismos
+            raise
+        else:
+            photos = getattr(msg, "photo", None)
+            file_id = photos[-1].file_id if photos else None
+            fut.set_result(file_id)
+            self.uploads += 1
+            if file_id is not None:
+                self._ids[digest] = file_id
+                while len(self._ids) > self.maxsize:
+                    self._ids.popitem(last=False)
+            return msg
+        finally:
+            del self._pending[digest]
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        bot,
+        concurrency: int = None,
+        global_rate: float = None,
+        per_chat_rate: float = None,
+        per_chat_burst: int = None,
+        max_retries: int = 3,
+    ):
+        self.bot = bot
+        self.concurrency = concurrency or config.BROADCAST_CONCURRENCY
+        self.global_bucket = TokenBucket(
+            global_rate or config.BROADCAST_GLOBAL_RATE,
+            burst=global_rate or config.BROADCAST_GLOBAL_RATE,
+        )
+        self._chat_rate = per_chat_rate or config.BROADCAST_PER_CHAT_RATE
+        self._chat_burst = per_chat_burst or config.BROADCAST_PER_CHAT_BURST
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self.max_retries = max_retries
+        self._seq = itertools.count()
+        self.photos = FileIdCache()
+        self.last_stats: dict = {}
+
+    def delivery(self, chat_id: int, messages: list, priority: int = 0) -> Delivery:
+        return Delivery(priority, next(self._seq), chat_id, messages)
+
+    def _evict_idle_buckets(self):
+        """
+        Olvida los buckets de chat ya llenos: uno nuevo se comporta igual,
+        y así el dict no crece con cada chat al que se ha escrito alguna vez.
+        """
+        self._chat_buckets = {
+            cid: b for cid, b in self._chat_buckets.items() if not b.full()
+        }
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self._chat_rate, burst=self._chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _send(self, chat_id: int, method: str, kwargs: dict, counters: dict):
+        # Las fotos en bytes pasan por la caché de file_id
+        if method == "send_photo" and isinstance(kwargs.get("photo"), bytes):
+            kwargs = dict(kwargs)
+            photo = kwargs.pop("photo")
+
+            async def send(**kw):
+                return await self._call(chat_id, method, kw, counters)
+
+            return await self.photos.send_photo(send, photo, **kwargs)
+        return await self._call(chat_id, method, kwargs, counters)
+
+    async def _call(self, chat_id: int, method: str, kwargs: dict, counters: dict):
+        for attempt in range(self.max_retries + 1):
+            await self._chat_bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                return await getattr(self.bot, method)(chat_id=chat_id, **kwargs)
+            except RetryAfter as e:
+                counters["retries"] += 1
+                wait = float(e.retry_after)
+                logging.warning(f"RetryAfter {wait}s enviando a {chat_id}")
+                # Telegram pide parar: frenamos todos los envíos, no solo este
+                self.global_bucket.pause(wait)
+                if attempt == self.max_retries:
+                    raise
+
+    async def _worker(self, heap: list, start: float, latencies: list, counters: dict):
+        while heap:
+            d = heapq.heappop(heap)
+            try:
+                for method, kwargs in d.messages:
+                    await self._send(d.chat_id, method, kwargs, counters)
+                latencies.append(time.monotonic() - start)
+                counters["sent"] += 1
+            except Forbidden as e:
+                counters["failed"] += 1
+                logging.info(f"Chat {d.chat_id} bloqueó el bot: {e}")
+            except TelegramError as e:
+                counters["failed"] += 1
+                logging.error(f"Error enviando a {d.chat_id}: {e}")
+            except Exception as e:
+                # Un fallo inesperado en un chat no corta el envío al resto
+                counters["failed"] += 1
+                logging.exception(f"Error inesperado enviando a {d.chat_id}: {e}")
+
+    async def broadcast(self, deliveries: list[Delivery]) -> dict:
+        """
+        Envía todas las entregas con como mucho `concurrency` chats a la
+        vez, por orden de prioridad. Devuelve (y guarda en `last_stats`)
+        las estadísticas de latencia del envío.
+        """
+        self._evict_idle_buckets()
+        heap = list(deliveries)
+        heapq.heapify(heap)
+        latencies: list[float] = []
+        counters = {"sent": 0, "failed": 0, "retries": 0}
+        uploads, reused = self.photos.uploads, self.photos.reused
+        start = time.monotonic()
+        workers = min(self.concurrency, len(heap))
+        await asyncio.gather(
+            *(self._worker(heap, start, latencies, counters) for _ in range(workers))
+        )
+        self.last_stats = {
+            **counters,
+            "photo_uploads": self.photos.uploads - uploads,
+            "photo_reused": self.photos.reused - reused,
+            "duration": time.monotonic() - start,
+            **latency_summary(latencies),
+        }
+        return self.last_stats
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    if not latencies:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    if len(latencies) == 1:
+        return {"p50": latencies[0], "p95": latencies[0], "max": latencies[0]}
+    q = statistics.quantiles(latencies, n=20, method="inclusive")
+    return {"p50": statistics.median(latencies), "p95": q[18], "max": max(latencies)}
@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from binance.client import Client
 
 # Carga variables de entorno desde .env
 load_dotenv()
@@ -11,10 +10,87 @@ BINANCE_API_SECRET = os.getenv("BINANCE_API_SECRET")
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 
 # Ficheros locales
-SUBSCRIBERS_FILE = "subscribers.txt"
+SUBSCRIBERS_FILE = "subscribers.txt"  # formato antiguo, solo para migrar
+DB_FILE = os.getenv("DB_FILE", "btc_bot.db")
+HISTORY_BUFFER_ROWS = 500  # filas de historial antes de escribir
+HISTORY_FLUSH_INTERVAL = 60  # segundos entre escrituras del historial
+EXPORT_SPOOL_BYTES = 1 << 20  # /historial: en memoria hasta 1MB, luego a disco
 
 # Parámetros de trading
 SYMBOL = "BTCUSDT"
-INTERVAL = Client.KLINE_INTERVAL_5MINUTE
+INTERVAL = "5m"  # Client.KLINE_INTERVAL_5MINUTE
 LIMIT = 100
 BUY_THRESHOLD = 0.97  # 3% por debajo → recompra
+MONITOR_INTERVAL = 300  # segundos entre ticks de monitor_job
+# /seguir: intervalos de Binance admitidos y pares por chat
+WATCH_INTERVALS = ("1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "12h", "1d")
+MAX_WATCHLIST = 5
+MAX_ALERTS = 20  # /alerta: alertas pendientes por chat
+# Envío por flancos (notify.py): solo cambios de señal, movimientos de
+# precio de al menos NOTIFY_PRICE_MOVE (fracción) y resúmenes (/resumen)
+EDGE_TRIGGERED = os.getenv("EDGE_TRIGGERED", "1") == "1"
+NOTIFY_PRICE_MOVE = 0.02
+
+# Stream de klines (websocket de Binance) y buffer en memoria
+STREAM_ENABLED = os.getenv("STREAM_ENABLED", "1") == "1"
+STREAM_URL = os.getenv("STREAM_URL", "wss://stream.binance.com:9443/ws")
+RING_SIZE = 500
+
+# Archivo local de velas cerradas (ver archive.py)
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "1") == "1"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/klines")
+
+# Timeouts HTTP (segundos) para Binance/CoinGecko
+HTTP_TIMEOUT = 10.0
+HTTP_CONNECT_TIMEOUT = 5.0
+
+# TTL de la caché de velas, como fracción del intervalo (5m → 5s)
+CACHE_TTL_FRACTION = 1 / 60
+
+# Procesos para renderizar gráficos (0 → hilo del executor por defecto)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+# Procesos que dibujan y envían cada uno su trozo de suscriptores
+# (shard.py); 0 = todo en el proceso del bot
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "0"))
+SHARD_TIMEOUT = 120  # segundos de espera por tick a los workers
+
+# Webhook de Telegram (webserver.py): con WEBHOOK_URL (URL pública base)
+# el bot no hace polling y un solo servidor aiohttp atiende Telegram,
+# salud y /metrics en PORT
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_PATH = "/telegram"
+# Descartar los updates recibidos mientras el bot estaba caído (como en
+# polling, por defecto se procesan)
+WEBHOOK_DROP_PENDING = os.getenv("WEBHOOK_DROP_PENDING", "0") == "1"
+PORT = int(os.getenv("PORT", "3000"))
+
+# Titulares (news_scraper): timeout por fuente y TTL de la caché (s)
+NEWS_SOURCE_TIMEOUT = 4.0
+NEWS_CACHE_TTL = 120
+
+# Sentimiento de noticias en segundo plano (news_feed.py): cada cuánto
+# se consultan titulares, cuántos por consulta y cuántos entran en la media
+NEWS_FEED_INTERVAL = 600
+NEWS_FEED_LIMIT = 10
+NEWS_FEED_WINDOW = 30
+
+# Traducción de titulares: caché persistente y tamaño de lote
+TRANSLATION_CACHE_FILE = os.getenv("TRANSLATION_CACHE_FILE", "translations.json")
+TRANSLATION_CACHE_SIZE = 5000
+TRANSLATION_BATCH_SIZE = 16
+
+# Inferencia de sentimiento: tamaño de lote y de la caché LRU
+SENTIMENT_BATCH_SIZE = 16
+SENTIMENT_CACHE_SIZE = 1024
+
+# Arranque: precarga de modelos en segundo plano y presupuesto de import
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+IMPORT_BUDGET_S = 1.5
+
+# Difusión de señales: chats en paralelo y límites de Telegram (msg/s)
+BROADCAST_CONCURRENCY = 50
+BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", "30"))
+BROADCAST_PER_CHAT_RATE = 1.0
+BROADCAST_PER_CHAT_BURST = 2
+CHART_CACHE_SIZE = 4096  # file_id de gráficos ya subidos
@@ -0,0 +1,68 @@
+# data_cache.py
+"""
+Caché TTL asíncrona con coalescencia de peticiones (single-flight):
+si varios handlers piden la misma clave a la vez, solo se lanza una
+descarga y el resto espera a ese mismo resultado.
+"""
+
+import asyncio
+import time
+
+# Segundos por unidad de los intervalos de Binance ("5m", "1h", "1d"...)
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800, "M": 2592000}
+
+
+def interval_seconds(interval: str) -> int:
+    return int(interval[:-1]) * _UNIT_SECONDS[interval[-1]]
+
+
+class SingleFlightCache:
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._entries = {}  # clave -> (caduca, valor)
+        self._inflight = {}  # clave -> Future de la descarga en curso
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, key, ttl: float, fetch):
+        """
+        Devuelve el valor de `key` si no ha caducado; si no, espera a la
+        descarga en curso o lanza `fetch()` (corrutina). Los errores se
+        propagan a todos los que esperaban y no se guardan.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self._clock():
+            self.hits += 1
+            return entry[1]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # Marca la excepción como recuperada si nadie más esperaba
+            fut.exception()
+            raise
+        else:
+            self._entries[key] = (self._clock() + ttl, value)
+            fut.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,148 @@
+# delivery.py
+"""
+Gráficos y mensajes de un tick. El bot decide a quién hay que enviar
+(estado, historial y flancos, ver bot.monitor_tick) y aquí solo se dibuja
+y se arma cada entrega, así que sirve igual en el proceso del bot que en
+los workers de shard.py.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+import metrics
+import plotter
+
+TECH_MAP = {
+    "COMPRA": "- SMA9↑ sobre SMA21\n- MACD > señal\n- RSI < 70",
+    "VENTA": "- SMA9↓ bajo SMA21\n- MACD < señal\n- RSI > 30",
+    "RECOMPRA": "- Precio cayó >3%\n- RSI < 35 (sobreventa)",
+}
+
+
+@dataclass
+class PairWork:
+    """
+    Lo que hay que dibujar y enviar de un par en un tick. `lasts`,
+    `signals` y `purchase_pos` (alineados con `cids`) solo existen para
+    el par principal, el único con precio de compra.
+    """
+
+    pair: tuple[str, str]
+    snap: object  # strategy.MarketSnapshot
+    cids: list[int]
+    lasts: np.ndarray | None = None
+    signals: np.ndarray | None = None
+    purchase_pos: np.ndarray | None = None
+
+    @property
+    def is_default(self) -> bool:
+        return self.lasts is not None
+
+    def take(self, idx: list[int]) -> "PairWork":
+        """Sub-trabajo con los chats en las posiciones `idx`."""
+        idx = np.asarray(idx, dtype=int)
+
+        def pick(a):
+            return None if a is None else a[idx]
+
+        return PairWork(
+            self.pair,
+            self.snap,
+            [self.cids[i] for i in idx],
+            pick(self.lasts),
+            pick(self.signals),
+            pick(self.purchase_pos),
+        )
+
+
+async def build(broadcaster, work: PairWork, ts: str, ia_sent: str) -> list:
+    if not work.cids:
+        return []
+    if work.is_default:
+        return await _btc_deliveries(broadcaster, work, ts, ia_sent)
+    return await _pair_deliveries(broadcaster, work, ts)
+
+
+async def _btc_deliveries(broadcaster, work: PairWork, ts: str, ia_sent) -> list:
+    """Entregas del par principal: con precio de compra."""
+    df, snap = work.snap.df, work.snap
+    price = snap.close
+
+    # 1️⃣ Gráficos: capa común una vez y líneas de cada suscriptor,
+    # renderizados en el pool de procesos. El precio se redondea al
+    # centavo (lo que muestra la leyenda) para que suscriptores con el
+    # mismo nivel compartan imagen y, al enviar, el file_id subido.
+    overlays = [
+        (round(float(last), 2), df.index[pos])
+        for last, pos in zip(work.lasts, work.purchase_pos)
+    ]
+    with metrics.stage("render"):
+        charts = await plotter.render_many(df, overlays)
+
+    deliveries = []
+    for cid, last, sig, chart in zip(work.cids, work.lasts, work.signals, charts):
+        du, dp = price - last, (price - last) / last * 100
+
+        # 2️⃣ Análisis técnico
+        target = last * 1.02
+        stop = last * 0.98
+        potential = (target - price) / price * 100
+        tech_exp = TECH_MAP.get(sig, "")
+
+        # 4️⃣ Construir mensaje
+        msg = (
+            f"🚨 *Señal BTC: {sig or 'Monitoreo'}* ({ts})\n\n"
+            f"💲 Precio: ${price:.2f}\n"
+            f"📌 Compra: ${last:.2f}\n"
+            f"📈 Cambio: {du:+.2f} USD ({dp:+.2f}%)\n\n"
+            f"🔼 Máx recom. venta: ${target:.2f}\n"
+            f"🔽 Mín recom. compra: ${stop:.2f}\n"
+            f"💡 Potencial: {potential:.2f}%\n\n"
+            f"📝 Explicación técnica:\n{tech_exp}\n\n"
+            f"🤖 IA dice: {ia_sent}"
+        )
+
+        # Los chats con señal van antes que los de "Monitoreo"
+        deliveries.append(
+            broadcaster.delivery(
+                cid,
+                [
+                    ("send_photo", {"photo": chart}),
+                    ("send_message", {"text": msg, "parse_mode": "Markdown"}),
+                ],
+                priority=0 if sig else 1,
+            )
+        )
+    return deliveries
+
+
+async def _pair_deliveries(broadcaster, work: PairWork, ts: str) -> list:
+    """
+    Entregas de un par de la lista de seguimiento: el precio de compra y
+    el historial solo existen para el par principal, así que todos los
+    chats del par comparten gráfico y mensaje.
+    """
+    (sym, iv), snap = work.pair, work.snap
+    sig = snap.signal
+    with metrics.stage("render"):
+        (chart,) = await plotter.render_many(
+            snap.df, [(None, None)], title=f"Señal de {sym}", interval=iv
+        )
+    msg = (
+        f"🚨 *Señal {sym} {iv}: {sig or 'Monitoreo'}* ({ts})\n\n"
+        f"💲 Precio: {snap.close:.6g}\n"
+        f"📊 RSI: {snap.rsi:.1f}\n\n"
+        f"📝 Explicación técnica:\n{TECH_MAP.get(sig, '')}"
+    )
+    return [
+        broadcaster.delivery(
+            cid,
+            [
+                ("send_photo", {"photo": chart}),
+                ("send_message", {"text": msg, "parse_mode": "Markdown"}),
+            ],
+            priority=0 if sig else 1,
+        )
+        for cid in work.cids
+    ]
@@ -0,0 +1,264 @@
+# indicators.py
+"""
+Motor de indicadores incremental: mismas SMA/RSI/MACD/Bollinger que
+`strategy.add_indicators` (librería `ta`), pero actualizados en O(1) por
+vela cerrada en vez de recalcular toda la ventana.
+
+`batch_indicators` calcula lo mismo para muchos pares a la vez, sobre
+una matriz de cierres (una fila por par).
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+
+NAN = float("nan")
+
+# Cada cuántas actualizaciones se recalculan las sumas de las ventanas
+# desde cero, para que el error de redondeo no se acumule.
+_RESYNC_EVERY = 1000
+
+
+class RollingWindow:
+    """
+    Ventana deslizante con suma y suma de cuadrados acumuladas.
+    Los valores se guardan desplazados por `ref` para reducir la
+    cancelación numérica en la varianza con precios ~1e5.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.ref = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._updates = 0
+
+    def push(self, x: float):
+        if self.ref is None:
+            self.ref = x
+        v = x - self.ref
+        if len(self.values) == self.window:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(v)
+        self.total += v
+        self.total_sq += v * v
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(v * v for v in self.values)
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) == self.window
+
+    def mean(self) -> float:
+        if not self.ready:
+            return NAN
+        return self.ref + self.total / self.window
+
+    def std(self) -> float:
+        """Desviación típica poblacional (ddof=0), como `ta`."""
+        if not self.ready:
+            return NAN
+        m = self.total / self.window
+        return math.sqrt(max(self.total_sq / self.window - m * m, 0.0))
+
+
+class EMA:
+    """
+    Media exponencial recursiva, equivalente a
+    `Series.ewm(alpha=..., adjust=False, min_periods=...)`.
+    """
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.count = 0
+
+    @classmethod
+    def from_span(cls, span: int) -> "EMA":
+        return cls(2.0 / (span + 1), span)
+
+    def push(self, x: float):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        self.count += 1
+
+    def get(self) -> float:
+        if self.count < self.min_periods:
+            return NAN
+        return self.value
+
+
+class StreamingIndicators:
+    """
+    Indicadores de `strategy` mantenidos vela a vela.
+
+    Se siembra una vez con el histórico (`seed`) y después se le pasa
+    cada vela cerrada con `update`. `values()` devuelve un dict con las
+    mismas claves que las columnas de `strategy.add_indicators`.
+
+    La alimenta el stream de klines (`market_data.MarketDataService`)
+    con cada vela que cierra.
+    """
+
+    def __init__(
+        self,
+        sma_fast: int = 9,
+        sma_slow: int = 21,
+        rsi_window: int = 14,
+        macd_fast: int = 12,
+        macd_slow: int = 26,
+        macd_sign: int = 9,
+        bb_window: int = 20,
+        bb_dev: float = 2,
+    ):
+        self._fast = RollingWindow(sma_fast)
+        self._slow = RollingWindow(sma_slow)
+        self._bb = RollingWindow(bb_window)
+        self._bb_dev = bb_dev
+        self._rsi_up = EMA(1.0 / rsi_window, rsi_window)
+        self._rsi_dn = EMA(1.0 / rsi_window, rsi_window)
+        self._ema_fast = EMA.from_span(macd_fast)
+        self._ema_slow = EMA.from_span(macd_slow)
+        self._macd_sig = EMA.from_span(macd_sign)
+        self._prev_close = None
+        self.close = NAN
+        self.count = 0
+
+    def seed(self, closes) -> dict:
+        """Alimenta el histórico de cierres (de más antiguo a más nuevo)."""
+        for c in closes:
+            self.update(c)
+        return self.values()
+
+    def update(self, close: float) -> dict:
+        """Incorpora una vela cerrada y devuelve los indicadores actuales."""
+        close = float(close)
+        self._fast.push(close)
+        self._slow.push(close)
+        self._bb.push(close)
+
+        # RSI de Wilder; la primera vela cuenta como diferencia 0, igual que `ta`
+        diff = 0.0 if self._prev_close is None else close - self._prev_close
+        self._rsi_up.push(diff if diff > 0 else 0.0)
+        self._rsi_dn.push(-diff if diff < 0 else 0.0)
+
+        # MACD: la señal se siembra con el primer MACD válido
+        self._ema_fast.push(close)
+        self._ema_slow.push(close)
+        macd = self._ema_fast.get() - self._ema_slow.get()
+        if not math.isnan(macd):
+            self._macd_sig.push(macd)
+
+        self._prev_close = close
+        self.close = close
+        self.count += 1
+        return self.values()
+
+    def rsi(self) -> float:
+        up, dn = self._rsi_up.get(), self._rsi_dn.get()
+        if math.isnan(dn):
+            return NAN
+        if dn == 0:
+            return 100.0
+        return 100 - 100 / (1 + up / dn)
+
+    def values(self) -> dict:
+        mavg, mstd = self._bb.mean(), self._bb.std()
+        return {
+            "close": self.close,
+            "sma_fast": self._fast.mean(),
+            "sma_slow": self._slow.mean(),
+            "rsi": self.rsi(),
+            "macd": self._ema_fast.get() - self._ema_slow.get(),
+            "macd_sig": self._macd_sig.get(),
+            "bb_hi": mavg + self._bb_dev * mstd,
+            "bb_lo": mavg - self._bb_dev * mstd,
+        }
+
+
+# — Versión por lotes (2-D) —
+def _rolling(closes: np.ndarray, window: int):
+    """Media y desviación (ddof=0) móviles por fila; NaN hasta llenar."""
+    mean = np.full(closes.shape, np.nan)
+    std = np.full(closes.shape, np.nan)
+    if closes.shape[1] >= window:
+        view = np.lib.stride_tricks.sliding_window_view(closes, window, axis=1)
+        mean[:, window - 1 :] = view.mean(axis=-1)
+        std[:, window - 1 :] = view.std(axis=-1)
+    return mean, std
+
+
+def _ewm(x: np.ndarray, alpha: float, min_periods: int, start=None) -> np.ndarray:
+    """
+    `ewm(alpha, adjust=False, min_periods)` por filas. `start[i]` es el
+    primer índice válido de la fila i (lo anterior es NaN y se ignora).
+    """
+    rows, n = x.shape
+    start = np.zeros(rows, dtype=int) if start is None else start
+    out = np.full(x.shape, np.nan)
+    value = np.full(rows, np.nan)
+    for t in range(n):
+        first = start == t
+        value[first] = x[first, t]
+        later = start < t
+        value[later] += alpha * (x[later, t] - value[later])
+        ok = t - start + 1 >= min_periods
+        out[ok, t] = value[ok]
+    return out
+
+
+def batch_indicators(
+    closes,
+    sma_fast: int = 9,
+    sma_slow: int = 21,
+    rsi_window: int = 14,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_sign: int = 9,
+    bb_window: int = 20,
+    bb_dev: float = 2,
+) -> dict:
+    """
+    Indicadores de `strategy.add_indicators` para una matriz de cierres
+    (pares × velas, misma longitud). Devuelve un dict columna → matriz.
+    """
+    closes = np.asarray(closes, dtype=float)
+    fast, _ = _rolling(closes, sma_fast)
+    slow, _ = _rolling(closes, sma_slow)
+    mavg, mstd = _rolling(closes, bb_window)
+
+    # RSI de Wilder; la primera vela cuenta como diferencia 0, igual que `ta`
+    diff = np.zeros(closes.shape)
+    diff[:, 1:] = np.diff(closes, axis=1)
+    up = _ewm(np.where(diff > 0, diff, 0.0), 1.0 / rsi_window, rsi_window)
+    dn = _ewm(np.where(diff < 0, -diff, 0.0), 1.0 / rsi_window, rsi_window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(dn == 0, 100.0, 100 - 100 / (1 + up / dn))
+    rsi[np.isnan(dn)] = np.nan
+
+    # MACD: la señal se siembra con el primer MACD válido
+    macd = _ewm(closes, 2.0 / (macd_fast + 1), macd_fast) - _ewm(
+        closes, 2.0 / (macd_slow + 1), macd_slow
+    )
+    first = np.full(len(closes), max(macd_fast, macd_slow) - 1)
+    sig = _ewm(np.nan_to_num(macd), 2.0 / (macd_sign + 1), macd_sign, first)
+
+    return {
+        "close": closes,
+        "sma_fast": fast,
+        "sma_slow": slow,
+        "rsi": rsi,
+        "macd": macd,
+        "macd_sig": sig,
+        "bb_hi": mavg + bb_dev * mstd,
+        "bb_lo": mavg - bb_dev * mstd,
+    }
@@ -1,5 +1,8 @@
-from bot import app
-from flask import Flask
+from bot import app, health
+from flask import Flask, Response
+import asyncio
+import config
+import metrics
 import threading
 
 # Crea un pequeño servidor web
@@ -7,14 +10,24 @@ web_app = Flask('')
 
 @web_app.route('/')
 def home():
-    return "Bot de BTC activo ✅"
+    return health()
 
-def run_web():
-    web_app.run(host='0.0.0.0', port=3000)
+@web_app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
-# Lanza Flask en un hilo aparte
-threading.Thread(target=run_web).start()
+def run_web():
+    web_app.run(host='0.0.0.0', port=config.PORT)
 
+# Solo en el proceso principal: los workers de shard.py (spawn) vuelven a
+# importar este módulo y no deben abrir otro servidor
 if __name__ == "__main__":
-    # Arranca el bot (polling) y mantiene el loop abierto
-    app.run_polling()
+    if config.WEBHOOK_URL:
+        # Webhook: un solo servidor asyncio para Telegram, salud y métricas
+        import webserver
+        asyncio.run(webserver.serve(app))
+    else:
+        # Lanza Flask en un hilo aparte
+        threading.Thread(target=run_web, daemon=True).start()
+        # Arranca el bot (polling) y mantiene el loop abierto
+        app.run_polling()
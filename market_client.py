@@ -0,0 +1,84 @@
+# market_client.py
+"""
+Cliente HTTP asíncrono para los datos de mercado (Binance y CoinGecko).
+Una sola sesión con pool de conexiones keep-alive y timeouts explícitos,
+para que los handlers de Telegram nunca bloqueen el loop en red.
+"""
+
+import httpx
+
+import config
+
+BINANCE_URL = "https://api.binance.com"
+COINGECKO_URL = "https://api.coingecko.com/api/v3"
+
+
+class AsyncMarketClient:
+    def __init__(
+        self, timeout: float = None, connect_timeout: float = None, transport=None
+    ):
+        # `transport` permite servir las respuestas en proceso (tests, bench.py)
+        self._http = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(
+                timeout or config.HTTP_TIMEOUT,
+                connect=connect_timeout or config.HTTP_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=20,
+                max_keepalive_connections=10,
+                keepalive_expiry=60,
+            ),
+            headers={"User-Agent": "btc_bot"},
+        )
+
+    async def get_klines(
+        self,
+        symbol: str,
+        interval: str,
+        limit: int,
+        start_ms: int = None,
+        end_ms: int = None,
+    ) -> list:
+        """
+        Klines crudas de /api/v3/klines (sin rango, la última es la vela
+        en formación). `start_ms`/`end_ms` filtran por open_time.
+        """
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_ms is not None:
+            params["startTime"] = int(start_ms)
+        if end_ms is not None:
+            params["endTime"] = int(end_ms)
+        r = await self._http.get(f"{BINANCE_URL}/api/v3/klines", params=params)
+        r.raise_for_status()
+        return r.json()
+
+    async def get_coingecko_prices(self, days: int = 1) -> list:
+        """Precios minuto a minuto de BTC en CoinGecko: [[ts, price], ...]."""
+        r = await self._http.get(
+            f"{COINGECKO_URL}/coins/bitcoin/market_chart",
+            params={"vs_currency": "usd", "days": days, "interval": "minute"},
+        )
+        r.raise_for_status()
+        return r.json().get("prices", [])
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+_client: AsyncMarketClient | None = None
+
+
+def get_client() -> AsyncMarketClient:
+    """Cliente compartido; se crea la primera vez que se usa."""
+    global _client
+    if _client is None:
+        _client = AsyncMarketClient()
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
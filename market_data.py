@@ -0,0 +1,297 @@
+# market_data.py
+"""
+Servicio de datos de mercado en memoria: un buffer circular de velas
+cerradas más la vela en formación, mantenido al día por el stream de
+klines de Binance. `strategy.get_data` lee de aquí cuando está listo.
+Los indicadores de la última vela cerrada se actualizan vela a vela con
+`indicators.StreamingIndicators`, sin recalcular la ventana.
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import websockets
+
+import config
+import data_cache
+import indicators
+
+# Columnas del buffer (mismo orden que usa el DataFrame de get_data)
+FIELDS = ["open_time", "close_time", "open", "high", "low", "close", "volume"]
+_IDX = {name: i for i, name in enumerate(FIELDS)}
+
+
+class KlineRing:
+    """
+    Buffer circular de tamaño fijo con las últimas velas cerradas y la
+    vela en formación aparte. Todas las lecturas son copias en memoria.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros((capacity, len(FIELDS)))
+        self._start = 0
+        self._size = 0
+        self.live = None  # fila de la vela en formación, o None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _pos(self, i: int) -> int:
+        return (self._start + i) % self.capacity
+
+    def last_open_time(self) -> float | None:
+        if not self._size:
+            return None
+        return self._data[self._pos(self._size - 1), _IDX["open_time"]]
+
+    def push_closed(self, row):
+        """Añade una vela cerrada; si ya existe (mismo open_time) la sustituye."""
+        row = np.asarray(row, dtype=float)
+        last = self.last_open_time()
+        if last is not None and row[_IDX["open_time"]] < last:
+            return  # vela antigua (p. ej. repetida tras reconectar)
+        if last == row[_IDX["open_time"]]:
+            self._data[self._pos(self._size - 1)] = row
+        elif self._size < self.capacity:
+            self._data[self._pos(self._size)] = row
+            self._size += 1
+        else:
+            self._data[self._start] = row
+            self._start = (self._start + 1) % self.capacity
+        if (
+            self.live is not None
+            and self.live[_IDX["open_time"]] <= row[_IDX["open_time"]]
+        ):
+            self.live = None
+
+    def set_live(self, row):
+        row = np.asarray(row, dtype=float)
+        last = self.last_open_time()
+        if last is not None and row[_IDX["open_time"]] <= last:
+            return  # ya cerrada
+        self.live = row
+
+    def rows(self, limit: int, include_live: bool = True) -> np.ndarray:
+        """Devuelve las últimas `limit` velas (la viva al final si la hay)."""
+        order = (self._start + np.arange(self._size)) % self.capacity
+        data = self._data[order]
+        if include_live and self.live is not None:
+            data = np.vstack([data, self.live])
+        return data[-limit:]
+
+    def to_frame(self, limit: int, include_live: bool = True) -> pd.DataFrame:
+        return rows_to_frame(self.rows(limit, include_live))
+
+
+def rows_to_frame(data: np.ndarray) -> pd.DataFrame:
+    """Mismo formato que `strategy.get_data`: índice close_time y OHLCV."""
+    df = pd.DataFrame(data[:, 2:], columns=FIELDS[2:])
+    df.index = pd.to_datetime(data[:, _IDX["close_time"]], unit="ms")
+    return df
+
+
+def rest_row(kline: list) -> list[float]:
+    """Convierte una kline REST de Binance (lista) a fila del buffer."""
+    return [
+        float(kline[0]),
+        float(kline[6]),
+        float(kline[1]),
+        float(kline[2]),
+        float(kline[3]),
+        float(kline[4]),
+        float(kline[5]),
+    ]
+
+
+def stream_row(k: dict) -> list[float]:
+    """Convierte el campo `k` de un evento kline del websocket a fila."""
+    return [
+        float(k["t"]),
+        float(k["T"]),
+        float(k["o"]),
+        float(k["h"]),
+        float(k["l"]),
+        float(k["c"]),
+        float(k["v"]),
+    ]
+
+
+class MarketDataService:
+    """
+    Mantiene un `KlineRing` vivo: se siembra por REST una vez (con la
+    corrutina `fetch_history(limit)`) y después
+    consume el stream `<symbol>@kline_<interval>` de Binance. Si se cae
+    la conexión, reconecta y vuelve a sembrar para tapar el hueco.
+
+    Con un `archive` (`archive.KlineArchive`) la siembra parte de las
+    velas archivadas y solo pide por REST las que faltan; las velas que
+    cierran en el stream se van archivando.
+
+    Cada función de `listeners` recibe el cierre de cada mensaje del
+    stream (p. ej. las alertas de precio de bot.py); deben ser rápidas.
+
+    `indicators()` da los indicadores de la última vela cerrada: se
+    siembran con el buffer y después avanzan una vela por cierre.
+    """
+
+    def __init__(
+        self,
+        fetch_history,
+        symbol: str = None,
+        interval: str = None,
+        capacity: int = None,
+        url: str = None,
+        archive=None,
+    ):
+        self.symbol = symbol or config.SYMBOL
+        self.interval = interval or config.INTERVAL
+        self.ring = KlineRing(capacity or config.RING_SIZE)
+        self.url = url or config.STREAM_URL
+        self._fetch_history = fetch_history
+        self.archive = archive
+        self.listeners: list = []
+        self._engine = None
+        self._task = None
+        self.ready = False
+
+    @property
+    def stream_url(self) -> str:
+        return f"{self.url}/{self.symbol.lower()}@kline_{self.interval}"
+
+    def frame(self, limit: int) -> pd.DataFrame:
+        return self.ring.to_frame(limit)
+
+    def indicators(self) -> dict | None:
+        """Indicadores de la última vela cerrada (claves de `add_indicators`)."""
+        return None if self._engine is None else self._engine.values()
+
+    def _reseed_indicators(self):
+        closed = self.ring.rows(self.ring.capacity, include_live=False)
+        self._engine = indicators.StreamingIndicators()
+        self._engine.seed(closed[:, _IDX["close"]])
+
+    def _push_closed(self, row):
+        """Cierra una vela en el buffer y avanza los indicadores."""
+        last = self.ring.last_open_time()
+        self.ring.push_closed(row)
+        if self._engine is None:
+            return
+        if last is None or row[_IDX["open_time"]] > last:
+            self._engine.update(row[_IDX["close"]])
+        elif row[_IDX["open_time"]] == last:
+            # La misma vela corregida: no se puede deshacer una actualización
+            self._reseed_indicators()
+
+    def on_message(self, raw):
+        msg = json.loads(raw)
+        # Los streams combinados envuelven el evento en {"stream", "data"}
+        msg = msg.get("data", msg)
+        if msg.get("e") != "kline":
+            return
+        k = msg["k"]
+        row = stream_row(k)
+        if k["x"]:
+            self._push_closed(row)
+            self._archive([row])
+        else:
+            self.ring.set_live(row)
+        for fn in self.listeners:
+            try:
+                fn(row[_IDX["close"]])
+            except Exception as e:
+                logging.error(f"Error en listener de precio: {e}")
+
+    def _archive(self, rows):
+        if self.archive is None or not rows:
+            return
+        try:
+            self.archive.write(self.symbol, self.interval, rows)
+        except OSError as e:
+            logging.error(f"Error archivando velas: {e}")
+
+    def _missing(self) -> int:
+        """Velas a pedir por REST: desde la última archivada hasta la viva."""
+        if self.archive is None:
+            return self.ring.capacity
+        for row in self.archive.tail(self.symbol, self.interval, self.ring.capacity):
+            self.ring.push_closed(row)
+        last = self.ring.last_open_time()
+        if last is None:
+            return self.ring.capacity
+        step = data_cache.interval_seconds(self.interval) * 1000
+        behind = int(time.time() * 1000 - last) // step + 1
+        return max(2, min(self.ring.capacity, behind))
+
+    async def seed(self):
+        klines = await self._fetch_history(self._missing())
+        # La última kline REST es la que está en formación
+        closed = [rest_row(k) for k in klines[:-1]]
+        for row in closed:
+            self.ring.push_closed(row)
+        if klines:
+            self.ring.set_live(rest_row(klines[-1]))
+        self._archive(closed)
+        # Tras (re)conectar puede haber un hueco: se siembra de nuevo
+        self._reseed_indicators()
+
+    async def run(self):
+        delay = 1
+        while True:
+            try:
+                async with websockets.connect(self.stream_url) as ws:
+                    await self.seed()
+                    self.ready = True
+                    delay = 1
+                    logging.info(f"Kline stream conectado: {self.stream_url}")
+                    async for raw in ws:
+                        self.on_message(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Kline stream error ({e}); reintento en {delay}s")
+            self.ready = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.ready = False
+
+
+_service: MarketDataService | None = None
+
+
+def start_service(fetch_history, **kwargs) -> MarketDataService:
+    """Arranca el servicio global en el loop actual."""
+    global _service
+    _service = MarketDataService(fetch_history, **kwargs)
+    _service.start()
+    return _service
+
+
+async def stop_service():
+    global _service
+    if _service is not None:
+        await _service.stop()
+        _service = None
+
+
+def get_service() -> MarketDataService | None:
+    """Servicio activo si está conectado y sembrado; si no, None."""
+    if _service is not None and _service.ready:
+        return _service
+    return None
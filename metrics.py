@@ -0,0 +1,264 @@
+# metrics.py
+"""
+Métricas del bot en formato de texto de Prometheus (sin dependencias):
+histogramas de latencia por etapa del tick y por comando, duración del
+tick, suscriptores y contadores de origen de datos, caché y envíos.
+`render()` genera el cuerpo de /metrics (ver main.py).
+
+Se escriben desde el loop del bot y se leen desde el hilo de Flask, así
+que cada métrica protege sus valores con un lock.
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry: list = []
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and self.kind != "histogram":
+            self._values[()] = 0  # visible en /metrics desde el arranque
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def drain(self) -> dict:
+        """Valores acumulados desde el último drain (ver `drain()`)."""
+        return {}
+
+    def merge(self, values: dict):
+        pass
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def drain(self) -> dict:
+        with self._lock:
+            values = {k: v for k, v in self._values.items() if v}
+            self._values = {k: 0 for k in self._values}
+        return values
+
+    def merge(self, values: dict):
+        with self._lock:
+            for key, v in values.items():
+                self._values[key] = self._values.get(key, 0) + v
+
+    def lines(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def drain(self) -> dict:
+        return {}  # un nivel, no algo acumulado: no se suma entre procesos
+
+
+class CounterFunc(Counter):
+    """
+    Contador que ya lleva otro objeto: `fn()` devuelve {etiqueta: total}
+    y se lee al generar /metrics. Así este módulo no importa a quien los
+    cuenta (ver `strategy.cache_stats`).
+    """
+
+    def __init__(self, name: str, help: str, label: str):
+        super().__init__(name, help, (label,))
+        self._fn = None
+
+    def set_function(self, fn):
+        self._fn = fn
+
+    def drain(self) -> dict:
+        return {}
+
+    def lines(self) -> list[str]:
+        if self._fn is not None:
+            with self._lock:
+                self._values = {(str(k),): v for k, v in self._fn().items()}
+        return super().lines()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def drain(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict):
+        with self._lock:
+            for key, (counts, total) in values.items():
+                mine, my_total = self._values.get(key, ([0] * len(counts), 0.0))
+                merged = [a + b for a, b in zip(mine, counts)]
+                self._values[key] = (merged, my_total + total)
+
+    def count(self, **labels) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+        return counts[-1]
+
+    def lines(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        out = []
+        for key, (counts, total) in items:
+            for b, c in zip(self.buckets, counts):
+                le = _labels(self.labelnames, key, f'le="{_fmt(b)}"')
+                out.append(f"{self.name}_bucket{le} {c}")
+            lbl = _labels(self.labelnames, key)
+            out.append(f"{self.name}_sum{lbl} {_fmt(total)}")
+            out.append(f"{self.name}_count{lbl} {counts[-1]}")
+        return out
+
+
+def render() -> str:
+    """Todas las métricas en formato de texto de Prometheus (0.0.4)."""
+    lines = []
+    for m in _registry:
+        lines += m.header() + m.lines()
+    return "\n".join(lines) + "\n"
+
+
+def drain() -> dict:
+    """
+    Lo acumulado en este proceso desde la última llamada, por métrica, y
+    lo pone a cero. Los workers de shard.py lo mandan al coordinador con
+    cada tick y este lo suma a las suyas con `merge`.
+    """
+    return {m.name: values for m in _registry if (values := m.drain())}
+
+
+def merge(dump: dict):
+    by_name = {m.name: m for m in _registry}
+    for name, values in dump.items():
+        if name in by_name:
+            by_name[name].merge(values)
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# — Métricas del bot —
+STAGE_SECONDS = Histogram(
+    "btc_bot_stage_seconds",
+    "Duración de cada etapa (fetch, indicators, evaluate, render, sentiment, send)",
+    labels=("stage",),
+)
+TICK_SECONDS = Histogram(
+    "btc_bot_tick_seconds", "Duración de un tick de monitor_job (sin la espera)"
+)
+COMMAND_SECONDS = Histogram(
+    "btc_bot_command_seconds", "Duración de los comandos", labels=("command",)
+)
+COMMAND_ERRORS = Counter(
+    "btc_bot_command_errors_total", "Comandos que lanzaron una excepción", ("command",)
+)
+SUBSCRIBERS = Gauge("btc_bot_subscribers", "Suscriptores en el último tick")
+DATA_SOURCE = Counter(
+    "btc_bot_data_source_total",
+    "Lecturas de velas por origen (stream, binance, coingecko)",
+    labels=("source",),
+)
+DATA_FALLBACKS = Counter(
+    "btc_bot_data_fallback_total", "Veces que Binance falló y se usó CoinGecko"
+)
+MESSAGES = Counter(
+    "btc_bot_broadcast_total",
+    "Resultado de los envíos del tick (sent, failed, retries)",
+    labels=("result",),
+)
+DATA_CACHE = CounterFunc(
+    "btc_bot_data_cache_total",
+    "Lecturas de velas por resultado de la caché (hits, misses, coalesced)",
+    "result",
+)
+ALERTS = Counter("btc_bot_alerts_total", "Alertas de precio disparadas")
+PHOTOS = Counter(
+    "btc_bot_photos_total", "Fotos subidas o reenviadas por file_id", ("kind",)
+)
+
+
+def stage(name: str):
+    """`with metrics.stage("render"): ...` mide una etapa."""
+    return STAGE_SECONDS.time(stage=name)
+
+
+def track_command(name: str, handler):
+    """Envuelve un handler de comando para medir su duración y errores."""
+
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            return await handler(update, context)
+        except Exception:
+            COMMAND_ERRORS.inc(command=name)
+            raise
+        finally:
+            COMMAND_SECONDS.observe(time.perf_counter() - start, command=name)
+
+    return wrapper
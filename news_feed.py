@@ -0,0 +1,98 @@
+# news_feed.py
+"""
+Sentimiento de las noticias de Bitcoin, calculado en segundo plano:
+un job periódico trae titulares, puntúa solo los que no ha visto (en
+una única llamada al modelo) y mantiene una media móvil de los últimos
+`NEWS_FEED_WINDOW`. Los mensajes leen el resumen de memoria, sin coste
+de modelo por suscriptor ni por comando.
+"""
+
+import logging
+import time
+from collections import OrderedDict, deque
+
+import config
+import metrics
+import sentiment
+
+
+class NewsSentimentFeed:
+    def __init__(self, window: int = None, max_seen: int = 2000):
+        self.window = window or config.NEWS_FEED_WINDOW
+        # (timestamp, titular, puntuación con signo), el más nuevo al final
+        self.recent: deque = deque(maxlen=self.window)
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._max_seen = max_seen
+        self.updated_at: float | None = None
+
+    def unseen(self, headlines: list[str]) -> list[str]:
+        import news_scraper
+
+        out = []
+        for h in news_scraper.dedup(headlines):
+            if news_scraper.headline_key(h) not in self._seen:
+                out.append(h)
+        return out
+
+    def add(self, headlines: list[str], scores: list[float]):
+        import news_scraper
+
+        now = time.time()
+        for h, score in zip(headlines, scores):
+            self._seen[news_scraper.headline_key(h)] = None
+            self.recent.append((now, h, score))
+        while len(self._seen) > self._max_seen:
+            self._seen.popitem(last=False)
+        self.updated_at = now
+
+    async def refresh(self, fetch=None, score=None) -> int:
+        """
+        Trae titulares y puntúa los nuevos. `fetch(limit)` y `score(texts)`
+        son corrutinas (por defecto news_scraper y sentiment). Devuelve
+        cuántos titulares nuevos se han puntuado.
+        """
+        if fetch is None:
+            import news_scraper
+
+            fetch = news_scraper.get_bitcoin_headlines_async
+        score = score or sentiment.get_scores_async
+
+        new = self.unseen(await fetch(config.NEWS_FEED_LIMIT))
+        if new:
+            with metrics.stage("sentiment"):
+                self.add(new, await score(new))
+        self.updated_at = time.time()
+        return len(new)
+
+    def aggregate(self) -> float | None:
+        """Media de las puntuaciones recientes, en [-1, 1]."""
+        if not self.recent:
+            return None
+        return sum(s for _, _, s in self.recent) / len(self.recent)
+
+    def summary(self) -> str:
+        """Texto de la línea 'IA dice' de los mensajes."""
+        avg = self.aggregate()
+        if avg is None:
+            return "sin noticias analizadas todavía"
+        label = "POSITIVE" if avg >= 0 else "NEGATIVE"
+        return f"{label} ({abs(avg):.2f}) en {len(self.recent)} titulares"
+
+
+_feed: NewsSentimentFeed | None = None
+
+
+def get_feed() -> NewsSentimentFeed:
+    global _feed
+    if _feed is None:
+        _feed = NewsSentimentFeed()
+    return _feed
+
+
+async def refresh_job(context):
+    """Job periódico del bot (ver NEWS_FEED_INTERVAL)."""
+    try:
+        n = await get_feed().refresh()
+        logging.info(f"News feed: {n} titulares nuevos; {get_feed().summary()}")
+    except Exception as e:
+        logging.error(f"News feed error: {e}")
@@ -1,56 +1,236 @@
+# news_scraper.py
+"""
+Titulares de Bitcoin de varias fuentes (Cointelegraph, CryptoNews y
+CryptoPanic si hay API key), descargados en paralelo con un timeout por
+fuente: una web lenta ya no retrasa a las demás.
+
+- GET condicionales (ETag / Last-Modified): si la página no ha cambiado
+  se reutiliza el cuerpo anterior.
+- Parseo parcial: solo se analiza el trozo de HTML con los titulares
+  pedidos y solo se construyen los nodos que interesan (SoupStrainer).
+- Caché TTL single-flight del resultado y titulares deduplicados entre
+  fuentes.
+"""
+
+import asyncio
+import json
 import os
-import requests
-from bs4 import BeautifulSoup
+import re
+from dataclasses import dataclass, field
+
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer
 from dotenv import load_dotenv
+
+import config
+import data_cache
+
 load_dotenv()
 CRYPTOPANIC_API_KEY = os.getenv("CRYPTOPANIC_API_KEY")
 
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+CRYPTOPANIC_URL = "https://cryptopanic.com/api/v1/posts/"
+COINTELEGRAPH_URL = "https://cointelegraph.com/tags/bitcoin"
+CRYPTONEWS_URL = "https://cryptonews.com/news/bitcoin-news/"
+
+
+# — Parseo —
+def _window(html: str, marker: str, close: str, limit: int) -> str:
+    """
+    Trozo de `html` desde la etiqueta del primer `marker` hasta el cierre
+    `close` que sigue al `limit`-ésimo: lo único que hace falta parsear.
+    """
+    first = html.find(marker)
+    if first < 0:
+        return ""
+    start = html.rfind("<", 0, first)
+    pos = first
+    for _ in range(limit - 1):
+        nxt = html.find(marker, pos + len(marker))
+        if nxt < 0:
+            return html[start:]
+        pos = nxt
+    end = html.find(close, pos)
+    return html[start:] if end < 0 else html[start : end + len(close)]
+
+
+def _parse(html: str, limit: int, tag: str, cls: str, close: str) -> list[str]:
+    strainer = SoupStrainer(tag, class_=cls)
+
+    def titles(text: str) -> list[str]:
+        soup = BeautifulSoup(text, "html.parser", parse_only=strainer)
+        nodes = soup.find_all(tag, class_=cls)
+        if tag != "a":
+            nodes = [n.find("a") for n in nodes]
+        return [n.get_text(strip=True) for n in nodes if n is not None][:limit]
+
+    out = titles(_window(html, cls, close, limit))
+    # El marcador puede aparecer también en CSS/JS: si faltan, página entera
+    if len(out) < limit:
+        out = titles(html)
+    return out
+
+
+def parse_cointelegraph(html: str, limit: int = 3) -> list[str]:
+    return _parse(html, limit, "a", "post-card-inline__title-link", "</a>")
+
+
+def parse_cryptonews(html: str, limit: int = 3) -> list[str]:
+    return _parse(html, limit, "div", "article__title", "</div>")
+
+
+def parse_cryptopanic(body: str, limit: int = 3) -> list[str]:
+    data = json.loads(body)
+    return [post["title"] for post in data.get("results", [])[:limit]]
+
+
+def headline_key(text: str) -> str:
+    return re.sub(r"\W+", " ", text).casefold().strip()
+
+
+def dedup(headlines) -> list[str]:
+    """Quita titulares repetidos (sin distinguir mayúsculas ni puntuación)."""
+    seen, out = set(), []
+    for h in headlines:
+        key = headline_key(h)
+        if key and key not in seen:
+            seen.add(key)
+            out.append(h)
+    return out
 
-def get_from_cryptopanic(limit: int = 3) -> list[str]:
-    if not CRYPTOPANIC_API_KEY:
-        return []
-    url = f"https://cryptopanic.com/api/v1/posts/?auth_token={CRYPTOPANIC_API_KEY}&currencies=BTC&public=true"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        return [post["title"] for post in data.get("results", [])[:limit]]
-    except Exception as e:
-        print(f"[CryptoPanic] Error: {e}")
-        return []
-
-
-def get_from_cointelegraph(limit: int = 3) -> list[str]:
-    url = "https://cointelegraph.com/tags/bitcoin"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        articles = soup.select("a.post-card-inline__title-link")
-        return [a.get_text(strip=True) for a in articles[:limit]]
-    except Exception as e:
-        print(f"[Cointelegraph] Error: {e}")
-        return []
-
-
-def get_from_cryptonews(limit: int = 3) -> list[str]:
-    url = "https://cryptonews.com/news/bitcoin-news/"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        articles = soup.select("div.article__title a")
-        return [a.get_text(strip=True) for a in articles[:limit]]
-    except Exception as e:
-        print(f"[CryptoNews] Error: {e}")
-        return []
+
+# — Descarga —
+@dataclass
+class Source:
+    name: str
+    url: str
+    parse: object  # (cuerpo, limit) -> list[str]
+    params: dict = field(default_factory=dict)
+
+
+def sources() -> list[Source]:
+    """Fuentes en orden de preferencia (CryptoPanic solo con API key)."""
+    out = []
+    if CRYPTOPANIC_API_KEY:
+        params = {
+            "auth_token": CRYPTOPANIC_API_KEY,
+            "currencies": "BTC",
+            "public": "true",
+        }
+        out.append(Source("CryptoPanic", CRYPTOPANIC_URL, parse_cryptopanic, params))
+    out.append(Source("Cointelegraph", COINTELEGRAPH_URL, parse_cointelegraph))
+    out.append(Source("CryptoNews", CRYPTONEWS_URL, parse_cryptonews))
+    return out
+
+
+class NewsFetcher:
+    def __init__(self, timeout: float = None, ttl: float = None, transport=None):
+        self.timeout = timeout or config.NEWS_SOURCE_TIMEOUT
+        self.ttl = ttl or config.NEWS_CACHE_TTL
+        self._transport = transport
+        self._http = None
+        self._cache = data_cache.SingleFlightCache()
+        # url → {"etag", "last_modified", "body"} de la última respuesta 200
+        self._pages: dict[str, dict] = {}
+        self.stats = {"requests": 0, "not_modified": 0, "errors": 0}
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                transport=self._transport,
+            )
+        return self._http
+
+    async def _body(self, src: Source) -> str:
+        page = self._pages.get(src.url)
+        headers = {}
+        if page and page["etag"]:
+            headers["If-None-Match"] = page["etag"]
+        if page and page["last_modified"]:
+            headers["If-Modified-Since"] = page["last_modified"]
+        self.stats["requests"] += 1
+        r = await self._client().get(src.url, params=src.params, headers=headers)
+        if r.status_code == 304 and page:
+            self.stats["not_modified"] += 1
+            return page["body"]
+        r.raise_for_status()
+        self._pages[src.url] = {
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "body": r.text,
+        }
+        return r.text
+
+    async def _from_source(self, src: Source, limit: int) -> list[str]:
+        try:
+            body = await asyncio.wait_for(self._body(src), self.timeout)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[{src.name}] Error: {e!r}")
+            # Mejor titulares algo viejos que ninguno
+            page = self._pages.get(src.url)
+            if page is None:
+                return []
+            body = page["body"]
+        try:
+            return src.parse(body, limit)
+        except Exception as e:
+            print(f"[{src.name}] Error parseando: {e}")
+            return []
+
+    async def _fetch(self, limit: int) -> list[str]:
+        results = await asyncio.gather(
+            *(self._from_source(src, limit) for src in sources())
+        )
+        return dedup(h for res in results for h in res)[:limit]
+
+    async def headlines(self, limit: int = 5) -> list[str]:
+        """Hasta `limit` titulares; se reutilizan durante `ttl` segundos."""
+        res = await self._cache.get(
+            ("headlines", limit), self.ttl, lambda: self._fetch(limit)
+        )
+        return list(res)
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+_fetcher: NewsFetcher | None = None
+
+
+def get_fetcher() -> NewsFetcher:
+    """Fetcher compartido (caché y validadores viven entre llamadas)."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = NewsFetcher()
+    return _fetcher
+
+
+async def close_fetcher():
+    """Cierra el cliente HTTP del fetcher compartido (al apagar el bot)."""
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.aclose()
+        _fetcher = None
+
+
+async def get_bitcoin_headlines_async(limit: int = 5) -> list[str]:
+    return await get_fetcher().headlines(limit)
 
 
 def get_bitcoin_headlines(limit: int = 5) -> list[str]:
-    headlines = []
-    # headlines += get_from_cryptopanic(limit)
-    headlines += get_from_cointelegraph(limit)
-    headlines += get_from_cryptonews(limit)
-    return headlines[:limit]
+    """Versión síncrona para scripts (fetcher propio, sin caché compartida)."""
+
+    async def once():
+        fetcher = NewsFetcher()
+        try:
+            return await fetcher.headlines(limit)
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(once())
@@ -0,0 +1,72 @@
+# notify.py
+"""
+Envío por flancos: cada suscriptor guarda, por par, la última señal vista
+y el precio y la hora del último envío. En cada tick solo se envía a
+quien tenga algo nuevo:
+
+- una señal distinta de la anterior (None→COMPRA, COMPRA→VENTA...);
+  volver a "Monitoreo" no se envía, solo se anota;
+- un movimiento de precio de al menos `config.NOTIFY_PRICE_MOVE` desde
+  el último envío;
+- su resumen periódico (/resumen) si ya toca;
+- o el primer tick en que se le ve.
+
+Todo vectorizado sobre los suscriptores de un par, como `strategy.evaluate`.
+"""
+
+import numpy as np
+
+import config
+
+
+def _num(state, i: int) -> float:
+    if state is None or state[i] is None:
+        return np.nan
+    return state[i]
+
+
+def due(
+    states: list,
+    signals,
+    price: float,
+    now: float,
+    digests,
+    move: float = None,
+) -> np.ndarray:
+    """
+    Máscara de envío. `states` tiene (señal, precio, enviado_en) o None por
+    suscriptor, `signals` su señal actual y `digests` la cadencia del
+    resumen en segundos (NaN = sin resumen).
+    """
+    move = config.NOTIFY_PRICE_MOVE if move is None else move
+    n = len(states)
+    known = np.array([s is not None for s in states], dtype=bool)
+    prev_sig = np.array([s[0] if s else "" for s in states], dtype=object)
+    prev_price = np.array([_num(s, 1) for s in states], dtype=float)
+    sent_at = np.array([_num(s, 2) for s in states], dtype=float)
+    sig = np.array([x or "" for x in signals], dtype=object).reshape(n)
+    digests = np.asarray(digests, dtype=float).reshape(n)
+
+    with np.errstate(invalid="ignore"):
+        edge = (sig != prev_sig) & (sig != "")
+        moved = np.abs(price / prev_price - 1) >= move
+        digest = (digests > 0) & (now - sent_at >= digests)
+    return ~known | edge | moved | digest
+
+
+def new_states(states: list, signals, price: float, now: float, mask) -> list:
+    """
+    Estados tras el tick, con None donde nada cambia (para no reescribir
+    filas): la señal se anota siempre; precio y hora solo si se envió.
+    """
+    out = []
+    for state, sig, send in zip(states, signals, mask):
+        sig = sig or ""
+        if send:
+            out.append((sig, price, now))
+        elif state is None or state[0] != sig:
+            prev = state or ("", None, None)
+            out.append((sig, prev[1], prev[2]))
+        else:
+            out.append(None)
+    return out
@@ -1,7 +1,191 @@
-# === Archivo: plotter.py ===
-import matplotlib.pyplot as plt
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from ta.volatility import BollingerBands
+
+import config
+
+# Margen vertical (como el autoscale de matplotlib)
+_Y_MARGIN = 0.05
+
+_render_pool = None
+# warm_up lo crea desde un hilo del executor y el primer tick desde el loop
+_render_pool_lock = threading.Lock()
+
+
+class BaseChart:
+    """
+    Capa común del gráfico de un tick: precio, SMAs, Bandas de Bollinger
+    y máx/mín. Se dibuja una sola vez; `render` añade encima las líneas
+    de cada suscriptor, guarda el PNG y las vuelve a quitar.
+    Usa `Figure` directamente (sin pyplot) para poder renderizar fuera
+    del hilo principal.
+    """
+
+    def __init__(self, df, title: str = "Señal de BTC", interval: str = "5m"):
+        # matplotlib se carga en el primer render, no al importar el bot
+        from matplotlib.figure import Figure
+
+        self.fig = Figure(figsize=(6, 3), dpi=150)
+        ax = self.ax = self.fig.add_subplot()
+        x = df.index
+
+        # Precio y SMAs
+        (close,) = ax.plot(
+            x, df["close"], label="Precio de Cierre", linewidth=1.5, color="blue"
+        )
+        (fast,) = ax.plot(x, df["sma_fast"], label="SMA 9", linewidth=1, color="orange")
+        (slow,) = ax.plot(x, df["sma_slow"], label="SMA 21", linewidth=1, color="green")
+
+        # Bandas de Bollinger (ya calculadas por strategy.add_indicators)
+        if "bb_hi" in df and "bb_lo" in df:
+            bb_lo, bb_hi = df["bb_lo"], df["bb_hi"]
+        else:
+            from ta.volatility import BollingerBands
+
+            bb = BollingerBands(df["close"])
+            bb_lo, bb_hi = bb.bollinger_lband(), bb.bollinger_hband()
+        bands = ax.fill_between(
+            x,
+            bb_lo,
+            bb_hi,
+            color="gray",
+            alpha=0.2,
+            label="Bandas Bollinger",
+        )
+
+        # Máx/Mín reales
+        max_val = df["close"].max()
+        min_val = df["close"].min()
+        hi_mark = ax.scatter(
+            df["close"].idxmax(),
+            max_val,
+            marker="^",
+            color="darkgreen",
+            s=50,
+            label=f"▲ Máx actual: ${max_val:.2f}",
+        )
+        lo_mark = ax.scatter(
+            df["close"].idxmin(),
+            min_val,
+            marker="v",
+            color="darkblue",
+            s=50,
+            label=f"▼ Mín actual: ${min_val:.2f}",
+        )
+
+        # Estética
+        ax.set_title(title, fontsize=10)
+        ax.set_xlabel(f"Periodo ({interval} cada uno)", fontsize=8)
+        ax.set_ylabel("Precio (USD)", fontsize=8)
+        ax.grid(True, linestyle=":", alpha=0.5)
+
+        cols = [df["close"], df["sma_fast"], df["sma_slow"], bb_lo, bb_hi]
+        self._y_range = (
+            min(float(c.min()) for c in cols),
+            max(float(c.max()) for c in cols),
+        )
+        self._xlim = ax.get_xlim()
+        # Orden de la leyenda: series, líneas del suscriptor, máx/mín
+        self._series = [close, fast, slow, bands]
+        self._marks = [hi_mark, lo_mark]
+        # Márgenes por número de líneas de la leyenda (ver render)
+        self._layouts: dict[int, dict] = {}
+        self._base_layout = self._margins()
+
+    def _margins(self) -> dict:
+        sp = self.fig.subplotpars
+        return dict(
+            left=sp.left,
+            right=sp.right,
+            bottom=sp.bottom,
+            top=sp.top,
+            wspace=sp.wspace,
+            hspace=sp.hspace,
+        )
+
+    def render(
+        self,
+        buy_price: float = None,
+        purchase_idx=None,
+        target_pct: float = 0.02,
+        stop_pct: float = 0.02,
+    ) -> bytes:
+        """Dibuja las líneas del suscriptor sobre la capa común y devuelve el PNG."""
+        ax = self.ax
+        overlays = []  # artistas a quitar después de guardar
+        lines = []  # los que van en la leyenda
+        levels = []
+
+        # Precio de compra
+        if buy_price is not None and purchase_idx is not None:
+            lines.append(
+                ax.axhline(
+                    buy_price,
+                    color="red",
+                    linestyle="--",
+                    label=f"Precio compra: ${buy_price:.2f}",
+                )
+            )
+            overlays.append(ax.scatter(purchase_idx, buy_price, color="red", s=50))
+            levels.append(buy_price)
+
+        # Niveles recomendados
+        if buy_price is not None:
+            target_price = buy_price * (1 + target_pct)
+            stop_price = buy_price * (1 - stop_pct)
+            lines.append(
+                ax.axhline(
+                    target_price,
+                    color="green",
+                    linestyle="-.",
+                    label=f"Máx recom. venta: ${target_price:.2f}",
+                )
+            )
+            lines.append(
+                ax.axhline(
+                    stop_price,
+                    color="blue",
+                    linestyle="-.",
+                    label=f"Mín recom. compra: ${stop_price:.2f}",
+                )
+            )
+            levels += [target_price, stop_price]
+
+        lo = min([self._y_range[0], *levels])
+        hi = max([self._y_range[1], *levels])
+        pad = (hi - lo) * _Y_MARGIN
+        ax.set_ylim(lo - pad, hi + pad)
+        ax.set_xlim(self._xlim)
+
+        legend = ax.legend(
+            handles=self._series + lines + self._marks,
+            loc="upper center",
+            bbox_to_anchor=(0.5, -0.15),
+            ncol=3,
+            fontsize=6,
+        )
+        # El layout solo depende de cuántas filas tiene la leyenda: se
+        # calcula una vez por tamaño y se reutiliza (evita un draw extra).
+        # tight_layout depende de los márgenes de partida, así que siempre
+        # se calcula desde los iniciales: el PNG no depende de los renders
+        # anteriores.
+        layout = self._layouts.get(len(lines))
+        if layout is None:
+            self.fig.subplots_adjust(**self._base_layout)
+            self.fig.tight_layout()
+            layout = self._layouts[len(lines)] = self._margins()
+        else:
+            self.fig.subplots_adjust(**layout)
+
+        buf = BytesIO()
+        self.fig.savefig(buf, format="png")
+
+        legend.remove()
+        for artist in overlays + lines:
+            artist.remove()
+        return buf.getvalue()
 
 
 def plot_signal(
@@ -16,84 +200,85 @@ def plot_signal(
     """
     Genera un gráfico compacto y legible de la señal de BTC.
     """
-    fig, ax = plt.subplots(figsize=(6, 3), dpi=150)
-    x = df.index
-
-    # Precio y SMAs
-    ax.plot(x, df["close"], label="Precio de Cierre", linewidth=1.5, color="blue")
-    ax.plot(x, df["sma_fast"], label="SMA 9", linewidth=1, color="orange")
-    ax.plot(x, df["sma_slow"], label="SMA 21", linewidth=1, color="green")
-
-    # Bandas de Bollinger
-    bb = BollingerBands(df["close"])
-    ax.fill_between(
-        x,
-        bb.bollinger_lband(),
-        bb.bollinger_hband(),
-        color="gray",
-        alpha=0.2,
-        label="Bandas Bollinger",
-    )
+    png = BaseChart(df).render(buy_price, purchase_idx, target_pct, stop_pct)
+    return BytesIO(png)
 
-    # Precio de compra
-    if buy_price is not None and purchase_idx is not None:
-        ax.axhline(
-            buy_price,
-            color="red",
-            linestyle="--",
-            label=f"Precio compra: ${buy_price:.2f}",
-        )
-        ax.scatter(purchase_idx, buy_price, color="red", s=50)
-
-    # Niveles recomendados
-    if buy_price is not None:
-        target_price = buy_price * (1 + target_pct)
-        stop_price = buy_price * (1 - stop_pct)
-        ax.axhline(
-            target_price,
-            color="green",
-            linestyle="-.",
-            label=f"Máx recom. venta: ${target_price:.2f}",
-        )
-        ax.axhline(
-            stop_price,
-            color="blue",
-            linestyle="-.",
-            label=f"Mín recom. compra: ${stop_price:.2f}",
-        )
 
-    # Máx/Mín reales
-    max_val = df["close"].max()
-    min_val = df["close"].min()
-    hi = df["close"].idxmax()
-    lo = df["close"].idxmin()
-    ax.scatter(
-        hi,
-        max_val,
-        marker="^",
-        color="darkgreen",
-        s=50,
-        label=f"▲ Máx actual: ${max_val:.2f}",
-    )
-    ax.scatter(
-        lo,
-        min_val,
-        marker="v",
-        color="darkblue",
-        s=50,
-        label=f"▼ Mín actual: ${min_val:.2f}",
-    )
+def render_batch(df, overlays: list[tuple], title=None, interval=None) -> list[bytes]:
+    """
+    Dibuja la capa común una vez y un PNG por cada overlay
+    (buy_price, purchase_idx). Pensado para ejecutarse en un worker.
+    """
+    chart = BaseChart(df, title or "Señal de BTC", interval or "5m")
+    return [chart.render(buy, idx) for buy, idx in overlays]
+
+
+def get_render_pool():
+    """Pool de procesos para renderizar (None si RENDER_WORKERS == 0)."""
+    global _render_pool
+    if _render_pool is None and config.RENDER_WORKERS > 0:
+        with _render_pool_lock:
+            if _render_pool is None:
+                # spawn: el proceso ya tiene hilos (Flask, executor de
+                # sentimiento) y hacer fork con hilos vivos puede bloquear
+                # a los hijos
+                _render_pool = ProcessPoolExecutor(
+                    max_workers=config.RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _render_pool
+
 
-    # Estética
-    ax.set_title("Señal de BTC", fontsize=10)
-    ax.set_xlabel("Periodo (5m cada uno)", fontsize=8)
-    ax.set_ylabel("Precio (USD)", fontsize=8)
-    ax.grid(True, linestyle=":", alpha=0.5)
-    ax.legend(loc="upper center", bbox_to_anchor=(0.5, -0.15), ncol=3, fontsize=6)
-    fig.tight_layout()
-
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
-    plt.close(fig)
-    return buf
+def _load_matplotlib():
+    from matplotlib.figure import Figure  # noqa: F401
+
+
+def warm_up():
+    """Precarga matplotlib y arranca los procesos del pool de render."""
+    _load_matplotlib()
+    pool = get_render_pool()
+    if pool is not None:
+        for _ in range(config.RENDER_WORKERS):
+            pool.submit(_load_matplotlib)
+
+
+def shutdown_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def render_many(
+    df, overlays: list[tuple], executor=None, title=None, interval=None
+) -> list[bytes]:
+    """
+    Renderiza un PNG por overlay (buy_price, purchase_idx) fuera del loop.
+    Los overlays repetidos se dibujan una sola vez y los únicos se reparten
+    en un lote por worker; cada lote dibuja su propia capa común.
+    `title` e `interval` rotulan los gráficos de otros pares.
+    """
+    if executor is None:
+        executor = get_render_pool()
+    unique = list(dict.fromkeys(overlays))
+    if not unique:
+        return []
+
+    # Solo las columnas que se dibujan: menos datos que serializar al worker
+    cols = ["close", "sma_fast", "sma_slow", "bb_hi", "bb_lo"]
+    data = df[[c for c in cols if c in df]]
+
+    workers = max(1, config.RENDER_WORKERS)
+    size = -(-len(unique) // max(1, min(workers, len(unique))))
+    chunks = [unique[i : i + size] for i in range(0, len(unique), size)]
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, render_batch, data, c, title, interval)
+            for c in chunks
+        )
+    )
+    rendered = {ov: png for c, pngs in zip(chunks, results) for ov, png in zip(c, pngs)}
+    return [rendered[ov] for ov in overlays]
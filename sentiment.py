@@ -1,21 +1,99 @@
-from transformers import pipeline, logging
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-# 1) Silenciar warnings de Transformers
-logging.set_verbosity_error()
+import config
 
-sentiment_analyzer = pipeline(
-    "sentiment-analysis",
-    model="distilbert/distilbert-base-uncased-finetuned-sst-2-english",
-    revision="714eb0f",
-)
+# El pipeline se crea en el primer uso (o en `warm_up`), no al importar
+_analyzer = None
+
+# Caché LRU texto → resultado formateado
+_cache: OrderedDict[str, str] = OrderedDict()
+
+# Un único hilo para la inferencia: no bloquea el loop y serializa el
+# acceso al modelo y a la caché
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment")
+
+
+def get_analyzer():
+    """Carga el modelo la primera vez que se necesita."""
+    global _analyzer
+    if _analyzer is None:
+        from transformers import pipeline, logging
+
+        # 1) Silenciar warnings de Transformers
+        logging.set_verbosity_error()
+
+        _analyzer = pipeline(
+            "sentiment-analysis",
+            model="distilbert/distilbert-base-uncased-finetuned-sst-2-english",
+            revision="714eb0f",
+        )
+    return _analyzer
+
+
+def is_loaded() -> bool:
+    return _analyzer is not None
+
+
+def warm_up():
+    """Carga el modelo en el hilo de inferencia (para llamar en segundo plano)."""
+    return _executor.submit(get_analyzer)
+
+
+def _format(res: dict) -> str:
+    # Formateamos con dos decimales
+    return f"{res['label']} ({res['score']:.2f})"
+
+
+def get_sentiments(texts: list[str]) -> list[str]:
+    """
+    Versión por lotes de `get_sentiment`: deduplica los textos, reutiliza
+    los resultados en caché y pasa el resto al modelo en una sola llamada.
+    """
+    missing = [t for t in dict.fromkeys(texts) if t not in _cache]
+    if missing:
+        results = get_analyzer()(
+            missing,
+            batch_size=config.SENTIMENT_BATCH_SIZE,
+            truncation=True,
+            max_length=512,
+        )
+        for text, res in zip(missing, results):
+            _cache[text] = _format(res)
+
+    out = []
+    for text in texts:
+        _cache.move_to_end(text)
+        out.append(_cache[text])
+    while len(_cache) > config.SENTIMENT_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return out
 
 
 def get_sentiment(text: str) -> str:
     """
     Devuelve algo como 'POSITIVE (0.97)' o 'NEGATIVE (0.65)'.
     """
-    res = sentiment_analyzer(text, max_length=512)[0]
-    label = res["label"]
-    score = res["score"]
-    # Formateamos con dos decimales
-    return f"{label} ({score:.2f})"
+    return get_sentiments([text])[0]
+
+
+def get_scores(texts: list[str]) -> list[float]:
+    """
+    Puntuación con signo de cada texto: +score si es POSITIVE, -score si
+    es NEGATIVE. Una sola llamada al modelo, sin caché.
+    """
+    if not texts:
+        return []
+    results = get_analyzer()(
+        texts,
+        batch_size=config.SENTIMENT_BATCH_SIZE,
+        truncation=True,
+        max_length=512,
+    )
+    return [r["score"] if r["label"] == "POSITIVE" else -r["score"] for r in results]
+
+
+async def get_scores_async(texts: list[str]) -> list[float]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, get_scores, texts)
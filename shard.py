@@ -0,0 +1,266 @@
+# shard.py
+"""
+Reparto de suscriptores entre procesos (SHARD_WORKERS > 0).
+
+El bot (coordinador) descarga los datos, calcula el snapshot de cada par
+y decide a quién hay que enviar; los N workers hacen lo caro (gráficos,
+mensajes y envío) cada uno para su trozo de chats, `crc32(chat_id) % N`.
+
+Por tick, las columnas que se dibujan de cada par se publican una sola
+vez en un bloque de memoria compartida; por la cola de cada worker solo
+viaja lo pequeño: el nombre del bloque, los escalares del snapshot y los
+chats de su shard. El coordinador espera a que todos respondan antes de
+liberar el bloque; con cada respuesta vuelven las métricas del worker
+(`metrics.drain`), que el coordinador suma a las suyas para /metrics.
+"""
+
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+import zlib
+from dataclasses import fields
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import config
+import delivery
+import metrics
+
+# Columnas que necesita plotter (más el índice, en ms)
+COLUMNS = ["close", "sma_fast", "sma_slow", "bb_hi", "bb_lo"]
+
+
+def shard_of(chat_id: int, n: int) -> int:
+    """Shard estable del chat (no depende de PYTHONHASHSEED)."""
+    return zlib.crc32(str(chat_id).encode()) % n
+
+
+# — Memoria compartida —
+def publish(works: list) -> tuple[shared_memory.SharedMemory, list[tuple]]:
+    """
+    Copia el índice y COLUMNS de cada par en un único bloque (filas
+    [índice_ms, *COLUMNS]). Devuelve el bloque y (offset, filas) por par.
+    """
+    layout, offset = [], 0
+    for w in works:
+        layout.append((offset, len(w.snap.df)))
+        offset += len(w.snap.df)
+    width = len(COLUMNS) + 1
+    shm = shared_memory.SharedMemory(create=True, size=max(offset * width * 8, 1))
+    data = np.ndarray((offset, width), dtype=np.float64, buffer=shm.buf)
+    for w, (start, n) in zip(works, layout):
+        df = w.snap.df
+        data[start : start + n, 0] = df.index.as_unit("ms").asi8
+        for j, col in enumerate(COLUMNS, 1):
+            data[start : start + n, j] = df[col].to_numpy() if col in df else np.nan
+    return shm, layout
+
+
+def read_frame(buf, rows: int, start: int, n: int) -> pd.DataFrame:
+    """DataFrame (copia) de un par publicado con `publish`."""
+    data = np.ndarray((rows, len(COLUMNS) + 1), dtype=np.float64, buffer=buf)
+    block = data[start : start + n].copy()
+    df = pd.DataFrame(block[:, 1:], columns=COLUMNS)
+    df.index = pd.to_datetime(block[:, 0].astype(np.int64), unit="ms")
+    return df
+
+
+def _scalars(snap) -> dict:
+    return {f.name: getattr(snap, f.name) for f in fields(snap) if f.name != "df"}
+
+
+def split(works: list, n: int) -> list[list[dict]]:
+    """Trabajos de cada shard: por par, los chats que le tocan y sus datos."""
+    out = [[] for _ in range(n)]
+    for i, w in enumerate(works):
+        idx = [[] for _ in range(n)]
+        for pos, cid in enumerate(w.cids):
+            idx[shard_of(cid, n)].append(pos)
+        for k in range(n):
+            if idx[k]:
+                part = w.take(idx[k])
+                out[k].append(
+                    {
+                        "work": i,
+                        "pair": w.pair,
+                        "snap": _scalars(w.snap),
+                        "cids": part.cids,
+                        "lasts": part.lasts,
+                        "signals": part.signals,
+                        "purchase_pos": part.purchase_pos,
+                    }
+                )
+    return out
+
+
+def rate_share(n: int) -> float:
+    """
+    Parte del límite global de Telegram para cada proceso: los N workers
+    y el coordinador (que sigue enviando las alertas de /alerta).
+    """
+    return config.BROADCAST_GLOBAL_RATE / (n + 1)
+
+
+# — Workers —
+def telegram_bot():
+    """Bot de cada worker (fábrica por defecto; a nivel de módulo para spawn)."""
+    from telegram import Bot
+
+    return Bot(config.TELEGRAM_TOKEN)
+
+
+async def _serve(k: int, n: int, bot_factory, jobs, results):
+    import strategy
+    from broadcast import Broadcaster
+
+    bot = bot_factory()
+    if hasattr(bot, "initialize"):
+        await bot.initialize()
+    # El límite global de Telegram se reparte entre los procesos; los de
+    # chat no, porque cada chat vive en un solo shard
+    broadcaster = Broadcaster(bot, global_rate=rate_share(n))
+    loop = asyncio.get_running_loop()
+    try:
+        while (job := await loop.run_in_executor(None, jobs.get)) is not None:
+            stats = {"sent": 0, "failed": 0, "retries": 0}
+            try:
+                shm = shared_memory.SharedMemory(name=job["shm"])
+                try:
+                    frames = [
+                        read_frame(shm.buf, job["rows"], start, rows)
+                        for start, rows in job["layout"]
+                    ]
+                finally:
+                    shm.close()
+                deliveries = []
+                for item in job["items"]:
+                    snap = strategy.MarketSnapshot(
+                        df=frames[item["work"]], **item["snap"]
+                    )
+                    work = delivery.PairWork(
+                        tuple(item["pair"]),
+                        snap,
+                        item["cids"],
+                        item["lasts"],
+                        item["signals"],
+                        item["purchase_pos"],
+                    )
+                    deliveries += await delivery.build(
+                        broadcaster, work, job["ts"], job["ia_sent"]
+                    )
+                stats = await broadcaster.broadcast(deliveries)
+            except Exception as e:
+                logging.error(f"Shard {k}: error en el tick {job['tick']}: {e}")
+            # Las métricas del worker (p. ej. la etapa render) viajan con
+            # el resultado para que el coordinador las exporte en /metrics
+            results.put((k, job["tick"], stats, metrics.drain()))
+    finally:
+        if hasattr(bot, "shutdown"):
+            await bot.shutdown()
+
+
+def _worker_main(k: int, n: int, bot_factory, jobs, results):
+    # Cada worker dibuja en su propio proceso, sin pool de render anidado
+    config.RENDER_WORKERS = 0
+    # Mismo fichero que el bot, con el shard en cada línea. force: al
+    # reimportar main.py (spawn) bot.py ya configuró el logging
+    logging.basicConfig(
+        filename="btc_bot.log",
+        level=logging.INFO,
+        format=f"%(asctime)s - shard {k} - %(levelname)s - %(message)s",
+        force=True,
+    )
+    asyncio.run(_serve(k, n, bot_factory, jobs, results))
+
+
+class ShardPool:
+    """N procesos worker, una cola de trabajos por worker y una de resultados."""
+
+    def __init__(self, workers: int = None, bot_factory=None, timeout: float = None):
+        self.n = workers or config.SHARD_WORKERS
+        self.bot_factory = bot_factory or telegram_bot
+        self.timeout = timeout or config.SHARD_TIMEOUT
+        self._ctx = mp.get_context("spawn")
+        self._jobs = []
+        self._results = None
+        self._procs = []
+        self._tick = 0
+
+    def start(self) -> "ShardPool":
+        self._results = self._ctx.Queue()
+        for k in range(self.n):
+            jobs = self._ctx.Queue()
+            p = self._ctx.Process(
+                target=_worker_main,
+                args=(k, self.n, self.bot_factory, jobs, self._results),
+                daemon=True,
+            )
+            p.start()
+            self._jobs.append(jobs)
+            self._procs.append(p)
+        logging.info(f"Shards arrancados: {self.n} workers")
+        return self
+
+    def _collect(self, pending: set[int], tick: int) -> list[dict]:
+        out = []
+        while pending:
+            try:
+                k, t, stats, dump = self._results.get(timeout=self.timeout)
+            except queue.Empty:
+                logging.error(f"Shards sin respuesta en el tick {tick}: {pending}")
+                break
+            # Lo medido en un tick tardío también cuenta
+            metrics.merge(dump)
+            if t == tick:
+                pending.discard(k)
+                out.append(stats)
+        return out
+
+    async def dispatch(self, works: list, ts: str, ia_sent: str) -> dict:
+        """Publica el tick, reparte los chats y suma las estadísticas."""
+        works = [w for w in works if w.cids]
+        total = {"sent": 0, "failed": 0, "retries": 0}
+        total.update(photo_uploads=0, photo_reused=0)
+        if not works:
+            return total
+
+        self._tick += 1
+        shm, layout = publish(works)
+        try:
+            pending = set()
+            for k, items in enumerate(split(works, self.n)):
+                if items:
+                    self._jobs[k].put(
+                        {
+                            "tick": self._tick,
+                            "shm": shm.name,
+                            "rows": sum(n for _, n in layout),
+                            "layout": layout,
+                            "ts": ts,
+                            "ia_sent": ia_sent,
+                            "items": items,
+                        }
+                    )
+                    pending.add(k)
+            loop = asyncio.get_running_loop()
+            stats = await loop.run_in_executor(None, self._collect, pending, self._tick)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        for s in stats:
+            for key in total:
+                total[key] += s.get(key, 0)
+        return total
+
+    def stop(self):
+        for jobs in self._jobs:
+            jobs.put(None)
+        for p in self._procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+        self._jobs, self._procs = [], []
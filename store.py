@@ -0,0 +1,444 @@
+# store.py
+"""
+Estado de los suscriptores en una sola base SQLite (modo WAL):
+suscriptores, precio de compra registrado, pares vigilados, alertas de
+precio, estado de envío (notify.py) e historial de señales.
+Las lecturas calientes (suscriptores y precios) salen de una caché en
+memoria que se mantiene al día en cada escritura (write-through).
+"""
+
+import csv
+import glob
+import gzip
+import io
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+import config
+
+DEFAULT_BUY_PRICE = 96000.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    chat_id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    chat_id INTEGER PRIMARY KEY,
+    buy_price REAL NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    price REAL,
+    rsi REAL,
+    usd_change REAL,
+    pct_change REAL
+);
+CREATE INDEX IF NOT EXISTS trades_chat_ts ON trades (chat_id, ts);
+CREATE TABLE IF NOT EXISTS watchlist (
+    chat_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    PRIMARY KEY (chat_id, symbol, interval)
+);
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    price REAL NOT NULL,
+    label TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notify_state (
+    chat_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    signal TEXT NOT NULL DEFAULT '',
+    price REAL,
+    sent_at REAL,
+    PRIMARY KEY (chat_id, symbol, interval)
+);
+CREATE TABLE IF NOT EXISTS digests (
+    chat_id INTEGER PRIMARY KEY,
+    seconds REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+HISTORY_HEADER = ["timestamp", "signal", "price", "RSI", "USD_change", "%_change"]
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class StateStore:
+    def __init__(self, path: str = None):
+        self.path = path or config.DB_FILE
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Caché en memoria de las lecturas de cada tick
+        self._subs = {
+            r[0] for r in self.conn.execute("SELECT chat_id FROM subscribers")
+        }
+        self._prices = dict(
+            self.conn.execute("SELECT chat_id, buy_price FROM positions")
+        )
+        self._watch: dict[int, list[tuple[str, str]]] = {}
+        for cid, sym, iv in self.conn.execute(
+            "SELECT chat_id, symbol, interval FROM watchlist ORDER BY rowid"
+        ):
+            self._watch.setdefault(cid, []).append((sym, iv))
+        self._notify = {
+            (cid, sym, iv): (sig, price, sent)
+            for cid, sym, iv, sig, price, sent in self.conn.execute(
+                "SELECT * FROM notify_state"
+            )
+        }
+        self._digests = dict(self.conn.execute("SELECT * FROM digests"))
+
+    def close(self):
+        self.conn.close()
+
+    # — Suscriptores —
+    def subscribers(self) -> set[int]:
+        return set(self._subs)
+
+    def add_subscriber(self, chat_id: int) -> bool:
+        if chat_id in self._subs:
+            return False
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO subscribers VALUES (?, ?)", (chat_id, _now())
+            )
+        self._subs.add(chat_id)
+        return True
+
+    # — Precio de compra —
+    def buy_price(self, chat_id: int, default: float = DEFAULT_BUY_PRICE) -> float:
+        return self._prices.get(chat_id, default)
+
+    def buy_prices(self, chat_ids, default: float = DEFAULT_BUY_PRICE) -> list[float]:
+        return [self._prices.get(cid, default) for cid in chat_ids]
+
+    def set_buy_price(self, chat_id: int, price: float):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO positions VALUES (?, ?, ?) ON CONFLICT(chat_id) "
+                "DO UPDATE SET buy_price = excluded.buy_price, "
+                "updated_at = excluded.updated_at",
+                (chat_id, price, _now()),
+            )
+        self._prices[chat_id] = price
+
+    # — Pares vigilados —
+    def watchlist(self, chat_id: int) -> list[tuple[str, str]]:
+        """Pares (símbolo, intervalo) del chat; por defecto el de config."""
+        return list(self._watch.get(chat_id, [(config.SYMBOL, config.INTERVAL)]))
+
+    def add_watch(self, chat_id: int, symbol: str, interval: str) -> bool:
+        # La primera vez se guarda también el par por defecto, que hasta
+        # entonces era implícito
+        pairs = self.watchlist(chat_id)
+        if (symbol, interval) in pairs and chat_id in self._watch:
+            return False
+        if (symbol, interval) not in pairs:
+            pairs.append((symbol, interval))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO watchlist VALUES (?, ?, ?)",
+                [(chat_id, sym, iv) for sym, iv in pairs],
+            )
+        self._watch[chat_id] = pairs
+        return True
+
+    def remove_watch(self, chat_id: int, symbol: str, interval: str) -> bool:
+        """Quita un par; siempre queda al menos uno (para nada, /reset)."""
+        pairs = self.watchlist(chat_id)
+        if (symbol, interval) not in pairs or len(pairs) == 1:
+            return False
+        pairs.remove((symbol, interval))
+        with self.conn:
+            self.conn.execute("DELETE FROM watchlist WHERE chat_id = ?", (chat_id,))
+            self.conn.executemany(
+                "INSERT INTO watchlist VALUES (?, ?, ?)",
+                [(chat_id, sym, iv) for sym, iv in pairs],
+            )
+        self._watch[chat_id] = pairs
+        return True
+
+    def watchers(self, chat_ids) -> dict[tuple[str, str], list[int]]:
+        """Agrupa los chats por par vigilado: {(símbolo, intervalo): [chat_id]}."""
+        out: dict[tuple[str, str], list[int]] = {}
+        for cid in chat_ids:
+            for pair in self.watchlist(cid):
+                out.setdefault(pair, []).append(cid)
+        return out
+
+    # — Estado de envío por flancos (ver notify.py) —
+    def notify_states(self, chat_ids, symbol: str, interval: str) -> list:
+        """(señal, precio, enviado_en) de cada chat en el par, o None."""
+        return [self._notify.get((cid, symbol, interval)) for cid in chat_ids]
+
+    def save_notify_states(self, chat_ids, symbol: str, interval: str, states):
+        """Guarda los estados no None en una transacción."""
+        rows = [
+            (cid, symbol, interval, *st)
+            for cid, st in zip(chat_ids, states)
+            if st is not None
+        ]
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO notify_state VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+        for cid, sym, iv, *st in rows:
+            self._notify[(cid, sym, iv)] = tuple(st)
+
+    def digests(self, chat_ids) -> list[float]:
+        """Cadencia del resumen de cada chat en segundos (NaN si no tiene)."""
+        return [self._digests.get(cid, float("nan")) for cid in chat_ids]
+
+    def set_digest(self, chat_id: int, seconds: float | None):
+        with self.conn:
+            if seconds:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO digests VALUES (?, ?)", (chat_id, seconds)
+                )
+            else:
+                self.conn.execute("DELETE FROM digests WHERE chat_id = ?", (chat_id,))
+        if seconds:
+            self._digests[chat_id] = seconds
+        else:
+            self._digests.pop(chat_id, None)
+
+    # — Alertas de precio (en memoria las lleva alerts.AlertBook) —
+    def alerts(self) -> list[tuple]:
+        """Todas las alertas pendientes como (id, chat_id, precio, etiqueta)."""
+        return self.conn.execute(
+            "SELECT id, chat_id, price, label FROM alerts"
+        ).fetchall()
+
+    def add_alert(self, chat_id: int, price: float, label: str = "") -> int:
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO alerts (chat_id, price, label, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (chat_id, price, label, _now()),
+            )
+        return cur.lastrowid
+
+    def delete_alerts(self, ids):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM alerts WHERE id = ?", [(i,) for i in ids]
+            )
+
+    # — Historial —
+    def append_trades(self, rows: list[tuple]):
+        """Filas (chat_id, ts, signal, price, rsi, usd, pct) en una transacción."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO trades (chat_id, ts, signal, price, rsi, usd_change, "
+                "pct_change) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _trades_query(
+        self, chat_id: int, start: str = None, end: str = None, signal: str = None
+    ):
+        """
+        SELECT del historial del chat, filtrado por fechas (YYYY-MM-DD,
+        ambas incluidas) y señal. Usa el índice (chat_id, ts).
+        """
+        sql = (
+            "SELECT ts, signal, price, rsi, usd_change, pct_change FROM trades "
+            "WHERE chat_id = ?"
+        )
+        params = [chat_id]
+        if start:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end:
+            day_after = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)
+            sql += " AND ts < ?"
+            params.append(day_after.strftime("%Y-%m-%d"))
+        if signal:
+            sql += " AND signal = ?"
+            params.append(signal)
+        return sql + " ORDER BY ts, id", params
+
+    def export_trades_gz(
+        self,
+        chat_id: int,
+        out,
+        start: str = None,
+        end: str = None,
+        signal: str = None,
+        chunk: int = 1000,
+    ) -> int:
+        """
+        Escribe en `out` el historial filtrado como CSV comprimido con gzip,
+        leyendo por bloques (nunca carga todo el historial en memoria).
+        Abre su propia conexión para poder ejecutarse en otro hilo.
+        Devuelve el número de filas exportadas.
+        """
+        conn = sqlite3.connect(self.path)
+        n = 0
+        try:
+            cur = conn.execute(*self._trades_query(chat_id, start, end, signal))
+            with gzip.GzipFile(fileobj=out, mode="wb") as gz:
+                text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+                w = csv.writer(text)
+                w.writerow(HISTORY_HEADER)
+                while rows := cur.fetchmany(chunk):
+                    w.writerows(rows)
+                    n += len(rows)
+                text.flush()
+                text.detach()
+        finally:
+            conn.close()
+        return n
+
+    def has_trades(self, chat_id: int) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM trades WHERE chat_id = ? LIMIT 1", (chat_id,)
+        ).fetchone()
+        return row is not None
+
+    def reset(self, chat_id: int):
+        """Borra precio, pares, alertas, historial y suscripción del chat."""
+        with self.conn:
+            for table in (
+                "subscribers",
+                "positions",
+                "watchlist",
+                "alerts",
+                "notify_state",
+                "digests",
+                "trades",
+            ):
+                self.conn.execute(f"DELETE FROM {table} WHERE chat_id = ?", (chat_id,))
+        self._subs.discard(chat_id)
+        self._prices.pop(chat_id, None)
+        self._watch.pop(chat_id, None)
+        self._digests.pop(chat_id, None)
+        self._notify = {k: v for k, v in self._notify.items() if k[0] != chat_id}
+
+    # — Migración de los ficheros antiguos —
+    def migrate_files(self, directory: str = ".") -> dict:
+        """
+        Importa una sola vez subscribers.txt, last_buy_price_<id>.txt y
+        btc_trades_history_<id>.csv. Los ficheros se dejan donde están.
+        """
+        done = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'files_migrated'"
+        ).fetchone()
+        if done:
+            return {}
+
+        counts = {"subscribers": 0, "positions": 0, "trades": 0}
+        subs_file = os.path.join(directory, config.SUBSCRIBERS_FILE)
+        if os.path.exists(subs_file):
+            with open(subs_file) as f:
+                for line in f:
+                    if line.strip().isdigit():
+                        counts["subscribers"] += self.add_subscriber(int(line.strip()))
+
+        for path in glob.glob(os.path.join(directory, "last_buy_price_*.txt")):
+            m = re.search(r"last_buy_price_(-?\d+)\.txt$", path)
+            try:
+                with open(path) as f:
+                    self.set_buy_price(int(m.group(1)), float(f.read().strip()))
+                counts["positions"] += 1
+            except (AttributeError, ValueError) as e:
+                logging.error(f"No se pudo migrar {path}: {e}")
+
+        for path in glob.glob(os.path.join(directory, "btc_trades_history_*.csv")):
+            m = re.search(r"btc_trades_history_(-?\d+)\.csv$", path)
+            if not m:
+                continue
+            with open(path, newline="") as f:
+                rows = [
+                    (int(m.group(1)), *r[:6])
+                    for r in csv.reader(f)
+                    if len(r) >= 6 and r[0] != "timestamp"
+                ]
+            self.append_trades(rows)
+            counts["trades"] += len(rows)
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO meta VALUES ('files_migrated', ?)", (_now(),)
+            )
+        logging.info(f"Migración de ficheros a {self.path}: {counts}")
+        return counts
+
+
+class HistoryBuffer:
+    """
+    Acumula filas de historial de todos los suscriptores y las escribe
+    en una sola transacción: al llegar a `max_rows`, con el job periódico
+    (`flush`) y al apagar el bot.
+    """
+
+    def __init__(self, state: StateStore, max_rows: int = None):
+        self.state = state
+        self.max_rows = max_rows or config.HISTORY_BUFFER_ROWS
+        self._rows: list[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, chat_id, ts, signal, price, rsi, usd, pct):
+        self._rows.append((chat_id, ts, signal, price, rsi, usd, pct))
+        if len(self._rows) >= self.max_rows:
+            self.flush()
+
+    def discard(self, chat_id: int) -> int:
+        """Quita las filas pendientes del chat (p. ej. antes de un reset)."""
+        before = len(self._rows)
+        self._rows = [r for r in self._rows if r[0] != chat_id]
+        return before - len(self._rows)
+
+    def flush(self) -> int:
+        rows, self._rows = self._rows, []
+        if rows:
+            try:
+                self.state.append_trades(rows)
+            except Exception as e:
+                logging.error(f"Error writing history ({len(rows)} filas): {e}")
+                self._rows = rows + self._rows
+                return 0
+        return len(rows)
+
+
+_store: StateStore | None = None
+_history: HistoryBuffer | None = None
+
+
+def get_store() -> StateStore:
+    """Store compartido; se abre la primera vez que se usa."""
+    global _store
+    if _store is None:
+        _store = StateStore()
+    return _store
+
+
+def get_history_buffer() -> HistoryBuffer:
+    global _history
+    if _history is None:
+        _history = HistoryBuffer(get_store())
+    return _history
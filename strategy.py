@@ -1,26 +1,52 @@
 # strategy.py
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 import requests
-from ta.momentum import RSIIndicator
-from ta.trend import SMAIndicator, MACD
-from ta.volatility import BollingerBands
 import config
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
+import data_cache
+import market_client
+import market_data
+import metrics
 
+KLINE_COLUMNS = [
+    "open_time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "close_time",
+    "quote_asset_volume",
+    "trades",
+    "taker_buy_vol",
+    "taker_buy_quote_vol",
+    "ignore",
+]
 
-# Función auxiliar para fallback a CoinGecko
-def fetch_coingecko_ohlc(limit: int, interval_minutes: int = 5) -> pd.DataFrame:
-    # Coingecko devuelve precios cada minuto; pedimos 1 día
-    url = "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart"
-    params = {"vs_currency": "usd", "days": 1, "interval": "minute"}
-    data = requests.get(url, params=params).json()
-    prices = data.get("prices", [])  # [ [ts, price], ... ]
+# Cliente síncrono reutilizado (crearlo hace un ping y abre otra sesión)
+_binance_client = None
+
+# Caché de descargas de get_data_async, por (símbolo, intervalo, límite)
+_cache = data_cache.SingleFlightCache()
+
+
+def klines_to_frame(klines: list) -> pd.DataFrame:
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    df = df.astype({c: float for c in ["open", "high", "low", "close", "volume"]})
+    df.index = pd.to_datetime(df["close_time"], unit="ms")
+    return df[["open", "high", "low", "close", "volume"]]
+
+
+def coingecko_to_ohlc(
+    prices: list, limit: int, interval_minutes: int = 5
+) -> pd.DataFrame:
     df = pd.DataFrame(prices, columns=["timestamp", "close"])
     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
     df.set_index("timestamp", inplace=True)
     # Resample a 5min OHLC
-    ohlc = df["close"].resample(f"{interval_minutes}T").ohlc().dropna()
+    ohlc = df["close"].resample(f"{interval_minutes}min").ohlc().dropna()
     ohlc["volume"] = 0.0
     # Limitamos al número de velas deseadas (manteniendo las últimas)
     if len(ohlc) > limit:
@@ -28,91 +54,308 @@ def fetch_coingecko_ohlc(limit: int, interval_minutes: int = 5) -> pd.DataFrame:
     return ohlc
 
 
+# Función auxiliar para fallback a CoinGecko
+def fetch_coingecko_ohlc(limit: int, interval_minutes: int = 5) -> pd.DataFrame:
+    # Coingecko devuelve precios cada minuto; pedimos 1 día
+    url = "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart"
+    params = {"vs_currency": "usd", "days": 1, "interval": "minute"}
+    data = requests.get(url, params=params, timeout=config.HTTP_TIMEOUT).json()
+    prices = data.get("prices", [])  # [ [ts, price], ... ]
+    return coingecko_to_ohlc(prices, limit, interval_minutes)
+
+
+def fetch_binance_klines(limit: int) -> list:
+    """Klines crudas de Binance (la última es la vela en formación)."""
+    global _binance_client
+    if _binance_client is None:
+        from binance.client import Client
+
+        _binance_client = Client(
+            config.BINANCE_API_KEY,
+            config.BINANCE_API_SECRET,
+            requests_params={"timeout": config.HTTP_TIMEOUT},
+            ping=False,
+        )
+    return _binance_client.get_klines(
+        symbol=config.SYMBOL, interval=config.INTERVAL, limit=limit
+    )
+
+
+async def fetch_binance_klines_async(
+    limit: int, symbol: str = None, interval: str = None
+) -> list:
+    """Igual que `fetch_binance_klines` pero sin bloquear el loop."""
+    client = market_client.get_client()
+    return await client.get_klines(
+        symbol or config.SYMBOL, interval or config.INTERVAL, limit
+    )
+
+
+def _buffered(limit: int, symbol: str = None, interval: str = None):
+    """Velas del buffer en memoria alimentado por el websocket, si está listo."""
+    service = market_data.get_service()
+    if (
+        service is not None
+        and (symbol or service.symbol) == service.symbol
+        and (interval or service.interval) == service.interval
+        and len(service.ring) + 1 >= limit
+    ):
+        return service.frame(limit)
+    return None
+
+
 def get_data(limit: int = None) -> pd.DataFrame:
     """
     Devuelve DataFrame con columnas [open, high, low, close, volume].
-    Intentamos desde Binance; si falla por región, usamos CoinGecko.
+    Si el stream de klines está activo se lee del buffer en memoria;
+    si no, intentamos desde Binance y, si falla por región, CoinGecko.
+    Versión síncrona para scripts; el bot usa `get_data_async`.
     """
     limit = limit or config.LIMIT
+    df = _buffered(limit)
+    if df is not None:
+        metrics.DATA_SOURCE.inc(source="stream")
+        return df
+
+    from binance.exceptions import BinanceAPIException
+
     # 1) Intentar Binance
     try:
-        client = Client(config.BINANCE_API_KEY, config.BINANCE_API_SECRET)
-        klines = client.get_klines(
-            symbol=config.SYMBOL, interval=config.INTERVAL, limit=limit
-        )
-        df = pd.DataFrame(
-            klines,
-            columns=[
-                "open_time",
-                "open",
-                "high",
-                "low",
-                "close",
-                "volume",
-                "close_time",
-                "quote_asset_volume",
-                "trades",
-                "taker_buy_vol",
-                "taker_buy_quote_vol",
-                "ignore",
-            ],
-        )
-        df = df.astype({c: float for c in ["open", "high", "low", "close", "volume"]})
-        df.index = pd.to_datetime(df["close_time"], unit="ms")
-        return df[["open", "high", "low", "close", "volume"]]
+        df = klines_to_frame(fetch_binance_klines(limit))
+        metrics.DATA_SOURCE.inc(source="binance")
+        return df
     except BinanceAPIException as e:
         print(f"[Binance] Ping falló ({e}); usando CoinGecko de respaldo.")
     except Exception as e:
         print(f"[Binance] Error inesperado ({e}); usando CoinGecko de respaldo.")
 
     # 2) Fallback CoinGecko
+    metrics.DATA_FALLBACKS.inc()
     df = fetch_coingecko_ohlc(limit=limit, interval_minutes=5)
+    metrics.DATA_SOURCE.inc(source="coingecko")
     return df
 
 
-def analyze(df: pd.DataFrame, last_price: float):
+async def get_data_async(
+    limit: int = None, symbol: str = None, interval: str = None
+) -> pd.DataFrame:
     """
-    Dado el DataFrame, calcula indicadores y devuelve:
-    (signal, reason, current_close, rsi, sma_fast, sma_slow, macd)
+    Como `get_data`, pero toda la E/S va por el cliente HTTP asíncrono
+    compartido (`market_client`), así que nunca bloquea el loop.
+    Las descargas pasan por una caché TTL single-flight: peticiones
+    simultáneas comparten una sola llamada. Devuelve siempre una copia,
+    porque `analyze` añade columnas al DataFrame. Por defecto el par es
+    `config.SYMBOL` / `config.INTERVAL`.
     """
-    # Indicadores
-    df["sma_fast"] = SMAIndicator(df["close"], window=9).sma_indicator()
-    df["sma_slow"] = SMAIndicator(df["close"], window=21).sma_indicator()
-    df["rsi"] = RSIIndicator(df["close"], window=14).rsi()
+    limit = limit or config.LIMIT
+    symbol = symbol or config.SYMBOL
+    interval = interval or config.INTERVAL
+    with metrics.stage("fetch"):
+        df = _buffered(limit, symbol, interval)
+        if df is not None:
+            metrics.DATA_SOURCE.inc(source="stream")
+            return df
+
+        ttl = data_cache.interval_seconds(interval) * config.CACHE_TTL_FRACTION
+        key = (symbol, interval, limit)
+        df = await _cache.get(
+            key, ttl, lambda: _download_async(limit, symbol, interval)
+        )
+        return df.copy()
+
+
+async def _download_async(
+    limit: int, symbol: str = None, interval: str = None
+) -> pd.DataFrame:
+    client = market_client.get_client()
+    symbol = symbol or config.SYMBOL
+    interval = interval or config.INTERVAL
+    # 1) Intentar Binance
+    try:
+        df = klines_to_frame(await fetch_binance_klines_async(limit, symbol, interval))
+        metrics.DATA_SOURCE.inc(source="binance")
+        return df
+    except Exception as e:
+        # CoinGecko solo sirve de respaldo para el par principal (BTC)
+        if (symbol, interval) != (config.SYMBOL, config.INTERVAL):
+            print(f"[Binance] Error en {symbol} {interval}: {e}")
+            raise
+        print(f"[Binance] Error ({e}); usando CoinGecko de respaldo.")
+
+    # 2) Fallback CoinGecko
+    metrics.DATA_FALLBACKS.inc()
+    prices = await client.get_coingecko_prices(days=1)
+    metrics.DATA_SOURCE.inc(source="coingecko")
+    return coingecko_to_ohlc(prices, limit, interval_minutes=5)
+
+
+def cache_stats() -> dict:
+    """Contadores de la caché de get_data_async (hits, misses, coalesced)."""
+    return _cache.stats()
+
+
+metrics.DATA_CACHE.set_function(cache_stats)
+
+
+# Umbrales de las reglas de señal
+SMA_FAST = 9
+SMA_SLOW = 21
+RSI_WINDOW = 14
+RSI_RECOMPRA = 35
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+
+
+@dataclass
+class MarketSnapshot:
+    """
+    Indicadores de la última vela, calculados una sola vez por tick.
+    `signal`/`reason` son la señal común (COMPRA/VENTA) que no depende
+    del precio de compra de cada suscriptor.
+    """
+
+    df: pd.DataFrame
+    close: float
+    rsi: float
+    sma_fast: float
+    sma_slow: float
+    macd: float
+    macd_sig: float
+    bb_hi: float
+    bb_lo: float
+    signal: str | None
+    reason: str
+
+
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Añade al DataFrame las columnas sma_fast, sma_slow, rsi, macd,
+    macd_sig, bb_hi y bb_lo.
+    """
+    # `ta` se importa aquí para no cargarlo al arrancar el bot
+    from ta.momentum import RSIIndicator
+    from ta.trend import SMAIndicator, MACD
+    from ta.volatility import BollingerBands
+
+    df["sma_fast"] = SMAIndicator(df["close"], window=SMA_FAST).sma_indicator()
+    df["sma_slow"] = SMAIndicator(df["close"], window=SMA_SLOW).sma_indicator()
+    df["rsi"] = RSIIndicator(df["close"], window=RSI_WINDOW).rsi()
     macd_ind = MACD(df["close"])
     df["macd"] = macd_ind.macd()
     df["macd_sig"] = macd_ind.macd_signal()
     bb = BollingerBands(df["close"])
     df["bb_hi"] = bb.bollinger_hband()
     df["bb_lo"] = bb.bollinger_lband()
+    return df
+
+
+def take_snapshot(df: pd.DataFrame) -> MarketSnapshot:
+    """
+    Calcula los indicadores una vez y evalúa las reglas comunes
+    (COMPRA/VENTA) sobre la última vela.
+    """
+    add_indicators(df)
+    return snapshot_from_values(df, df.iloc[-1])
+
 
-    L = df.iloc[-1]
+def take_snapshots(frames: list[pd.DataFrame]) -> list[MarketSnapshot]:
+    """
+    Como `take_snapshot` para muchos pares a la vez: los cierres de los
+    DataFrames con el mismo número de velas se apilan en una matriz y
+    los indicadores se calculan en bloque (`indicators.batch_indicators`).
+    Las columnas se añaden a cada DataFrame, como hace `add_indicators`.
+    """
+    import indicators
+
+    snaps = [None] * len(frames)
+    by_len: dict[int, list[int]] = {}
+    for i, df in enumerate(frames):
+        by_len.setdefault(len(df), []).append(i)
+    for idx in by_len.values():
+        closes = np.vstack([frames[i]["close"].to_numpy(dtype=float) for i in idx])
+        cols = indicators.batch_indicators(
+            closes, sma_fast=SMA_FAST, sma_slow=SMA_SLOW, rsi_window=RSI_WINDOW
+        )
+        for row, i in enumerate(idx):
+            df = frames[i]
+            for name, values in cols.items():
+                if name != "close":
+                    df[name] = values[row]
+            last = {name: values[row, -1] for name, values in cols.items()}
+            snaps[i] = snapshot_from_values(df, last)
+    return snaps
+
+
+def snapshot_from_values(df: pd.DataFrame, L) -> MarketSnapshot:
+    """
+    Construye el snapshot a partir de los indicadores de la última vela
+    ya calculados (una fila de `add_indicators` o el dict de
+    `indicators.StreamingIndicators.values()`).
+    """
     signal, reason = None, ""
 
-    # Señal de recompra si baja >3% y RSI bajo
-    if (L["close"] < last_price * config.BUY_THRESHOLD) and (L["rsi"] < 35):
-        signal, reason = "RECOMPRA", "Precio >3% bajo y RSI bajo"
     # Señal de compra: cruces alcistas
-    elif (
+    if (
         (L["sma_fast"] > L["sma_slow"])
         and (L["macd"] > L["macd_sig"])
-        and (L["rsi"] < 70)
+        and (L["rsi"] < RSI_OVERBOUGHT)
     ):
         signal, reason = "COMPRA", "Señales alcistas: SMA+ MACD+ RSI<70"
     # Señal de venta: cruces bajistas
     elif (
         (L["sma_fast"] < L["sma_slow"])
         and (L["macd"] < L["macd_sig"])
-        and (L["rsi"] > 30)
+        and (L["rsi"] > RSI_OVERSOLD)
     ):
         signal, reason = "VENTA", "Señales bajistas: SMA- MACD- RSI>30"
 
+    return MarketSnapshot(
+        df=df,
+        close=float(L["close"]),
+        rsi=float(L["rsi"]),
+        sma_fast=float(L["sma_fast"]),
+        sma_slow=float(L["sma_slow"]),
+        macd=float(L["macd"]),
+        macd_sig=float(L["macd_sig"]),
+        bb_hi=float(L["bb_hi"]),
+        bb_lo=float(L["bb_lo"]),
+        signal=signal,
+        reason=reason,
+    )
+
+
+def evaluate(snap: MarketSnapshot, last_prices: np.ndarray):
+    """
+    Evalúa la señal de todos los suscriptores de una vez.
+    Recibe un array con el precio de compra de cada uno y devuelve
+    (signals, reasons), dos arrays de objetos alineados con la entrada.
+    La regla RECOMPRA (la única que depende del precio de compra)
+    tiene prioridad sobre la señal común del snapshot.
+    """
+    last_prices = np.asarray(last_prices, dtype=float)
+    recompra = (snap.close < last_prices * config.BUY_THRESHOLD) & (
+        snap.rsi < RSI_RECOMPRA
+    )
+    signals = np.where(recompra, "RECOMPRA", snap.signal).astype(object)
+    reasons = np.where(recompra, "Precio >3% bajo y RSI bajo", snap.reason).astype(
+        object
+    )
+    return signals, reasons
+
+
+def analyze(df: pd.DataFrame, last_price: float):
+    """
+    Dado el DataFrame, calcula indicadores y devuelve:
+    (signal, reason, current_close, rsi, sma_fast, sma_slow, macd)
+    """
+    snap = take_snapshot(df)
+    signals, reasons = evaluate(snap, np.array([last_price]))
     return (
-        signal,
-        reason,
-        L["close"],
-        L["rsi"],
-        L["sma_fast"],
-        L["sma_slow"],
-        L["macd"],
+        signals[0],
+        reasons[0],
+        snap.close,
+        snap.rsi,
+        snap.sma_fast,
+        snap.sma_slow,
+        snap.macd,
     )
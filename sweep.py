@@ -0,0 +1,240 @@
+# sweep.py
+"""
+Barrido de parámetros de la estrategia en paralelo.
+
+Los cierres se publican una sola vez en memoria compartida y cada
+proceso del pool los lee sin copiarlos. El trabajo se reparte por
+combinación de ventanas (SMA rápida, SMA lenta, RSI): cada proceso
+calcula esas columnas una vez (y las cachea para otras combinaciones
+que compartan ventana) y evalúa con ellas todos los umbrales de RSI y
+de recompra. El resultado es una tabla ordenada por rentabilidad.
+
+Uso:
+    python sweep.py klines.csv [--workers 4] [--out sweep.csv]
+    python sweep.py --archive --days 365 --grid sma_fast=5,9,12 --grid rsi_window=14
+"""
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import config
+import strategy
+
+# Valores actuales de strategy/config y alrededores
+DEFAULT_GRID = {
+    "sma_fast": [5, 9, 12],
+    "sma_slow": [21, 30, 50],
+    "rsi_window": [10, 14, 21],
+    "rsi_recompra": [30, 35, 40],
+    "rsi_overbought": [65, 70, 75],
+    "rsi_oversold": [25, 30, 35],
+    "buy_threshold": [0.95, 0.97, 0.99],
+}
+WINDOWS = ("sma_fast", "sma_slow", "rsi_window")
+
+# Estado de cada proceso del pool
+_close: np.ndarray | None = None
+_shm = None
+_columns: dict = {}
+
+
+def _attach(name: str, n: int):
+    """Inicializador del pool: vista sobre los cierres compartidos."""
+    global _close, _shm
+    _shm = shared_memory.SharedMemory(name=name)
+    _close = np.ndarray((n,), dtype=np.float64, buffer=_shm.buf)
+    _columns.clear()
+
+
+def _detach():
+    global _close, _shm
+    _close = None
+    _columns.clear()
+    if _shm is not None:
+        _shm.close()
+        _shm = None
+
+
+def _column(kind: str, window: int = None) -> np.ndarray:
+    """Indicador sobre `_close`, calculado una vez por proceso y ventana."""
+    key = (kind, window)
+    if key not in _columns:
+        from ta.momentum import RSIIndicator
+        from ta.trend import MACD, SMAIndicator
+        from ta.volatility import BollingerBands
+
+        close = pd.Series(_close, copy=False)
+        if kind == "sma":
+            col = SMAIndicator(close, window=window).sma_indicator()
+        elif kind == "rsi":
+            col = RSIIndicator(close, window=window).rsi()
+        elif kind in ("macd", "macd_sig"):
+            m = MACD(close)
+            _columns[("macd", None)] = m.macd().to_numpy()
+            _columns[("macd_sig", None)] = m.macd_signal().to_numpy()
+            return _columns[key]
+        else:
+            bb = BollingerBands(close)
+            _columns[("bb_hi", None)] = bb.bollinger_hband().to_numpy()
+            _columns[("bb_lo", None)] = bb.bollinger_lband().to_numpy()
+            return _columns[key]
+        _columns[key] = col.to_numpy()
+    return _columns[key]
+
+
+def _evaluate(task: tuple) -> list[dict]:
+    """Todas las combinaciones de umbrales para unas ventanas dadas."""
+    windows, rules, strict, fee = task
+    fast, slow, rsi_window = windows
+    cols = {
+        "close": _close,
+        "sma_fast": _column("sma", fast),
+        "sma_slow": _column("sma", slow),
+        "rsi": _column("rsi", rsi_window),
+        "macd": _column("macd"),
+        "macd_sig": _column("macd_sig"),
+    }
+    if strict:
+        cols["bb_hi"] = _column("bb_hi")
+        cols["bb_lo"] = _column("bb_lo")
+    results = []
+    for r in rules:
+        masks = backtest.rule_masks(
+            cols,
+            strict=strict,
+            overbought=r["rsi_overbought"],
+            oversold=r["rsi_oversold"],
+            recompra=r["rsi_recompra"],
+        )
+        res = backtest.simulate(
+            _close, masks, fee=fee, buy_threshold=r["buy_threshold"]
+        )
+        results.append({**dict(zip(WINDOWS, windows)), **r, **res})
+    return results
+
+
+def tasks(grid: dict, strict: bool = False, fee: float = None) -> list[tuple]:
+    """
+    Agrupa la rejilla por ventanas: una tarea por (sma_fast, sma_slow,
+    rsi_window) con todas sus combinaciones de umbrales. Descarta las
+    combinaciones con la SMA rápida >= la lenta.
+    """
+    fee = backtest.FEES["binance"] if fee is None else fee
+    grid = {**DEFAULT_GRID, **grid}
+    rule_keys = [k for k in DEFAULT_GRID if k not in WINDOWS]
+    rules = [
+        dict(zip(rule_keys, values))
+        for values in itertools.product(*(grid[k] for k in rule_keys))
+    ]
+    return [
+        (windows, rules, strict, fee)
+        for windows in itertools.product(*(grid[k] for k in WINDOWS))
+        if windows[0] < windows[1]
+    ]
+
+
+def sweep(
+    close: np.ndarray,
+    grid: dict = None,
+    workers: int = None,
+    strict: bool = False,
+    fee: float = None,
+    sort_by: str = "return_pct",
+) -> pd.DataFrame:
+    """
+    Evalúa la rejilla (por defecto `DEFAULT_GRID`; las claves que falten
+    toman sus valores) y devuelve los resultados ordenados por `sort_by`.
+    Con `workers=1` se ejecuta en este proceso.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    todo = tasks(grid or {}, strict=strict, fee=fee)
+    workers = workers or os.cpu_count() or 1
+    shm = shared_memory.SharedMemory(create=True, size=max(close.nbytes, 1))
+    try:
+        np.ndarray(close.shape, dtype=np.float64, buffer=shm.buf)[:] = close
+        if workers == 1:
+            _attach(shm.name, len(close))
+            try:
+                chunks = [_evaluate(t) for t in todo]
+            finally:
+                _detach()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(todo)) or 1,
+                initializer=_attach,
+                initargs=(shm.name, len(close)),
+            ) as pool:
+                chunks = list(pool.map(_evaluate, todo))
+    finally:
+        shm.close()
+        shm.unlink()
+    rows = [r for chunk in chunks for r in chunk]
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    return table.sort_values(sort_by, ascending=False, ignore_index=True)
+
+
+def parse_grid(items: list[str]) -> dict:
+    """["sma_fast=5,9", "buy_threshold=0.97"] → {"sma_fast": [5, 9], ...}."""
+    grid = {}
+    for item in items or []:
+        key, _, values = item.partition("=")
+        if key not in DEFAULT_GRID or not values:
+            raise ValueError(f"Parámetro de rejilla no válido: {item}")
+        cast = float if key == "buy_threshold" else int
+        grid[key] = [cast(v) for v in values.split(",")]
+    return grid
+
+
+def main():
+    p = argparse.ArgumentParser(description="Barrido de parámetros de strategy.py")
+    backtest.add_data_args(p)
+    p.add_argument(
+        "--grid", action="append", help="clave=v1,v2 (repetible); ver DEFAULT_GRID"
+    )
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--strict", action="store_true", help="reglas de btc_bot.py")
+    p.add_argument("--fee", type=backtest._fee, default=backtest.FEES["binance"])
+    p.add_argument("--sort", default="return_pct")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--out", default="sweep_results.csv")
+    args = p.parse_args()
+    try:
+        grid = parse_grid(args.grid)
+    except ValueError as e:
+        p.error(str(e))
+
+    df = backtest.load_data(p, args)
+    t = time.perf_counter()
+    table = sweep(
+        df["close"].to_numpy(),
+        grid,
+        workers=args.workers,
+        strict=args.strict,
+        fee=args.fee,
+        sort_by=args.sort,
+    )
+    elapsed = time.perf_counter() - t
+    table.to_csv(args.out, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table.head(args.top).to_string(float_format="{:.2f}".format))
+    print(f"{len(table)} combinaciones en {elapsed:.1f}s → {args.out}")
+    print(
+        f"actual: SMA {strategy.SMA_FAST}/{strategy.SMA_SLOW}, "
+        f"RSI {strategy.RSI_WINDOW}, umbrales {strategy.RSI_RECOMPRA}/"
+        f"{strategy.RSI_OVERBOUGHT}/{strategy.RSI_OVERSOLD}, "
+        f"BUY_THRESHOLD {config.BUY_THRESHOLD}"
+    )
+
+
+if __name__ == "__main__":
+    main()
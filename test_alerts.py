@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from alerts import Alert, AlertBook, parse_alert
+from store import StateStore
+
+
+def _book(prices, start):
+    book = AlertBook(Alert(i, i % 3, p) for i, p in enumerate(prices))
+    book.cross(start)
+    return book
+
+
+def test_cross_up_and_down_fire_once():
+    book = _book([95000, 96000, 97000, 98000], start=96500)
+    assert [a.price for a in book.cross(97000)] == [97000]
+    assert book.cross(97000) == []
+    # Bajando: el umbral igual al precio nuevo cuenta, el del anterior no
+    assert [a.price for a in book.cross(95000)] == [95000, 96000]
+    assert [a.price for a in book.cross(99000)] == [98000]
+    assert len(book) == 0
+
+
+def test_first_price_only_sets_reference():
+    book = AlertBook([Alert(1, 1, 100.0)])
+    assert book.cross(200.0) == []
+    assert [a.id for a in book.cross(50.0)] == [1]
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(3)
+    prices = rng.uniform(90000, 100000, 2000).round(0)
+    book = _book(prices, start=95000)
+    alive = dict(enumerate(prices))
+    prev = 95000
+    for price in 95000 + np.cumsum(rng.normal(0, 400, 300)):
+        expected = {
+            i for i, p in alive.items() if (prev < p <= price or price <= p < prev)
+        }
+        got = {a.id for a in book.cross(price)}
+        assert got == expected
+        for i in got:
+            del alive[i]
+        prev = price
+    assert len(book) == len(alive)
+
+
+def test_remove_and_chat_index():
+    book = AlertBook([Alert(1, 10, 100.0), Alert(2, 10, 100.0), Alert(3, 11, 90.0)])
+    assert book.remove(2).id == 2
+    assert [a.id for a in book.for_chat(10)] == [1]
+    assert book.remove_chat(10) == [1]
+    book.cross(95.0)
+    assert [a.id for a in book.cross(80.0)] == [3]
+
+
+def test_parse_alert():
+    assert parse_alert("100000", 96000) == (100000.0, "")
+    assert parse_alert("+5%", 100000) == (pytest.approx(105000.0), "+5%")
+    assert parse_alert("-2.5%", 100000)[0] == pytest.approx(97500.0)
+    for bad in ("abc", "0", "-10", "0%", "-100%", "-150%", "nan", "inf", "nan%"):
+        with pytest.raises(ValueError):
+            parse_alert(bad, 96000)
+
+
+def test_store_persists_alerts(tmp_path):
+    st = StateStore(str(tmp_path / "state.db"))
+    a = st.add_alert(1, 100000.0, "")
+    b = st.add_alert(2, 90000.0, "-5%")
+    st.delete_alerts([a])
+    assert st.alerts() == [(b, 2, 90000.0, "-5%")]
+    st.reset(2)
+    assert st.alerts() == []
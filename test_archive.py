@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import numpy as np
+
+import archive
+import market_data
+
+STEP = 300_000  # 5m en ms
+DAY = archive.DAY_MS
+
+
+def _row(t: int, close: float) -> list[float]:
+    return [t, t + STEP - 1, close, close + 5, close - 5, close, 1.0]
+
+
+def _rest_kline(t: int, close: float) -> list:
+    return [
+        t,
+        str(close),
+        str(close + 5),
+        str(close - 5),
+        str(close),
+        "1.0",
+        t + STEP - 1,
+    ]
+
+
+def test_write_merges_days_and_overwrites(tmp_path):
+    arch = archive.KlineArchive(str(tmp_path))
+    # Dos días, en desorden
+    arch.write("BTCUSDT", "5m", [_row(DAY + STEP, 2.0), _row(DAY - STEP, 1.0)])
+    arch.write("BTCUSDT", "5m", [_row(DAY + STEP, 3.0), _row(DAY, 2.5)])
+
+    assert arch.days("BTCUSDT", "5m") == [0, 1]
+    data = arch.read("BTCUSDT", "5m")
+    assert list(data[:, 0]) == [DAY - STEP, DAY, DAY + STEP]
+    assert list(data[:, 5]) == [1.0, 2.5, 3.0]  # la fila nueva sustituye
+
+    # Un solo día: vista mmap sin copia
+    one = arch.read("BTCUSDT", "5m", DAY, DAY + 2 * STEP)
+    assert isinstance(one.base, np.memmap) or isinstance(one, np.memmap)
+    assert list(arch.tail("BTCUSDT", "5m", 2)[:, 5]) == [2.5, 3.0]
+    assert list(arch.frame("BTCUSDT", "5m")["close"]) == [1.0, 2.5, 3.0]
+
+
+def test_gaps_and_sync_fetch_only_missing(tmp_path):
+    arch = archive.KlineArchive(str(tmp_path))
+    arch.write("BTCUSDT", "5m", [_row(i * STEP, 1.0) for i in (2, 3, 7)])
+    assert arch.gaps("BTCUSDT", "5m", 0, 10 * STEP) == [
+        (0, 2 * STEP),
+        (4 * STEP, 7 * STEP),
+        (8 * STEP, 10 * STEP),
+    ]
+
+    calls = []
+
+    async def fetch(symbol, interval, limit, start_ms=None, end_ms=None):
+        calls.append((start_ms, end_ms))
+        # Páginas de 2 velas, como haría Binance con limit
+        ts = range(start_ms, end_ms + 1, STEP)
+        return [_rest_kline(t, 2.0) for t in ts][:2]
+
+    added = asyncio.run(arch.sync("BTCUSDT", "5m", 0, 10 * STEP, fetch, page=2))
+    assert added == 7
+    assert calls[0] == (0, 2 * STEP - 1)
+    assert arch.gaps("BTCUSDT", "5m", 0, 10 * STEP) == []
+    assert list(arch.read("BTCUSDT", "5m")[:, 5]) == [2, 2, 1, 1, 2, 2, 2, 1, 2, 2]
+
+
+def test_service_seeds_from_archive(tmp_path):
+    arch = archive.KlineArchive(str(tmp_path))
+    now = int(time.time() * 1000) // STEP * STEP
+    arch.write("BTCUSDT", "5m", [_row(now - i * STEP, 1.0) for i in range(10, 2, -1)])
+    asked = []
+
+    async def fetch_history(limit):
+        asked.append(limit)
+        return [_rest_kline(now - i * STEP, 2.0) for i in range(limit - 1, -1, -1)]
+
+    svc = market_data.MarketDataService(fetch_history, capacity=50, archive=arch)
+    asyncio.run(svc.seed())
+    # Solo las que faltan desde la última archivada (3 atrás) hasta la viva
+    assert asked == [4]
+    assert len(svc.ring) == 10
+    assert svc.ring.live[market_data.FIELDS.index("open_time")] == now
+    assert len(arch.read("BTCUSDT", "5m")) == 10
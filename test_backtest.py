@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+import strategy
+
+
+def _masks(n, compra=(), venta=(), recompra_rsi=()):
+    m = {k: np.zeros(n, dtype=bool) for k in ("compra", "venta", "recompra_rsi")}
+    m["compra"][list(compra)] = True
+    m["venta"][list(venta)] = True
+    m["recompra_rsi"][list(recompra_rsi)] = True
+    return m
+
+
+def test_simulate_applies_fees_and_tracks_drawdown():
+    close = np.array([100.0, 100.0, 110.0, 90.0, 120.0, 120.0])
+    # Entra en 1, una COMPRA repetida se ignora, sale en 4
+    res = backtest.simulate(close, _masks(6, compra=(1, 2), venta=(4,)), fee=0.01)
+    assert res["trades"] == 1 and not res["open_position"]
+    assert res["final_equity"] == pytest.approx(1000 * 0.99 * 1.2 * 0.99)
+    assert res["max_drawdown_pct"] == pytest.approx((90 / 110 - 1) * 100)
+    assert res["win_rate_pct"] == 100.0
+
+
+def test_recompra_needs_drop_below_last_buy():
+    close = np.array([100.0, 101.0, 98.0, 96.0, 97.0])
+    m = _masks(5, compra=(0,), venta=(1,), recompra_rsi=(2, 3))
+    res = backtest.simulate(close, m, fee=0.0, buy_threshold=0.97)
+    # 98 no baja del 3%, 96 sí → vuelve a entrar y queda abierta
+    assert res["trades"] == 1 and res["open_position"]
+    assert res["final_equity"] == pytest.approx(1000 * 1.01 * 97 / 96)
+
+
+def test_rule_masks_match_live_signal():
+    rng = np.random.default_rng(5)
+    closes = 96000 + np.cumsum(rng.normal(0, 60, 400))
+    df = strategy.add_indicators(pd.DataFrame({"close": closes}))
+    masks = backtest.rule_masks(df)
+    for end in range(60, 400, 17):
+        snap = strategy.take_snapshot(pd.DataFrame({"close": closes[: end + 1]}))
+        expected = (
+            "COMPRA"
+            if masks["compra"][end]
+            else "VENTA" if masks["venta"][end] else None
+        )
+        assert snap.signal == expected
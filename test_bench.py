@@ -0,0 +1,30 @@
+import os
+
+import bench
+import news_scraper
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(bench.FIXTURES, name)) as f:
+        return f.read()
+
+
+def test_news_fixtures_parse():
+    ct = news_scraper.parse_cointelegraph(_fixture("cointelegraph_bitcoin.html"), 5)
+    cn = news_scraper.parse_cryptonews(_fixture("cryptonews_bitcoin.html"), 5)
+    assert len(ct) == len(cn) == 5
+    assert ct[0] == "Bitcoin price holds above $96K as ETF inflows extend streak"
+    assert cn[1] == "Analysts see BTC retest of range highs after weekly close"
+
+
+def test_compare_flags_regressions():
+    base = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}}}
+    now = {"results": {"a": {"median_ms": 10.5}, "b": {"median_ms": 13.0}}}
+    assert bench.compare(now, base, tolerance=0.10) == ["b"]
+
+
+def test_synthetic_klines_are_contiguous():
+    klines = bench.synthetic_klines(50, end_ms=bench.STEP_MS * 100)
+    assert len(klines) == 50
+    assert klines[-1][0] == bench.STEP_MS * 100
+    assert all(b[0] - a[0] == bench.STEP_MS for a, b in zip(klines, klines[1:]))
@@ -0,0 +1,96 @@
+import asyncio
+import gzip
+import math
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import config
+import store
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+class FakeBot:
+    def __init__(self):
+        self.documents = []
+
+    async def send_document(self, chat_id, document, **kwargs):
+        self.documents.append((chat_id, document))
+
+
+@pytest.fixture
+def bot(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TELEGRAM_TOKEN", "123:abc")
+    monkeypatch.chdir(tmp_path)  # btc_bot.log
+    import bot
+
+    st = store.StateStore(str(tmp_path / "state.db"))
+    monkeypatch.setattr(store, "_store", st)
+    monkeypatch.setattr(store, "_history", store.HistoryBuffer(st))
+    yield bot
+    st.close()
+
+
+def _call(handler, cid: int, args: list[str]):
+    message = FakeMessage()
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=cid), message=message)
+    context = SimpleNamespace(args=args, bot=FakeBot())
+    asyncio.run(handler(update, context))
+    return message, context.bot
+
+
+def test_historial_sends_export_as_document(bot):
+    bot.append_to_history(7, "2026-01-01 00:00:00", "COMPRA", 94000.0, 40.0, 0, 0)
+    message, fake = _call(bot.historial_command, 7, [])
+
+    assert message.replies == []
+    ((cid, document),) = fake.documents
+    assert cid == 7
+    assert document.filename == "btc_trades_history_7.csv.gz"
+    lines = gzip.decompress(document.input_file_content).decode().splitlines()
+    assert lines[1].startswith("2026-01-01 00:00:00,COMPRA,94000.0")
+
+
+def test_historial_without_rows_replies(bot):
+    message, fake = _call(bot.historial_command, 8, [])
+    assert fake.documents == [] and message.replies == ["❌ No hay historial."]
+
+
+@pytest.mark.parametrize("arg", ["nan", "inf", "-inf", "0", "-2", "abc"])
+def test_resumen_rejects_invalid_hours(bot, arg):
+    message, _ = _call(bot.resumen_command, 9, [arg])
+    assert message.replies == ["❌ Uso: /resumen <horas> (o /resumen off)"]
+    assert math.isnan(store.get_store().digests([9])[0])
+
+
+def test_resumen_sets_and_clears_digest(bot):
+    _call(bot.resumen_command, 9, ["6"])
+    assert store.get_store().digests([9]) == [6 * 3600]
+    message, _ = _call(bot.resumen_command, 9, ["off"])
+    assert message.replies == ["🗓 Resumen desactivado: solo cambios."]
+    assert math.isnan(store.get_store().digests([9])[0])
+
+
+def test_estado_shows_stream_rsi(bot, monkeypatch):
+    frame = pd.DataFrame({"close": [95000.0, 96000.0]})
+
+    async def get_data_async():
+        return frame
+
+    service = SimpleNamespace(indicators=lambda: {"rsi": 41.25})
+    monkeypatch.setattr(bot.strategy, "get_data_async", get_data_async)
+    monkeypatch.setattr(bot.market_data, "get_service", lambda: service)
+    message, _ = _call(bot.estado_command, 7, [])
+    assert message.replies[0].endswith("📉 RSI (última vela cerrada): 41.2")
+
+    monkeypatch.setattr(bot.market_data, "get_service", lambda: None)
+    message, _ = _call(bot.estado_command, 7, [])
+    assert "RSI" not in message.replies[0]
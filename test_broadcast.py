@@ -0,0 +1,131 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from telegram.error import Forbidden, RetryAfter
+
+from broadcast import Broadcaster, TokenBucket
+
+
+class FakeBot:
+    def __init__(self, retry_once=(), blocked=(), broken=()):
+        self.sent = []  # (chat_id, método, instante)
+        self._retry_once = set(retry_once)
+        self._blocked = set(blocked)
+        self._broken = set(broken)
+
+    async def _record(self, method, chat_id):
+        await asyncio.sleep(0.001)
+        if chat_id in self._blocked:
+            raise Forbidden("bot was blocked by the user")
+        if chat_id in self._broken:
+            raise OSError("fichero ilegible")
+        if chat_id in self._retry_once:
+            self._retry_once.discard(chat_id)
+            raise RetryAfter(0)
+        self.sent.append((chat_id, method, time.monotonic()))
+
+    async def send_photo(self, chat_id, photo):
+        await self._record("send_photo", chat_id)
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        await self._record("send_message", chat_id)
+
+
+def _messages():
+    return [("send_photo", {"photo": b"png"}), ("send_message", {"text": "hola"})]
+
+
+def test_token_bucket_spaces_reservations():
+    now = [0.0]
+    bucket = TokenBucket(rate=10, burst=2, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.1, 0.2]
+    now[0] = 1.0
+    assert bucket.reserve() == 0.0
+
+
+def test_broadcast_delivers_in_order_with_priority_retry_and_failures():
+    bot = FakeBot(retry_once={3}, blocked={4})
+    b = Broadcaster(bot, concurrency=1, global_rate=1000, per_chat_rate=1000)
+    deliveries = [
+        b.delivery(1, _messages(), priority=1),
+        b.delivery(2, _messages(), priority=1),
+        b.delivery(3, _messages(), priority=0),
+        b.delivery(4, _messages(), priority=0),
+    ]
+    stats = asyncio.run(b.broadcast(deliveries))
+
+    assert stats["sent"] == 3 and stats["failed"] == 1 and stats["retries"] == 1
+    assert [c for c, m, _ in bot.sent if m == "send_photo"] == [3, 1, 2]
+    # La foto siempre llega antes que el texto del mismo chat
+    for chat in (1, 2, 3):
+        methods = [m for c, m, _ in bot.sent if c == chat]
+        assert methods == ["send_photo", "send_message"]
+    assert 0 <= stats["p50"] <= stats["p95"] <= stats["max"]
+
+
+def test_unexpected_error_only_fails_that_chat():
+    bot = FakeBot(broken={2})
+    b = Broadcaster(bot, concurrency=1, global_rate=1000, per_chat_rate=1000)
+    deliveries = [b.delivery(cid, _messages()) for cid in (1, 2, 3)]
+    stats = asyncio.run(b.broadcast(deliveries))
+
+    assert stats["sent"] == 2 and stats["failed"] == 1
+    assert {c for c, _, _ in bot.sent} == {1, 3}
+
+
+def test_idle_chat_buckets_are_evicted():
+    now = [0.0]
+    bucket = TokenBucket(rate=1, burst=2, clock=lambda: now[0])
+    bucket.reserve()
+    assert not bucket.full()
+    now[0] = 1.0
+    assert bucket.full()
+
+    b = Broadcaster(FakeBot(), global_rate=1000, per_chat_rate=1, per_chat_burst=5)
+    asyncio.run(b.broadcast([b.delivery(cid, _messages()) for cid in range(50)]))
+    assert len(b._chat_buckets) == 50
+    for bucket in b._chat_buckets.values():
+        bucket.tokens = bucket.burst  # como si hubiera pasado el tiempo
+    asyncio.run(b.broadcast([b.delivery(99, _messages())]))
+    assert list(b._chat_buckets) == [99]
+
+
+def test_broadcast_respects_global_rate():
+    bot = FakeBot()
+    b = Broadcaster(bot, concurrency=20, global_rate=100, per_chat_rate=1000)
+    deliveries = [b.delivery(cid, _messages()) for cid in range(100)]
+    stats = asyncio.run(b.broadcast(deliveries))
+
+    assert stats["sent"] == 100
+    # 200 mensajes, ráfaga inicial de 100 y luego 100 msg/s → ~1s
+    assert stats["duration"] >= 0.9
+
+
+class UploadingBot(FakeBot):
+    """Devuelve un Message falso con file_id, como hace Telegram."""
+
+    def __init__(self):
+        super().__init__()
+        self.uploaded = []
+
+    async def send_photo(self, chat_id, photo):
+        await self._record("send_photo", chat_id)
+        if isinstance(photo, bytes):
+            self.uploaded.append(photo)
+            photo = f"id-{len(self.uploaded)}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=photo)])
+
+
+def test_identical_charts_are_uploaded_once():
+    bot = UploadingBot()
+    b = Broadcaster(bot, concurrency=10, global_rate=1000, per_chat_rate=1000)
+    charts = [b"chart-a"] * 8 + [b"chart-b"] * 2
+    deliveries = [
+        b.delivery(cid, [("send_photo", {"photo": png})])
+        for cid, png in enumerate(charts)
+    ]
+    stats = asyncio.run(b.broadcast(deliveries))
+
+    assert sorted(bot.uploaded) == [b"chart-a", b"chart-b"]
+    assert stats["photo_uploads"] == 2 and stats["photo_reused"] == 8
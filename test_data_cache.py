@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from data_cache import SingleFlightCache, interval_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_callers_share_one_fetch():
+    cache = SingleFlightCache()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "klines"
+
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.get(("BTCUSDT", "5m", 100), 5, fetch) for _ in range(10))
+        )
+
+    assert asyncio.run(scenario()) == ["klines"] * 10
+    assert calls == 1
+    assert cache.stats() == {"hits": 0, "misses": 1, "coalesced": 9}
+
+
+def test_ttl_expiry_and_errors_are_not_cached():
+    clock = FakeClock()
+    cache = SingleFlightCache(clock=clock)
+    results = iter([RuntimeError("451"), 1, 2])
+
+    async def fetch():
+        r = next(results)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await cache.get("k", 5, fetch)
+        assert await cache.get("k", 5, fetch) == 1
+        clock.now = 4.9
+        assert await cache.get("k", 5, fetch) == 1
+        clock.now = 5.0
+        assert await cache.get("k", 5, fetch) == 2
+
+    asyncio.run(scenario())
+    assert cache.stats() == {"hits": 1, "misses": 3, "coalesced": 0}
+
+
+def test_interval_seconds():
+    assert interval_seconds("5m") == 300
+    assert interval_seconds("1h") == 3600
+    assert interval_seconds("1d") == 86400
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+import time
+
+import config
+
+HEAVY = ("transformers", "torch", "matplotlib", "ta", "binance")
+
+
+def test_bot_import_is_lazy_and_within_budget(tmp_path):
+    env = dict(
+        os.environ,
+        TELEGRAM_TOKEN="123:abc",
+        PYTHONPATH=os.path.dirname(os.path.abspath(__file__)),
+    )
+    code = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        "import bot\n"
+        "print(time.perf_counter() - t)\n"
+        f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))\n"
+    )
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+    print(
+        f"import bot: {float(out[0]):.2f}s (proceso {time.perf_counter() - start:.2f}s)"
+    )
+
+    assert out[1] == ""
+    assert float(out[0]) < config.IMPORT_BUDGET_S
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+import strategy
+from indicators import StreamingIndicators
+
+COLUMNS = ["sma_fast", "sma_slow", "rsi", "macd", "macd_sig", "bb_hi", "bb_lo"]
+
+
+def _closes(n: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 96000 + np.cumsum(rng.normal(0, 60, n))
+
+
+def test_streaming_matches_ta():
+    closes = _closes(1500)
+    df = strategy.add_indicators(pd.DataFrame({"close": closes}))
+
+    eng = StreamingIndicators()
+    eng.seed(closes[:100])
+    for i in range(100, len(closes)):
+        vals = eng.update(closes[i])
+        for col in COLUMNS:
+            np.testing.assert_allclose(vals[col], df[col].iloc[i], rtol=1e-9, atol=1e-6)
+
+
+def test_warmup_is_nan_like_ta():
+    closes = _closes(40)
+    df = strategy.add_indicators(pd.DataFrame({"close": closes}))
+
+    eng = StreamingIndicators()
+    for i, c in enumerate(closes):
+        vals = eng.update(c)
+        for col in COLUMNS:
+            assert np.isnan(vals[col]) == np.isnan(df[col].iloc[i]), (col, i)
+
+
+def test_snapshot_from_engine_matches_take_snapshot():
+    closes = _closes(100, seed=3)
+    df = pd.DataFrame({"close": closes})
+    snap = strategy.take_snapshot(df.copy())
+
+    eng = StreamingIndicators()
+    fast = strategy.snapshot_from_values(df, eng.seed(closes))
+    assert fast.signal == snap.signal
+    np.testing.assert_allclose(fast.rsi, snap.rsi, rtol=1e-9)
+
+
+def test_batch_indicators_match_ta_per_row():
+    from indicators import batch_indicators
+
+    closes = np.vstack([_closes(120, seed) for seed in (1, 2, 3)])
+    cols = batch_indicators(closes)
+    for row in range(len(closes)):
+        df = strategy.add_indicators(pd.DataFrame({"close": closes[row]}))
+        for col in COLUMNS:
+            np.testing.assert_allclose(
+                cols[col][row], df[col].to_numpy(), rtol=1e-9, atol=1e-6
+            )
+
+
+def test_take_snapshots_groups_by_length():
+    frames = [pd.DataFrame({"close": _closes(n, n)}) for n in (80, 120, 80)]
+    snaps = strategy.take_snapshots([f.copy() for f in frames])
+    for df, snap in zip(frames, snaps):
+        expected = strategy.take_snapshot(df)
+        assert snap.signal == expected.signal
+        np.testing.assert_allclose(snap.rsi, expected.rsi, rtol=1e-9)
+        np.testing.assert_allclose(snap.close, expected.close)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import websockets
+
+import market_data
+import strategy
+
+STEP = 300_000  # 5m en ms
+
+
+def _rest_kline(i: int, close: float) -> list:
+    t = i * STEP
+    return [
+        t,
+        str(close),
+        str(close + 5),
+        str(close - 5),
+        str(close),
+        "1.0",
+        t + STEP - 1,
+    ]
+
+
+def _event(i: int, close: float, closed: bool) -> str:
+    t = i * STEP
+    k = {
+        "t": t,
+        "T": t + STEP - 1,
+        "o": str(close),
+        "h": str(close + 5),
+        "l": str(close - 5),
+        "c": str(close),
+        "v": "1.0",
+        "x": closed,
+    }
+    return json.dumps({"e": "kline", "s": "BTCUSDT", "k": k})
+
+
+def test_ring_wraps_and_keeps_live_last():
+    ring = market_data.KlineRing(3)
+    for i in range(5):
+        ring.push_closed(market_data.rest_row(_rest_kline(i, 100.0 + i)))
+    ring.set_live(market_data.rest_row(_rest_kline(5, 200.0)))
+
+    df = ring.to_frame(limit=10)
+    assert list(df["close"]) == [102.0, 103.0, 104.0, 200.0]
+    assert list(ring.to_frame(limit=2)["close"]) == [104.0, 200.0]
+
+    # Una vela repetida o antigua no desordena el buffer
+    ring.push_closed(market_data.rest_row(_rest_kline(3, 0.0)))
+    assert list(ring.to_frame(limit=10, include_live=False)["close"]) == [
+        102.0,
+        103.0,
+        104.0,
+    ]
+
+
+def test_service_follows_fake_stream():
+    history = [_rest_kline(i, 100.0 + i) for i in range(10)]  # 9 cerradas + viva
+    events = [
+        _event(9, 150.0, closed=False),
+        _event(9, 151.0, closed=True),
+        _event(10, 160.0, closed=False),
+    ]
+
+    async def fetch_history(limit):
+        return history[-limit:]
+
+    async def handler(ws):
+        for ev in events:
+            await ws.send(ev)
+        await ws.wait_closed()  # mantener la conexión abierta
+
+    async def scenario():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            service = market_data.start_service(
+                fetch_history,
+                capacity=20,
+                url=f"ws://127.0.0.1:{port}",
+            )
+            try:
+                for _ in range(200):
+                    live = service.ring.live
+                    if live is not None and live[0] == 10 * STEP:
+                        break
+                    await asyncio.sleep(0.01)
+                assert market_data.get_service() is service
+                return service.frame(limit=3)
+            finally:
+                await market_data.stop_service()
+
+    df = asyncio.run(scenario())
+    assert list(df["close"]) == [108.0, 151.0, 160.0]
+    assert market_data.get_service() is None
+
+
+def test_stream_indicators_match_add_indicators():
+    rng = np.random.default_rng(2)
+    closes = 96000 + np.cumsum(rng.normal(0, 60, 120))
+    history = [_rest_kline(i, c) for i, c in enumerate(closes[:80])]
+
+    async def fetch_history(limit):
+        return history[-limit:]
+
+    service = market_data.MarketDataService(fetch_history, capacity=200)
+    asyncio.run(service.seed())
+    assert service.indicators() is not None
+
+    # 79 cerradas sembradas (la 80 está viva); cierran 79..119, con una
+    # vela corregida y otra repetida por el camino
+    for i in range(79, 120):
+        service.on_message(_event(i, closes[i], closed=True))
+        if i == 100:
+            closes[i] += 50
+            service.on_message(_event(i, closes[i], closed=True))
+        if i == 110:
+            service.on_message(_event(105, 1.0, closed=True))  # antigua
+
+        expected = strategy.add_indicators(pd.DataFrame({"close": closes[: i + 1]}))
+        got = service.indicators()
+        for col, value in expected.iloc[-1].items():
+            np.testing.assert_allclose(got[col], value, rtol=1e-9, atol=1e-6)
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+import metrics
+
+
+def test_histogram_and_counter_render_prometheus_text():
+    h = metrics.Histogram(
+        "t_stage_seconds", "test", labels=("stage",), buckets=(0.1, 1)
+    )
+    h.observe(0.05, stage="fetch")
+    h.observe(0.5, stage="fetch")
+    c = metrics.Counter("t_source_total", "test", labels=("source",))
+    c.inc(source="binance")
+    c.inc(2, source="binance")
+
+    text = metrics.render()
+    assert "# TYPE t_stage_seconds histogram" in text
+    assert 't_stage_seconds_bucket{stage="fetch",le="0.1"} 1' in text
+    assert 't_stage_seconds_bucket{stage="fetch",le="1"} 2' in text
+    assert 't_stage_seconds_bucket{stage="fetch",le="+Inf"} 2' in text
+    assert 't_stage_seconds_count{stage="fetch"} 2' in text
+    assert 't_source_total{source="binance"} 3' in text
+
+
+def test_track_command_times_and_counts_errors():
+    async def ok(update, context):
+        return "ok"
+
+    async def boom(update, context):
+        raise RuntimeError
+
+    assert asyncio.run(metrics.track_command("t_ok", ok)(None, None)) == "ok"
+    with pytest.raises(RuntimeError):
+        asyncio.run(metrics.track_command("t_boom", boom)(None, None))
+    assert metrics.COMMAND_SECONDS.count(command="t_ok") == 1
+    assert metrics.COMMAND_SECONDS.count(command="t_boom") == 1
+    assert metrics.COMMAND_ERRORS.value(command="t_boom") == 1
+
+
+def test_counter_func_reads_totals_on_render():
+    totals = {"hits": 0, "misses": 0}
+    c = metrics.CounterFunc("t_cache_total", "test", "result")
+    assert "t_cache_total{" not in metrics.render()
+
+    c.set_function(lambda: totals)
+    totals.update(hits=3, misses=1)
+    text = metrics.render()
+    assert "# TYPE t_cache_total counter" in text
+    assert 't_cache_total{result="hits"} 3' in text
+    assert 't_cache_total{result="misses"} 1' in text
+
+
+def test_strategy_cache_stats_are_exported():
+    import strategy
+
+    text = metrics.render()
+    for key, value in strategy.cache_stats().items():
+        assert f'btc_bot_data_cache_total{{result="{key}"}} {value}' in text
+
+
+def test_drain_and_merge_carry_metrics_between_processes():
+    h = metrics.Histogram("t_drain_seconds", "test", labels=("stage",), buckets=(1,))
+    c = metrics.Counter("t_drain_total", "test")
+    g = metrics.Gauge("t_drain_gauge", "test")
+    h.observe(0.5, stage="render")
+    c.inc(3)
+    g.set(7)
+
+    dump = metrics.drain()
+    assert dump["t_drain_seconds"] == {("render",): ([1, 1], 0.5)}
+    assert dump["t_drain_total"] == {(): 3}
+    assert "t_drain_gauge" not in dump
+    assert h.count(stage="render") == 0 and c.value() == 0
+    assert metrics.drain().get("t_drain_total") is None
+
+    metrics.merge(dump)
+    metrics.merge(dump)
+    assert h.count(stage="render") == 2 and c.value() == 6
@@ -0,0 +1,26 @@
+import asyncio
+
+import news_feed
+
+
+def test_refresh_scores_only_unseen_headlines_in_one_batch():
+    feed = news_feed.NewsSentimentFeed(window=3)
+    polls = [["A up", "B down"], ["B down", "a UP!", "C up"], ["D down"]]
+    batches = []
+
+    async def fetch(limit):
+        return polls.pop(0)
+
+    async def score(texts):
+        batches.append(list(texts))
+        return [0.8 if "up" in t else -0.4 for t in texts]
+
+    assert feed.summary() == "sin noticias analizadas todavía"
+    assert asyncio.run(feed.refresh(fetch, score)) == 2
+    assert asyncio.run(feed.refresh(fetch, score)) == 1
+    assert batches == [["A up", "B down"], ["C up"]]
+    assert feed.summary() == "POSITIVE (0.40) en 3 titulares"
+
+    # Ventana móvil: el más antiguo ("A up") sale
+    asyncio.run(feed.refresh(fetch, score))
+    assert abs(feed.aggregate() - (-0.4 + 0.8 - 0.4) / 3) < 1e-9
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import httpx
+
+import news_scraper
+
+
+def _ct(titles):
+    cards = "".join(
+        f'<a class="post-card-inline__title-link" href="/{i}"><span>{t}</span></a>'
+        for i, t in enumerate(titles)
+    )
+    return f"<html><style>.post-card-inline__title-link{{}}</style>{cards}</html>"
+
+
+def _cn(titles):
+    cards = "".join(
+        f'<div class="article__title"><a href="/{i}">{t}</a></div>'
+        for i, t in enumerate(titles)
+    )
+    return f"<html><body>{cards}</body></html>"
+
+
+def test_parse_window_falls_back_when_marker_in_css():
+    html = _ct(["A", "B", "C"])
+    assert news_scraper.parse_cointelegraph(html, 2) == ["A", "B"]
+    assert news_scraper.parse_cointelegraph(html, 5) == ["A", "B", "C"]
+    assert news_scraper.parse_cryptonews(_cn(["X", "Y"]), 1) == ["X"]
+
+
+def test_fetch_is_concurrent_conditional_and_deduped(monkeypatch):
+    monkeypatch.setattr(news_scraper, "CRYPTOPANIC_API_KEY", None)
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.url.host, request.headers.get("If-None-Match")))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        if request.url.host == "cryptonews.com":
+            await asyncio.sleep(0.3)  # fuente lenta: se corta por timeout
+            return httpx.Response(200, text=_cn(["late"]))
+        body = _ct(["Bitcoin sube", "BTC baja", "bitcoin SUBE!"])
+        return httpx.Response(200, text=body, headers={"ETag": '"v1"'})
+
+    async def run():
+        f = news_scraper.NewsFetcher(
+            timeout=0.1, ttl=60, transport=httpx.MockTransport(handler)
+        )
+        t = time.perf_counter()
+        first = await f.headlines(5)
+        elapsed = time.perf_counter() - t
+        cached = await f.headlines(5)
+        f._cache.clear()
+        again = await f.headlines(5)
+        await f.aclose()
+        return first, elapsed, cached, again, f.stats
+
+    first, elapsed, cached, again, stats = asyncio.run(run())
+    assert first == ["Bitcoin sube", "BTC baja"]  # duplicado normalizado fuera
+    assert elapsed < 0.3
+    assert cached == again == first
+    assert stats == {"requests": 4, "not_modified": 1, "errors": 2}
+    assert ("cointelegraph.com", '"v1"') in seen
+
+
+def test_close_fetcher_closes_shared_client(monkeypatch):
+    monkeypatch.setattr(news_scraper, "_fetcher", None)
+
+    async def run():
+        f = news_scraper.get_fetcher()
+        http = f._client()
+        await news_scraper.close_fetcher()
+        await news_scraper.close_fetcher()  # sin fetcher no hace nada
+        return f, http
+
+    f, http = asyncio.run(run())
+    assert http.is_closed and f._http is None
+    assert news_scraper._fetcher is None
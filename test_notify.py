@@ -0,0 +1,40 @@
+import numpy as np
+
+import notify
+from store import StateStore
+
+
+def test_due_on_edges_moves_and_digests():
+    states = [
+        None,  # nunca visto
+        ("COMPRA", 100.0, 0.0),  # misma señal, precio quieto
+        ("", 100.0, 0.0),  # None → COMPRA
+        ("COMPRA", 90.0, 0.0),  # precio +11%
+        ("COMPRA", 100.0, 0.0),  # resumen cada hora vencido
+    ]
+    digests = [np.nan, np.nan, np.nan, np.nan, 3600]
+    mask = notify.due(states, ["COMPRA"] * 5, 100.0, 4000.0, digests, move=0.02)
+    assert mask.tolist() == [True, False, True, True, True]
+
+
+def test_back_to_monitoring_is_silent_but_recorded():
+    states = [("VENTA", 100.0, 0.0)]
+    mask = notify.due(states, [None], 100.5, 10.0, [np.nan], move=0.02)
+    assert mask.tolist() == [False]
+    assert notify.new_states(states, [None], 100.5, 10.0, mask) == [("", 100.0, 0.0)]
+    # Y la misma señal otra vez sí cuenta como flanco
+    assert notify.due([("", 100.0, 0.0)], ["VENTA"], 100.5, 20.0, [np.nan]).all()
+
+
+def test_store_keeps_states_and_digests(tmp_path):
+    st = StateStore(str(tmp_path / "state.db"))
+    st.save_notify_states([1, 2], "BTCUSDT", "5m", [("COMPRA", 1.0, 2.0), None])
+    st.set_digest(1, 7200)
+    st.close()
+
+    st = StateStore(str(tmp_path / "state.db"))
+    assert st.notify_states([1, 2], "BTCUSDT", "5m") == [("COMPRA", 1.0, 2.0), None]
+    assert st.digests([1])[0] == 7200
+    st.reset(1)
+    assert st.notify_states([1], "BTCUSDT", "5m") == [None]
+    assert np.isnan(st.digests([1])[0])
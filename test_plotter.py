@@ -0,0 +1,63 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bench
+import config
+import plotter
+import strategy
+
+
+def _df():
+    return strategy.add_indicators(
+        strategy.klines_to_frame(bench.synthetic_klines(config.LIMIT))
+    )
+
+
+def test_rerender_leaves_no_previous_overlays():
+    df = _df()
+    chart = plotter.BaseChart(df)
+    chart.render(96000.0, df.index[40])
+    chart.render(95000.0, df.index[10])
+    assert chart.render(96000.0, df.index[40]) == plotter.BaseChart(df).render(
+        96000.0, df.index[40]
+    )
+    assert chart.render() == plotter.BaseChart(df).render()
+
+
+def test_render_many_draws_duplicates_once(monkeypatch):
+    drawn = []
+
+    def fake_batch(df, overlays, title=None, interval=None):
+        drawn.extend(overlays)
+        return [f"png-{buy}".encode() for buy, _ in overlays]
+
+    monkeypatch.setattr(config, "RENDER_WORKERS", 0)
+    monkeypatch.setattr(plotter, "render_batch", fake_batch)
+    df = _df()
+    overlays = [(96000.0, df.index[1]), (95000.0, df.index[2])] * 3
+    pngs = asyncio.run(plotter.render_many(df, overlays))
+    assert sorted(drawn) == sorted(set(overlays))
+    assert pngs == [b"png-96000.0", b"png-95000.0"] * 3
+
+
+def test_render_pool_is_created_once_across_threads(monkeypatch):
+    created = []
+
+    class SlowPool:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)  # ensancha la carrera
+            created.append(self)
+
+        def shutdown(self, **kwargs):
+            pass
+
+    monkeypatch.setattr(plotter, "ProcessPoolExecutor", SlowPool)
+    monkeypatch.setattr(plotter, "_render_pool", None)
+    monkeypatch.setattr(config, "RENDER_WORKERS", 2)
+    with ThreadPoolExecutor(4) as ex:
+        pools = list(ex.map(lambda _: plotter.get_render_pool(), range(4)))
+
+    assert len(created) == 1 and all(p is created[0] for p in pools)
+    plotter.shutdown_render_pool()
+    assert plotter._render_pool is None
@@ -0,0 +1,50 @@
+import pytest
+
+import config
+import sentiment
+
+
+class FakeAnalyzer:
+    """Registra los lotes que recibe y puntúa por longitud del texto."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return [{"label": "POSITIVE", "score": len(t) / 100} for t in texts]
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    fake = FakeAnalyzer()
+    monkeypatch.setattr(sentiment, "get_analyzer", lambda: fake)
+    monkeypatch.setattr(sentiment, "_cache", sentiment.OrderedDict())
+    return fake
+
+
+def test_dedup_in_one_batch(analyzer):
+    out = sentiment.get_sentiments(["a", "bb", "a", "bb", "a"])
+    assert analyzer.calls == [["a", "bb"]]
+    assert out == ["POSITIVE (0.01)", "POSITIVE (0.02)"] * 2 + ["POSITIVE (0.01)"]
+
+
+def test_cache_hits_and_misses_only(analyzer):
+    sentiment.get_sentiments(["a", "bb"])
+    assert sentiment.get_sentiment("a") == "POSITIVE (0.01)"
+    assert len(analyzer.calls) == 1  # acierto: no llama al modelo
+
+    out = sentiment.get_sentiments(["bb", "ccc", "a"])
+    assert analyzer.calls[-1] == ["ccc"]  # solo los que faltan
+    assert out == ["POSITIVE (0.02)", "POSITIVE (0.03)", "POSITIVE (0.01)"]
+
+
+def test_lru_eviction(analyzer, monkeypatch):
+    monkeypatch.setattr(config, "SENTIMENT_CACHE_SIZE", 2)
+    sentiment.get_sentiments(["a", "bb"])
+    sentiment.get_sentiment("a")  # "bb" pasa a ser el menos reciente
+    sentiment.get_sentiment("ccc")
+    assert list(sentiment._cache) == ["a", "ccc"]
+
+    sentiment.get_sentiment("bb")
+    assert analyzer.calls[-1] == ["bb"]
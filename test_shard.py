@@ -0,0 +1,72 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import bench
+import delivery
+import metrics
+import shard
+import strategy
+
+
+def _work(cids, seed=0, default=True):
+    df = strategy.klines_to_frame(bench.synthetic_klines(60, seed=seed))
+    (snap,) = strategy.take_snapshots([df])
+    if not default:
+        return delivery.PairWork(("ETHUSDT", "1h"), snap, list(cids))
+    lasts = np.linspace(90000, 100000, len(cids))
+    signals = np.array(["COMPRA"] * len(cids), dtype=object)
+    pos = np.zeros(len(cids), dtype=int)
+    return delivery.PairWork(("BTCUSDT", "5m"), snap, list(cids), lasts, signals, pos)
+
+
+def test_shard_of_is_stable_and_spread():
+    counts = np.bincount([shard.shard_of(cid, 4) for cid in range(1000)], minlength=4)
+    assert counts.min() > 200
+    assert shard.shard_of(123456789, 4) == shard.shard_of(123456789, 4)
+
+
+def test_publish_roundtrip_and_split():
+    works = [_work(range(10)), _work(range(5, 8), seed=1, default=False)]
+    shm, layout = shard.publish(works)
+    try:
+        rows = sum(n for _, n in layout)
+        df = shard.read_frame(shm.buf, rows, *layout[1])
+    finally:
+        shm.close()
+        shm.unlink()
+    src = works[1].snap.df
+    assert (df.index == src.index).all()
+    np.testing.assert_array_equal(df["sma_fast"], src["sma_fast"])
+
+    parts = shard.split(works, 3)
+    seen = sorted(c for items in parts for it in items for c in it["cids"])
+    assert seen == sorted(list(range(10)) + [5, 6, 7])
+    for k, items in enumerate(parts):
+        for it in items:
+            assert all(shard.shard_of(c, 3) == k for c in it["cids"])
+            if it["lasts"] is not None:
+                assert len(it["lasts"]) == len(it["cids"])
+
+
+def test_pool_renders_and_sends_in_workers():
+    renders = metrics.STAGE_SECONDS.count(stage="render")
+    pool = shard.ShardPool(2, bot_factory=bench.FakeBot, timeout=60).start()
+    try:
+        works = [_work(range(6)), _work([2, 7], seed=1, default=False)]
+        stats = asyncio.run(pool.dispatch(works, "2026-01-01 00:00:00", "—"))
+    finally:
+        pool.stop()
+    # Una entrega (foto + mensaje) por chat
+    assert stats["sent"] == 8
+    assert stats["failed"] == 0
+    # Los renders de los workers llegan a las métricas del coordinador
+    assert metrics.STAGE_SECONDS.count(stage="render") > renders
+
+
+def test_rate_shares_stay_within_global_limit():
+    n = 3
+    assert shard.rate_share(n) * (n + 1) == pytest.approx(
+        shard.config.BROADCAST_GLOBAL_RATE
+    )
@@ -0,0 +1,116 @@
+import gzip
+import io
+import sqlite3
+
+from store import HistoryBuffer, StateStore
+
+
+def _exported(st: StateStore, chat_id: int) -> list[list[str]]:
+    """Filas del historial del chat, leídas de la exportación."""
+    out = io.BytesIO()
+    st.export_trades_gz(chat_id, out)
+    lines = gzip.decompress(out.getvalue()).decode().splitlines()
+    return [line.split(",") for line in lines[1:]]
+
+
+def test_write_through_cache_and_reopen(tmp_path):
+    db = tmp_path / "state.db"
+    st = StateStore(str(db))
+    assert st.add_subscriber(10) is True
+    assert st.add_subscriber(10) is False
+    st.set_buy_price(10, 95000.0)
+    st.set_buy_price(10, 94000.0)
+    st.append_trades([(10, "2026-01-01 00:00:00", "COMPRA", 94000.0, 40.0, 0, 0)])
+    assert st.subscribers() == {10}
+    assert st.buy_prices([10, 11]) == [94000.0, 96000.0]
+    st.close()
+
+    st = StateStore(str(db))
+    assert st.subscribers() == {10}
+    assert st.buy_price(10) == 94000.0
+    assert [r[1] for r in _exported(st, 10)] == ["COMPRA"]
+    mode = sqlite3.connect(str(db)).execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+    st.reset(10)
+    assert st.subscribers() == set() and not st.has_trades(10)
+
+
+def test_migrates_legacy_files_once(tmp_path):
+    (tmp_path / "subscribers.txt").write_text("1\n2\n\n")
+    (tmp_path / "last_buy_price_1.txt").write_text("95000.5")
+    (tmp_path / "btc_trades_history_2.csv").write_text(
+        "timestamp,signal,price,RSI,USD_change,%_change\n"
+        "2026-01-01 00:00:00,VENTA,97000,65,1000,1.0\n"
+        "2026-01-01 00:05:00,COMPRA,96000,45,0,0\n"
+    )
+    st = StateStore(str(tmp_path / "state.db"))
+
+    counts = st.migrate_files(str(tmp_path))
+    assert counts == {"subscribers": 2, "positions": 1, "trades": 2}
+    assert st.subscribers() == {1, 2}
+    assert st.buy_price(1) == 95000.5
+    assert _exported(st, 2)[0] == [
+        "2026-01-01 00:00:00",
+        "VENTA",
+        "97000.0",
+        "65.0",
+        "1000.0",
+        "1.0",
+    ]
+
+    assert st.migrate_files(str(tmp_path)) == {}
+    assert len(_exported(st, 2)) == 2
+
+
+def test_history_buffer_and_filtered_gzip_export(tmp_path):
+    st = StateStore(str(tmp_path / "state.db"))
+    buf = HistoryBuffer(st, max_rows=3)
+    buf.add(1, "2026-01-01 10:00:00", "COMPRA", 1.0, 40.0, 0, 0)
+    buf.add(1, "2026-01-02 10:00:00", "VENTA", 2.0, 60.0, 1, 100)
+    assert len(buf) == 2 and not st.has_trades(1)
+    buf.add(2, "2026-01-02 11:00:00", "VENTA", 2.0, 60.0, 1, 100)
+    assert len(buf) == 0 and st.has_trades(1) and st.has_trades(2)
+    buf.add(1, "2026-01-03 23:59:59", "VENTA", 3.0, 70.0, 2, 200)
+    assert buf.flush() == 1
+
+    out = io.BytesIO()
+    n = st.export_trades_gz(
+        1, out, start="2026-01-02", end="2026-01-03", signal="VENTA"
+    )
+    lines = gzip.decompress(out.getvalue()).decode().splitlines()
+    assert n == 2
+    assert lines[0] == "timestamp,signal,price,RSI,USD_change,%_change"
+    assert [l.split(",")[0] for l in lines[1:]] == [
+        "2026-01-02 10:00:00",
+        "2026-01-03 23:59:59",
+    ]
+
+
+def test_watchlist_defaults_and_grouping(tmp_path):
+    st = StateStore(str(tmp_path / "state.db"))
+    default = ("BTCUSDT", "5m")
+    assert st.watchlist(1) == [default]
+    assert st.add_watch(1, "ETHUSDT", "1h") is True
+    assert st.add_watch(1, "ETHUSDT", "1h") is False
+    assert st.remove_watch(2, "BTCUSDT", "5m") is False  # único par
+    st.close()
+
+    st = StateStore(str(tmp_path / "state.db"))
+    assert st.watchlist(1) == [default, ("ETHUSDT", "1h")]
+    assert st.watchers([1, 2]) == {default: [1, 2], ("ETHUSDT", "1h"): [1]}
+    assert st.remove_watch(1, "BTCUSDT", "5m") is True
+    assert st.watchers([1, 2]) == {("ETHUSDT", "1h"): [1], default: [2]}
+    st.reset(1)
+    assert st.watchlist(1) == [default]
+
+
+def test_reset_after_discard_keeps_history_empty(tmp_path):
+    st = StateStore(str(tmp_path / "state.db"))
+    buf = HistoryBuffer(st, max_rows=100)
+    buf.add(1, "2026-01-01 00:00:00", "COMPRA", 1.0, 40.0, 0, 0)
+    buf.add(2, "2026-01-01 00:00:00", "VENTA", 1.0, 60.0, 0, 0)
+    assert buf.discard(1) == 1
+    st.reset(1)
+    buf.flush()
+    assert not st.has_trades(1) and st.has_trades(2)
@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import strategy
+
+
+def _df(slope: float, seed: int, noise: float = 60, n: int = 100) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {"close": 100000 + np.arange(n) * slope + rng.normal(0, noise, n)}
+    )
+
+
+def _baseline(L, last_price: float):
+    """Reglas originales de `analyze`, escalares y sobre la fila de `ta`."""
+    if (L["close"] < last_price * config.BUY_THRESHOLD) and (L["rsi"] < 35):
+        return "RECOMPRA"
+    if (
+        (L["sma_fast"] > L["sma_slow"])
+        and (L["macd"] > L["macd_sig"])
+        and (L["rsi"] < 70)
+    ):
+        return "COMPRA"
+    if (
+        (L["sma_fast"] < L["sma_slow"])
+        and (L["macd"] < L["macd_sig"])
+        and (L["rsi"] > 30)
+    ):
+        return "VENTA"
+    return None
+
+
+def _lasts(close: float) -> np.ndarray:
+    # Sin posición (NaN), por debajo, algo por encima, justo en el umbral
+    # del 3 % y muy por encima
+    at_stop = close / config.BUY_THRESHOLD
+    return np.array([math.nan, close * 0.9, close * 1.01, at_stop, close * 1.2])
+
+
+@pytest.mark.parametrize(
+    "slope, seed, expected",
+    [
+        # Caída con RSI < 35 y VENTA común: solo salta RECOMPRA muy por encima
+        (-25, 1, ["VENTA", "VENTA", "VENTA", "VENTA", "RECOMPRA"]),
+        # RSI < 35 sin señal común
+        (-20, 5, [None, None, None, None, "RECOMPRA"]),
+        # Subida: COMPRA para todos, RSI alto así que nunca RECOMPRA
+        (20, 3, ["COMPRA"] * 5),
+    ],
+)
+def test_evaluate_matches_baseline_rules(slope, seed, expected):
+    df = _df(slope, seed)
+    L = strategy.add_indicators(df.copy()).iloc[-1]
+    lasts = _lasts(float(L["close"]))
+
+    # Producción: indicadores en bloque y reglas vectorizadas
+    (snap,) = strategy.take_snapshots([df.copy()])
+    signals, reasons = strategy.evaluate(snap, lasts)
+
+    assert list(signals) == expected
+    assert list(signals) == [_baseline(L, last) for last in lasts]
+    assert [bool(r) for r in reasons] == [s is not None for s in expected]
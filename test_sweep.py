@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+import sweep
+
+GRID = {
+    "sma_fast": [5, 9],
+    "sma_slow": [21],
+    "rsi_window": [14],
+    "rsi_recompra": [35],
+    "rsi_overbought": [70],
+    "rsi_oversold": [30],
+    "buy_threshold": [0.97, 0.99],
+}
+
+
+def _closes(n=3000, seed=11):
+    rng = np.random.default_rng(seed)
+    return 96000 + np.cumsum(rng.normal(0, 80, n))
+
+
+def test_tasks_group_by_windows_and_skip_invalid():
+    todo = sweep.tasks({**GRID, "sma_slow": [7, 21]})
+    # (5,7), (5,21), (9,21): (9,7) se descarta
+    assert [t[0] for t in todo] == [(5, 7, 14), (5, 21, 14), (9, 21, 14)]
+    assert all(len(t[1]) == 2 for t in todo)
+
+
+def test_sweep_matches_backtest_and_pool():
+    closes = _closes()
+    table = sweep.sweep(closes, GRID, workers=1)
+    assert len(table) == 4
+    assert table["return_pct"].is_monotonic_decreasing
+
+    # El punto con los parámetros actuales coincide con backtest.run
+    row = table[(table.sma_fast == 9) & (table.buy_threshold == 0.97)].iloc[0]
+    expected = backtest.run(pd.DataFrame({"close": closes}))
+    assert row["final_equity"] == pytest.approx(expected["final_equity"])
+    assert row["trades"] == expected["trades"]
+
+    pooled = sweep.sweep(closes, GRID, workers=2)
+    pd.testing.assert_frame_equal(pooled, table)
+
+
+def test_parse_grid():
+    assert sweep.parse_grid(["sma_fast=5,9", "buy_threshold=0.97"]) == {
+        "sma_fast": [5, 9],
+        "buy_threshold": [0.97],
+    }
+    with pytest.raises(ValueError):
+        sweep.parse_grid(["macd=1"])
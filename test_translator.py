@@ -0,0 +1,44 @@
+import translator
+
+
+class FakePipeline:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return [{"translation_text": f"es:{t}"} for t in texts]
+
+
+def test_only_uncached_headlines_are_translated(tmp_path, monkeypatch):
+    fake = FakePipeline()
+    path = str(tmp_path / "tr.json")
+    monkeypatch.setattr(translator, "_translator", fake)
+    monkeypatch.setattr(translator, "_cache", translator.TranslationCache(path))
+
+    out = translator.translate_to_spanish(
+        ["Bitcoin rallies", "BTC", "Bitcoin  rallies "]
+    )
+    # Normalizado: el tercero es el primero; lote ordenado por longitud
+    assert fake.calls == [["BTC", "Bitcoin rallies"]]
+    assert out == ["es:Bitcoin rallies", "es:BTC", "es:Bitcoin rallies"]
+
+    assert translator.translate_to_spanish(["BTC", "ETF flows"]) == [
+        "es:BTC",
+        "es:ETF flows",
+    ]
+    assert fake.calls[-1] == ["ETF flows"]
+
+    # Persistente: otra instancia lee lo guardado en disco
+    monkeypatch.setattr(translator, "_cache", translator.TranslationCache(path))
+    translator.translate_to_spanish(["Bitcoin rallies", "ETF flows"])
+    assert len(fake.calls) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = translator.TranslationCache(str(tmp_path / "tr.json"), maxsize=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None and cache.get("a") == "1" and len(cache) == 2
@@ -0,0 +1,72 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+from telegram.ext import ApplicationBuilder
+
+import webserver
+
+# Update grabado de un /estado enviado a un chat privado
+UPDATE = {
+    "update_id": 912345678,
+    "message": {
+        "message_id": 42,
+        "date": 1767225600,
+        "chat": {"id": 1001, "type": "private", "first_name": "Ana"},
+        "from": {"id": 1001, "is_bot": False, "first_name": "Ana"},
+        "text": "/estado",
+        "entities": [{"type": "bot_command", "offset": 0, "length": 7}],
+    },
+}
+
+
+def _run(check):
+    async def main():
+        application = ApplicationBuilder().token("123:TEST").build()
+        web_app = webserver.make_web_app(
+            application,
+            secret="s3cret",
+            path="/tg",
+            health=lambda: ("Bot de BTC iniciando ⏳", 503),
+        )
+        async with TestClient(TestServer(web_app)) as client:
+            await check(client, application)
+
+    asyncio.run(main())
+
+
+def test_webhook_feeds_update_queue():
+    async def check(client, application):
+        headers = {webserver.SECRET_HEADER: "s3cret"}
+        r = await client.post("/tg", json=UPDATE, headers=headers)
+        assert r.status == 200
+        update = application.update_queue.get_nowait()
+        assert update.update_id == UPDATE["update_id"]
+        assert update.effective_chat.id == 1001
+        assert update.message.text == "/estado"
+
+    _run(check)
+
+
+def test_webhook_rejects_bad_secret_and_body():
+    async def check(client, application):
+        assert (await client.post("/tg", json=UPDATE)).status == 403
+        headers = {webserver.SECRET_HEADER: "s3cret"}
+        r = await client.post("/tg", data="no es json", headers=headers)
+        assert r.status == 400
+        for body in ({}, []):
+            r = await client.post("/tg", json=body, headers=headers)
+            assert r.status == 400
+        assert application.update_queue.empty()
+
+    _run(check)
+
+
+def test_health_and_metrics_routes():
+    async def check(client, application):
+        r = await client.get("/")
+        assert r.status == 503
+        r = await client.get("/metrics")
+        assert r.status == 200
+        assert "btc_bot_tick_seconds" in await r.text()
+
+    _run(check)
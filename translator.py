@@ -1,13 +1,120 @@
-from transformers import pipeline
+# translator.py
+"""
+Traducción inglés → español de titulares con una caché LRU persistente:
+la clave es el hash del texto normalizado y solo los titulares que no
+están en caché pasan por el modelo, en un único lote ordenado por
+longitud (menos relleno por lote).
+"""
 
-# Cargar el modelo de traducción inglés → español
-translator = pipeline("translation_en_to_es", model="Helsinki-NLP/opus-mt-en-es")
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import config
+
+# El modelo de traducción inglés → español se carga en el primer uso
+_translator = None
+
+
+def get_translator():
+    global _translator
+    if _translator is None:
+        from transformers import pipeline
+
+        _translator = pipeline(
+            "translation_en_to_es", model="Helsinki-NLP/opus-mt-en-es"
+        )
+    return _translator
+
+
+def text_key(text: str) -> str:
+    """Hash del texto normalizado (NFKC y espacios colapsados)."""
+    norm = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Caché LRU clave → traducción, guardada en un JSON en disco."""
+
+    def __init__(self, path: str = None, maxsize: int = None):
+        self.path = path or config.TRANSLATION_CACHE_FILE
+        self.maxsize = maxsize or config.TRANSLATION_CACHE_SIZE
+        self._items: OrderedDict[str, str] = OrderedDict()
+        self.lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._items.update(json.load(f))
+            except (OSError, ValueError) as e:
+                logging.error(f"Caché de traducciones ilegible ({e}); se ignora")
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> str | None:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def save(self):
+        """Escritura atómica (fichero temporal + replace)."""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._items, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+_cache: TranslationCache | None = None
+
+
+def get_cache() -> TranslationCache:
+    global _cache
+    if _cache is None:
+        _cache = TranslationCache()
+    return _cache
 
 
 def translate_to_spanish(texts: list[str]) -> list[str]:
     if not texts:
         return []
 
-    # Traduce en lotes
-    results = translator(texts, max_length=512)
-    return [r["translation_text"] for r in results]
+    cache = get_cache()
+    keys = [text_key(t) for t in texts]
+    with cache.lock:
+        # Solo lo que no está en caché, sin repetidos y ordenado por longitud
+        found, missing = {}, {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            value = cache.get(key)
+            if value is None:
+                missing[key] = text
+            else:
+                found[key] = value
+        if missing:
+            order = sorted(missing, key=lambda k: len(missing[k]))
+            results = get_translator()(
+                [missing[k] for k in order],
+                max_length=512,
+                batch_size=config.TRANSLATION_BATCH_SIZE,
+            )
+            for key, res in zip(order, results):
+                found[key] = res["translation_text"]
+                cache.put(key, found[key])
+            try:
+                cache.save()
+            except OSError as e:
+                logging.error(f"No se pudo guardar la caché de traducciones: {e}")
+    return [found[k] for k in keys]
@@ -0,0 +1,115 @@
+# webserver.py
+"""
+Modo webhook: un único servidor asyncio (aiohttp) en el mismo loop que
+el bot, en lugar de Flask en un hilo más long polling.
+
+- POST WEBHOOK_PATH: updates de Telegram → `application.update_queue`
+  (comprueba la cabecera X-Telegram-Bot-Api-Secret-Token si hay secreto).
+- GET /: salud (503 mientras arranca), como en main.py.
+- GET /metrics: métricas de Prometheus.
+
+Para probarlo en local basta con postear un update grabado:
+
+    curl -X POST localhost:3000/telegram -H 'Content-Type: application/json' \\
+         -H 'X-Telegram-Bot-Api-Secret-Token: <secreto>' -d @update.json
+"""
+
+import asyncio
+import logging
+import signal
+
+from aiohttp import web
+from telegram import Update
+
+import config
+import metrics
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def make_web_app(application, secret: str = None, path: str = None, health=None):
+    """
+    App de aiohttp que alimenta `application` (ApplicationBuilder).
+    `health()` devuelve (texto, código) para la ruta /; por defecto
+    `bot.health`.
+    """
+    if health is None:
+        from bot import health
+
+    secret = secret if secret is not None else config.WEBHOOK_SECRET
+    path = path or config.WEBHOOK_PATH
+
+    async def telegram_update(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        try:
+            update = Update.de_json(data, application.bot)
+        except Exception:
+            # JSON válido que no es un update ({} o [])
+            return web.Response(status=400)
+        if update is None:
+            return web.Response(status=400)
+        await application.update_queue.put(update)
+        return web.Response()
+
+    async def home(request: web.Request) -> web.Response:
+        text, status = health()
+        return web.Response(text=text, status=status)
+
+    async def metrics_endpoint(request: web.Request) -> web.Response:
+        return web.Response(
+            body=metrics.render().encode(),
+            headers={"Content-Type": metrics.CONTENT_TYPE},
+        )
+
+    app = web.Application()
+    app.router.add_post(path, telegram_update)
+    app.router.add_get("/", home)
+    app.router.add_get("/metrics", metrics_endpoint)
+    return app
+
+
+async def serve(application, host: str = "0.0.0.0", port: int = None):
+    """
+    Arranca el bot sin polling, registra el webhook en Telegram y atiende
+    peticiones hasta SIGINT/SIGTERM. Hace a mano lo que `run_polling`
+    hace por nosotros (post_init, start, stop, shutdown, post_shutdown).
+    """
+    port = port or config.PORT
+    url = config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH
+
+    runner = web.AppRunner(make_web_app(application))
+    await runner.setup()
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    await web.TCPSite(runner, host, port).start()
+    # El webhook se registra con el servidor ya escuchando
+    await application.bot.set_webhook(
+        url,
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=config.WEBHOOK_DROP_PENDING,
+    )
+    logging.info(f"Webhook en {url}, escuchando en {host}:{port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+        # Mismo orden que run_polling: stop, post_stop, shutdown y post_shutdown
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)